@@ -18,8 +18,11 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from six.moves import cPickle as pickle
 
+import collections
 import os
 import logging
+import sqlite3
+import threading
 import time
 
 log = logging.getLogger('custodian.cache')
@@ -43,9 +46,9 @@ def factory(config):
         if not CACHE_NOTIFY:
             log.debug("Using in-memory cache")
             CACHE_NOTIFY = True
-        return InMemoryCache()
+        return InMemoryCache(config)
 
-    return FileCacheManager(config)
+    return SqlKvCache(config)
 
 
 class NullCache(object):
@@ -59,32 +62,100 @@ class NullCache(object):
     def get(self, key):
         pass
 
-    def save(self, key, data):
+    def save(self, key, data, ttl=None):
         pass
 
     def size(self):
         return 0
 
 
+def _freeze(value):
+    """Convert a cache key to a hashable value, cheaper than pickling it."""
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    elif isinstance(value, (list, tuple)):
+        return (list, tuple(_freeze(v) for v in value))
+    return value
+
+
 class InMemoryCache(object):
-    # Running in a temporary environment, so keep as a cache.
+    """Process wide in-memory cache.
 
-    __shared_state = {}
+    Running in a temporary environment (ie. lambda) or a long lived
+    process, so the cache is bounded by a byte budget, least recently
+    used entries are evicted first, and entries expire after the cache
+    period. Entry sizes are the size of their serialized form.
+    """
 
-    def __init__(self):
+    DEFAULT_MEMORY_LIMIT = 128 * 1024 * 1024
+
+    __shared_state = collections.OrderedDict()
+    __shared_lock = threading.Lock()
+    __shared_size = [0]
+
+    def __init__(self, config=None):
+        self.config = config
         self.data = self.__shared_state
+        self.lock = self.__shared_lock
+        self.memory_limit = (
+            getattr(config, 'cache_memory_limit', None) or self.DEFAULT_MEMORY_LIMIT)
+        self.cache_period = getattr(config, 'cache_period', None)
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
 
     def load(self):
         return True
 
-    def get(self, key):
-        return self.data.get(pickle.dumps(key))
+    def _key(self, key):
+        try:
+            k = _freeze(key)
+            hash(k)
+        except TypeError:
+            k = pickle.dumps(key, protocol=2)
+        return k
 
-    def save(self, key, data):
-        self.data[pickle.dumps(key)] = data
+    def get(self, key):
+        k = self._key(key)
+        with self.lock:
+            entry = self.data.get(k)
+            if entry is not None and entry[1] is not None and entry[1] < time.time():
+                self._evict(k)
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            # move to the most recently used position
+            self.data[k] = self.data.pop(k)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def save(self, key, data, ttl=None):
+        k = self._key(key)
+        try:
+            nbytes = len(pickle.dumps(data, protocol=2))
+        except Exception as e:
+            log.warning("Could not save cache entry err: %s" % e)
+            return
+        if ttl is None:
+            ttl = self.cache_period and self.cache_period * 60
+        expires = ttl and time.time() + ttl or None
+        with self.lock:
+            if k in self.data:
+                self.__shared_size[0] -= self.data.pop(k)[2]
+            if nbytes > self.memory_limit:
+                log.debug("Not caching entry size:%d over limit:%d",
+                          nbytes, self.memory_limit)
+                return
+            while self.data and self.__shared_size[0] + nbytes > self.memory_limit:
+                self._evict(next(iter(self.data)))
+            self.data[k] = (data, expires, nbytes)
+            self.__shared_size[0] += nbytes
+
+    def _evict(self, k):
+        self.__shared_size[0] -= self.data.pop(k)[2]
+        self.stats['evictions'] += 1
 
     def size(self):
-        return sum(map(len, self.data.values()))
+        return self.__shared_size[0]
 
 
 class FileCacheManager(object):
@@ -136,3 +207,107 @@ class FileCacheManager(object):
 
     def size(self):
         return os.path.exists(self.cache_path) and os.path.getsize(self.cache_path) or 0
+
+
+class SqlKvCache(object):
+    """Cache backed by a sqlite database with one row per key.
+
+    Entries are written individually within a transaction, so saving one
+    resource type doesn't rewrite the others, and multiple processes (ie.
+    c7n-org workers) can safely share a cache path. Each entry carries its
+    own expiration, stale entries are purged on load.
+    """
+
+    create_table = """
+    create table if not exists c7n_cache (
+        key blob primary key,
+        value blob,
+        expires real
+    )"""
+
+    # seconds to wait on a lock held by another writer
+    lock_timeout = 60
+
+    def __init__(self, config):
+        self.config = config
+        self.cache_period = config.cache_period
+        self.cache_path = os.path.abspath(
+            os.path.expanduser(
+                os.path.expandvars(
+                    config.cache)))
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        if self.conn is not None:
+            return True
+        try:
+            self._check_path()
+            conn = sqlite3.connect(
+                self.cache_path, timeout=self.lock_timeout,
+                check_same_thread=False)
+            conn.execute('pragma journal_mode=wal')
+            with conn:
+                conn.execute(self.create_table)
+                conn.execute(
+                    'delete from c7n_cache where expires < ?', (time.time(),))
+        except (sqlite3.Error, OSError) as e:
+            log.warning("Could not open cache %s err: %s" % (
+                self.cache_path, e))
+            return False
+        log.debug("Using cache file %s" % self.cache_path)
+        self.conn = conn
+        return True
+
+    def _check_path(self):
+        if os.path.isfile(self.cache_path):
+            # replace a cache file from the pickle file backend.
+            with open(self.cache_path, 'rb') as fh:
+                header = fh.read(16)
+            if header and header != b'SQLite format 3\x00':
+                log.debug("Removing incompatible cache file %s" % self.cache_path)
+                os.remove(self.cache_path)
+            return
+        directory = os.path.dirname(self.cache_path)
+        if not os.path.exists(directory):
+            log.info('Generating Cache directory: %s.' % directory)
+            os.makedirs(directory)
+
+    def get(self, key):
+        if not self.load():
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                'select value, expires from c7n_cache where key = ?',
+                (sqlite3.Binary(pickle.dumps(key, protocol=2)),)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return pickle.loads(bytes(row[0]))
+
+    def save(self, key, data, ttl=None):
+        """Save data under key, expiring after ttl seconds.
+
+        The ttl defaults to the configured cache period.
+        """
+        if not self.load():
+            return
+        if ttl is None:
+            ttl = self.cache_period * 60
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    'replace into c7n_cache (key, value, expires) values (?, ?, ?)',
+                    (sqlite3.Binary(pickle.dumps(key, protocol=2)),
+                     sqlite3.Binary(pickle.dumps(data, protocol=2)),
+                     time.time() + ttl))
+        except Exception as e:
+            log.warning("Could not save cache %s err: %s" % (
+                self.cache_path, e))
+
+    def size(self):
+        return os.path.exists(self.cache_path) and os.path.getsize(self.cache_path) or 0
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -107,6 +107,10 @@ def _default_options(p, blacklist=""):
         p.add_argument(
             "--cache-period", default=15, type=int,
             help="Cache validity in minutes (default %(default)i)")
+        p.add_argument(
+            "--cache-memory-limit", default=None, type=_megabytes,
+            help="Size limit in megabytes of the memory cache, "
+            "with --cache memory (default 128)")
     else:
         p.add_argument("--cache", default=None, help=argparse.SUPPRESS)
 
@@ -206,6 +210,19 @@ def _key_val_pair(value):
     return value
 
 
+def _megabytes(value):
+    """
+    Type checker for sizes given in megabytes, returned in bytes
+    """
+    try:
+        size = int(value)
+    except ValueError:
+        size = 0
+    if size <= 0:
+        raise argparse.ArgumentTypeError('size must be a positive number of megabytes')
+    return size * 1024 * 1024
+
+
 def setup_parser():
     c7n_desc = "Cloud Custodian - Cloud fleet management"
     parser = argparse.ArgumentParser(description=c7n_desc)
@@ -236,6 +253,10 @@ def setup_parser():
     run.set_defaults(command="c7n.commands.run")
     _default_options(run)
     _dryrun_option(run)
+    run.add_argument(
+        "--explain", action="store_true",
+        help="Print each policy's filter plan and its estimated api calls "
+        "without executing policies")
     run.add_argument(
         "--skip-validation",
         action="store_true",
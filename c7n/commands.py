@@ -28,7 +28,11 @@ import yaml
 from yaml.constructor import ConstructorError
 
 from c7n.exceptions import ClientError
+from c7n.filters.related import RelatedIndex
+from c7n.filters.usage import UsageGraph
+from c7n.filters.core import explain_filters
 from c7n.provider import clouds
+from c7n.planner import FetchPlanner
 from c7n.policy import Policy, PolicyCollection, load as policy_load
 from c7n.schema import ElementSchema, generate
 from c7n.utils import dumps, load_file, local_session, SafeLoader, yaml_dump
@@ -255,6 +259,11 @@ def validate(options):
 def run(options, policies):
     exit_code = 0
 
+    if getattr(options, 'explain', False):
+        for policy in policies:
+            print("\n".join(explain_policy(policy)))
+        return
+
     # AWS - Sanity check that we have an assumable role before executing policies
     # Todo - move this behind provider interface
     if options.assume_role and [p for p in policies if p.provider_name == 'aws']:
@@ -264,7 +273,14 @@ def run(options, policies):
             log.exception("Unable to assume role %s", options.assume_role)
             sys.exit(1)
 
+    planner = FetchPlanner(policies)
+    related_index = RelatedIndex()
+    credential_reports = {}
+    usage_graph = UsageGraph()
     for policy in policies:
+        policy.ctx.related_index = related_index
+        policy.ctx.credential_reports = credential_reports
+        policy.ctx.usage_graph = usage_graph
         try:
             policy()
         except Exception:
@@ -274,10 +290,27 @@ def run(options, policies):
             log.exception(
                 "Error while executing policy %s, continuing" % (
                     policy.name))
+        finally:
+            planner.done(policy)
+    planner.report()
+    related_index.report()
+    usage_graph.report()
     if exit_code != 0:
         sys.exit(exit_code)
 
 
+def explain_policy(policy, counts=None):
+    """Describe a policy's filter plan and its estimated api calls.
+
+    With counts, the number of resources each filter evaluated, the api
+    calls made are estimated from those.
+    """
+    lines = ["policy:%s resource:%s" % (policy.name, policy.resource_type)]
+    lines.extend(explain_filters(
+        getattr(policy.resource_manager, 'filters', ()), counts))
+    return lines
+
+
 @policy_command
 def report(options, policies):
     from c7n.reports import report as do_report
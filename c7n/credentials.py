@@ -22,6 +22,7 @@ from botocore.credentials import RefreshableCredentials
 from botocore.session import get_session
 from boto3 import Session
 
+from c7n.ratelimit import get_rate_limiter
 from c7n.version import version
 from c7n.utils import get_retry
 
@@ -61,6 +62,11 @@ class SessionFactory(object):
         session._session.user_agent_name = self.user_agent_name
         session._session.user_agent_version = version
 
+        rate_limiter = get_rate_limiter()
+        if rate_limiter is not None:
+            rate_limiter.register(
+                session, self.assume_role or self.profile or 'default')
+
         for s in self._subscribers:
             s(session)
 
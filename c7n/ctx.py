@@ -26,7 +26,7 @@ from c7n.output import (
     sys_stats_outputs,
     tracer_outputs)
 
-from c7n.utils import reset_session_cache, dumps, local_session
+from c7n.utils import reset_session_cache, dumps, local_session, TAG_MAP_INDEX
 from c7n.version import version
 
 
@@ -45,6 +45,14 @@ class ExecutionContext(object):
         self.output = None
         self.api_stats = None
         self.sys_stats = None
+        # Set when sharing resource fetches across a run's policies
+        self.fetch_planner = None
+        # Set when sharing related resources across a run's policies
+        self.related_index = None
+        # Set when sharing parsed credential reports across a run's policies
+        self.credential_reports = None
+        # Set when sharing the usage graph across a run's policies
+        self.usage_graph = None
 
         # A few tests patch on metrics flush
         # For backward compatibility, accept both 'metrics' and 'metrics_enabled' params (PR #4361)
@@ -92,6 +100,7 @@ class ExecutionContext(object):
 
         self.api_stats.__enter__()
         self.tracer.__enter__()
+        TAG_MAP_INDEX.__enter__()
 
         # Api stats and user agent modification by policy require updating
         # in place the cached session thread local.
@@ -115,6 +124,7 @@ class ExecutionContext(object):
             self.output.__exit__(exc_type, exc_value, exc_traceback)
 
         self.tracer.__exit__()
+        TAG_MAP_INDEX.__exit__()
 
         self.session_factory.policy_name = None
         # IMPORTANT: multi-account execution (c7n-org and others) need
@@ -143,4 +153,16 @@ class ExecutionContext(object):
             md['api-stats'] = self.api_stats.get_metadata()
         if 'metrics' in include and self.metrics:
             md['metrics'] = self.metrics.get_metadata()
+        if self.fetch_planner is not None:
+            md['fetch-plan'] = self.fetch_planner.get_metadata(self.policy)
+        manager = getattr(self.policy, 'resource_manager', None)
+        augment_stats = getattr(manager, 'augment_stats', None)
+        if augment_stats:
+            md['augment'] = augment_stats
+        refresh_stats = getattr(manager, 'refresh_stats', None)
+        if refresh_stats:
+            md['refresh'] = refresh_stats
+        child_stats = getattr(manager, 'child_stats', None)
+        if child_stats:
+            md['child-query'] = child_stats
         return md
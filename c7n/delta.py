@@ -0,0 +1,218 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Incremental refresh of a resource population from a change feed.
+
+A snapshot of a resource type's augmented resources is cached along
+with a watermark, the time its retrieval started, and the time of its
+last full retrieval. Subsequent runs retrieve the ids changed since the
+watermark from CloudTrail or AWS Config, describe only those, and merge
+them into the snapshot. Changed ids which no longer resolve, or which
+the feed reports as deleted, are removed from the snapshot.
+
+Change feeds are best effort, ie. CloudTrail only records mutations of
+the resource's own service and the tagging api. Runs without a usable
+snapshot, ie. one whose last full retrieval is older than max-age, or
+whose change feed can't be read, fall back to retrieving the full
+population. Policies
+with a query always retrieve the full population.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from datetime import datetime
+import json
+import logging
+import time
+
+from botocore.paginate import Paginator
+from dateutil.tz import tzutc
+
+from c7n.exceptions import ClientError
+from c7n.utils import local_session
+
+log = logging.getLogger('custodian.delta')
+
+# minutes a snapshot may be refreshed from before a full retrieval
+DEFAULT_MAX_AGE = 24 * 60
+
+# seconds subtracted from the watermark to allow for feed delivery delays
+FEED_DELAY = 15 * 60
+
+DELETED_STATUS = ('ResourceDeleted', 'ResourceDeletedNotRecorded')
+
+TAGGING_EVENT_SOURCE = 'tagging.amazonaws.com'
+
+
+class DeltaRefresh(object):
+
+    def __init__(self, manager, query, feed='cloudtrail', max_age=DEFAULT_MAX_AGE):
+        self.manager = manager
+        self.key = dict(manager.get_cache_key(query), refresh='incremental')
+        self.feed = feed
+        self.max_age = max_age
+        self.watermark = time.time()
+        self.full_at = self.watermark
+        self.stats = {'mode': 'full', 'changed': 0, 'deleted': 0}
+
+    @classmethod
+    def from_manager(cls, manager, query):
+        """Get a refresh for a policy's own resource manager, if configured."""
+        config = manager.data.get('refresh')
+        if not config or manager.data != manager.ctx.policy.data:
+            return None
+        if getattr(manager.get_model(), 'config_type', None) is None:
+            log.debug("incremental refresh unsupported on %s", manager.type)
+            return None
+        # changed resources are described by id, which doesn't apply
+        # the policy's query.
+        if manager.data.get('query'):
+            log.debug("incremental refresh unsupported with a query on %s", manager.type)
+            return None
+        return cls(manager, query, config.get('feed', 'cloudtrail'),
+                   config.get('max-age', DEFAULT_MAX_AGE))
+
+    def resources(self):
+        """Get the refreshed population, or None if a full retrieval is needed."""
+        cache = self.manager._cache
+        if not cache.load():
+            return None
+        snapshot = cache.get(self.key)
+        if (snapshot is None or 'full_at' not in snapshot or
+                self.watermark - snapshot['full_at'] > self.max_age * 60):
+            return None
+
+        since = datetime.fromtimestamp(snapshot['watermark'] - FEED_DELAY, tzutc())
+        try:
+            changed, deleted = getattr(self, 'get_%s_changes' % self.feed)(since)
+            changed = set(self.manager.match_ids(list(changed - deleted)))
+            fresh = []
+            if changed:
+                fresh = self.manager.augment(self.describe(sorted(changed)))
+        except ClientError as e:
+            log.warning(
+                "incremental refresh of %s failed, retrieving all resources: %s",
+                self.manager.type, e)
+            return None
+
+        id_key = self.manager.get_model().id
+        resources = {r[id_key]: r for r in snapshot['resources']}
+        for r in fresh:
+            resources[r[id_key]] = r
+        # changed resources that no longer resolve have been deleted
+        tombstones = deleted | (changed - {r[id_key] for r in fresh})
+        for i in tombstones:
+            resources.pop(i, None)
+
+        self.full_at = snapshot['full_at']
+        self.stats = {'mode': 'incremental', 'changed': len(fresh),
+                      'deleted': len(tombstones)}
+        log.debug(
+            "incremental refresh of %s changed:%d deleted:%d",
+            self.manager.type, len(fresh), len(tombstones))
+        return list(resources.values())
+
+    def describe(self, ids):
+        """Describe changed resources, omitting those which no longer exist.
+
+        Apis that reject a request naming a deleted resource have each
+        id described individually.
+        """
+        try:
+            return self.manager.source.get_resources(ids)
+        except ClientError as e:
+            if not _not_found(e):
+                raise
+            if len(ids) == 1:
+                return []
+        results = []
+        for i in ids:
+            results.extend(self.describe([i]))
+        return results
+
+    def save(self, resources):
+        # incremental saves expire with the snapshot's last full retrieval
+        ttl = self.max_age * 60 - (self.watermark - self.full_at)
+        if ttl <= 0:
+            return
+        self.manager._cache.save(
+            self.key, {'watermark': self.watermark, 'full_at': self.full_at,
+                       'resources': resources},
+            ttl=ttl)
+
+    def get_cloudtrail_changes(self, since):
+        """Get ids referenced by mutating api calls to the resource's service,
+        or tagged and untagged with the tagging api.
+
+        CloudTrail doesn't distinguish deletion, deleted ids are
+        detected by their failing to resolve.
+        """
+        m = self.manager.get_model()
+        changed = set()
+        for e in self.get_cloudtrail_events('%s.amazonaws.com' % m.service, since):
+            for r in e.get('Resources', ()):
+                if r.get('ResourceType') == m.config_type and r.get('ResourceName'):
+                    changed.add(r['ResourceName'])
+
+        arn_prefix = self.manager.generate_arn('')
+        for e in self.get_cloudtrail_events(TAGGING_EVENT_SOURCE, since):
+            params = json.loads(e.get('CloudTrailEvent', '{}')).get(
+                'requestParameters') or {}
+            for arn in params.get('resourceARNList', ()):
+                if arn.startswith(arn_prefix):
+                    changed.add(arn[len(arn_prefix):])
+        return changed, set()
+
+    def get_cloudtrail_events(self, source, since):
+        from c7n.query import RetryPageIterator
+        client = local_session(self.manager.session_factory).client(
+            'cloudtrail', region_name=self.manager.config.region)
+        pager = client.get_paginator('lookup_events')
+        pager.PAGE_ITERATOR_CLS = RetryPageIterator
+        for page in pager.paginate(
+                StartTime=since,
+                LookupAttributes=[{
+                    'AttributeKey': 'EventSource', 'AttributeValue': source}]):
+            for e in page.get('Events', ()):
+                if e.get('ReadOnly') != 'true':
+                    yield e
+
+    def get_config_changes(self, since):
+        """Get ids with configuration items recorded by AWS Config."""
+        from c7n.query import RetryPageIterator
+        m = self.manager.get_model()
+        client = local_session(self.manager.session_factory).client(
+            'config', region_name=self.manager.config.region)
+        pager = Paginator(
+            client.select_resource_config,
+            {'input_token': 'NextToken', 'output_token': 'NextToken',
+             'result_key': 'Results'},
+            client.meta.service_model.operation_model('SelectResourceConfig'))
+        pager.PAGE_ITERATOR_CLS = RetryPageIterator
+        expr = (
+            "select resourceId, configurationItemStatus where resourceType = '%s' "
+            "and configurationItemCaptureTime >= '%s'") % (
+                m.config_type, since.strftime('%Y-%m-%dT%H:%M:%SZ'))
+        changed, deleted = set(), set()
+        for page in pager.paginate(Expression=expr):
+            for r in page.get('Results', ()):
+                item = json.loads(r)
+                if item.get('configurationItemStatus') in DELETED_STATUS:
+                    deleted.add(item['resourceId'])
+                else:
+                    changed.add(item['resourceId'])
+        return changed, deleted
+
+
+def _not_found(e):
+    code = e.response.get('Error', {}).get('Code', '')
+    return 'NotFound' in code or code.startswith('NoSuch')
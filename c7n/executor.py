@@ -14,7 +14,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 from concurrent.futures import (
-    ProcessPoolExecutor, ThreadPoolExecutor)
+    ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED)
 
 from c7n.registry import PluginRegistry
 
@@ -40,6 +40,52 @@ def executor(name, **kw):
     return factory(**kw)
 
 
+class AdaptiveConcurrency(object):
+    """Additive increase, multiplicative decrease (AIMD) concurrency limit.
+
+    The limit grows by one for each limit's worth of completed calls and
+    is halved whenever a call reports being throttled.
+    """
+
+    def __init__(self, initial, ceiling, floor=1):
+        self.ceiling = max(ceiling, floor)
+        self.floor = floor
+        self.limit = float(min(max(initial, floor), self.ceiling))
+        self.lock = threading.Lock()
+        self.stats = {'concurrency': 0, 'throttles': 0}
+
+    def completed(self):
+        with self.lock:
+            self.limit = min(self.ceiling, self.limit + 1.0 / self.limit)
+
+    def throttled(self):
+        with self.lock:
+            self.stats['throttles'] += 1
+            self.limit = max(self.floor, self.limit / 2)
+
+    def map(self, executor, func, iterable):
+        """Map func over iterable on the executor.
+
+        The number of in flight calls is bounded by the current limit,
+        results are returned in order and the first error is raised.
+        """
+        items = list(iterable)
+        results = [None] * len(items)
+        pending = {}
+        idx = 0
+        while idx < len(items) or pending:
+            while idx < len(items) and len(pending) < int(self.limit):
+                pending[executor.submit(func, items[idx])] = idx
+                idx += 1
+            self.stats['concurrency'] = max(
+                self.stats['concurrency'], len(pending))
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for f in done:
+                results[pending.pop(f)] = f.result()
+                self.completed()
+        return results
+
+
 class MainThreadExecutor(object):
     """ For running tests.
 
@@ -15,6 +15,9 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from .core import (
     ANNOTATION_KEY,
+    COST_MEMORY,
+    COST_BULK_API,
+    COST_RESOURCE_API,
     FilterValidationError,
     OPERATORS,
     FilterRegistry,
@@ -24,7 +27,8 @@ from .core import (
     ValueFilter,
     AgeFilter,
     EventFilter,
-    StateTransitionFilter,)
+    StateTransitionFilter,
+    plan_filters,)
 from .config import ConfigCompliance
 from .health import HealthEventFilter
 from .iamaccess import CrossAccountAccessFilter, PolicyChecker
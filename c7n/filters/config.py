@@ -17,7 +17,7 @@ from c7n.filters import ValueFilter
 from c7n.manager import resources
 from c7n.utils import local_session, type_schema
 
-from .core import Filter
+from .core import Filter, COST_BULK_API
 
 
 class ConfigCompliance(Filter):
@@ -49,6 +49,8 @@ class ConfigCompliance(Filter):
     Also note, custodian has direct support for deploying policies as config
     rules see https://bit.ly/2mblVpq
     """
+
+    cost = COST_BULK_API
     permissions = ('config:DescribeComplianceByConfigRule',)
     schema = type_schema(
         'config-compliance',
@@ -16,6 +16,7 @@ Resource Filtering Logic
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import collections
 import copy
 import datetime
 from datetime import timedelta
@@ -24,8 +25,9 @@ import logging
 import operator
 import re
 import sys
+import threading
 
-from dateutil.tz import tzutc
+from dateutil.tz import tzoffset, tzutc
 from dateutil.parser import parse
 import jmespath
 import six
@@ -35,7 +37,8 @@ from c7n.exceptions import PolicyValidationError
 from c7n.executor import ThreadPoolExecutor
 from c7n.registry import PluginRegistry
 from c7n.resolver import ValuesFrom
-from c7n.utils import set_annotation, type_schema, parse_cidr
+from c7n.utils import (
+    set_annotation, type_schema, parse_cidr, get_tag_value, NetworkSet)
 
 
 class FilterValidationError(Exception):
@@ -45,6 +48,17 @@ class FilterValidationError(Exception):
 # Matching filters annotate their key onto objects
 ANNOTATION_KEY = "c7n:MatchedFilters"
 
+# Filter cost classes, cheapest first.
+COST_MEMORY = 0
+COST_BULK_API = 1
+COST_RESOURCE_API = 2
+
+COST_NAMES = {
+    COST_MEMORY: 'memory',
+    COST_BULK_API: 'bulk-api',
+    COST_RESOURCE_API: 'resource-api',
+    None: 'ordered'}
+
 
 def glob_match(value, pattern):
     if not isinstance(value, six.string_types):
@@ -114,6 +128,164 @@ VALUE_TYPES = [
     'unique_size', 'date']
 
 
+def compile_accessor(k):
+    """Compile a value filter key into a function getting its resource value."""
+    if k.startswith('tag:'):
+        tk = k.split(':', 1)[1]
+        return lambda i: get_tag_value(i, tk)
+
+    expr = []
+
+    def get_value(i):
+        if k in i:
+            return i.get(k)
+        # keys aren't necessarily valid expressions, ie. annotation keys
+        if not expr:
+            expr.append(jmespath.compile(k))
+        return expr[0].search(i)
+    return get_value
+
+
+def compile_operator(op_name, value=None):
+    """Get a value filter operator, specialized to a fixed value if given."""
+    if op_name in ('regex', 'regex-case') and isinstance(value, six.string_types):
+        try:
+            match = re.compile(
+                value, flags=op_name == 'regex' and re.IGNORECASE or 0).match
+        except re.error:
+            return OPERATORS[op_name]
+
+        def regex_op(x, y):
+            if not isinstance(x, six.string_types):
+                return False
+            return bool(match(x))
+        return regex_op
+    if op_name in ('in', 'ni', 'not-in') and isinstance(value, (list, tuple)):
+        try:
+            members = frozenset(value)
+        except TypeError:
+            return OPERATORS[op_name]
+        negate = op_name != 'in'
+
+        def in_op(x, y):
+            try:
+                found = x in members
+            except TypeError:
+                found = x in y
+            return found != negate
+        return in_op
+    return OPERATORS[op_name]
+
+
+def _compile_normalize(v):
+    def convert(r):
+        if isinstance(r, six.string_types):
+            return v, r.strip().lower()
+        return v, r
+    return convert
+
+
+def _compile_integer(v):
+    def convert(r):
+        try:
+            return v, int(str(r).strip())
+        except ValueError:
+            return v, 0
+    return convert
+
+
+def _compile_size(v):
+    def convert(r):
+        try:
+            return v, len(r)
+        except TypeError:
+            return v, 0
+    return convert
+
+
+def _compile_unique_size(v):
+    def convert(r):
+        try:
+            return v, len(set(r))
+        except TypeError:
+            return v, 0
+    return convert
+
+
+def _compile_swap(v):
+    return lambda r: (r, v)
+
+
+def _compile_date(v):
+    sentinel = parse_date(v)
+    return lambda r: (sentinel, parse_date(r))
+
+
+def _compile_age(v):
+    def convert(r):
+        sentinel = v
+        if not isinstance(sentinel, datetime.datetime):
+            sentinel = datetime.datetime.now(tz=tzutc()) - timedelta(sentinel)
+        value = parse_date(r)
+        if value is None:
+            value = 0
+        return value, sentinel
+    return convert
+
+
+def _compile_expiration(v):
+    def convert(r):
+        sentinel = v
+        if not isinstance(sentinel, datetime.datetime):
+            sentinel = datetime.datetime.now(tz=tzutc()) + timedelta(sentinel)
+        value = parse_date(r)
+        if value is None:
+            value = 0
+        return sentinel, value
+    return convert
+
+
+def _compile_cidr(v):
+    if isinstance(v, (list, tuple)):
+        networks = NetworkSet(v)
+        return lambda r: (networks, parse_cidr(r))
+    s = parse_cidr(v)
+
+    def convert(r):
+        value = parse_cidr(r)
+        if (isinstance(s, ipaddress._BaseAddress) and
+                isinstance(value, ipaddress._BaseNetwork)):
+            return value, s
+        return s, value
+    return convert
+
+
+def _compile_cidr_size(v):
+    def convert(r):
+        cidr = parse_cidr(r)
+        if cidr:
+            return v, cidr.prefixlen
+        return v, 0
+    return convert
+
+
+# value types which compile to a conversion of the resource value,
+# see ValueFilter.process_value_type for their semantics.
+COMPILED_VALUE_TYPES = {
+    None: None,
+    'normalize': _compile_normalize,
+    'integer': _compile_integer,
+    'size': _compile_size,
+    'unique_size': _compile_unique_size,
+    'swap': _compile_swap,
+    'date': _compile_date,
+    'age': _compile_age,
+    'expiration': _compile_expiration,
+    'cidr': _compile_cidr,
+    'cidr_size': _compile_cidr_size,
+}
+
+
 class FilterRegistry(PluginRegistry):
 
     def __init__(self, *args, **kw):
@@ -176,10 +348,15 @@ class Filter(object):
 
     metrics = ()
     permissions = ()
+    # One of the COST_ classes, for filters that evaluate each resource
+    # independently of the others.
+    cost = None
     schema = {'type': 'object'}
     # schema aliases get hoisted into a jsonschema definition
     # location, and then referenced inline.
     schema_alias = None
+    # set by enclosing boolean blocks, see journal_annotation
+    annotation_hook = None
 
     def __init__(self, data, manager=None):
         self.data = data
@@ -188,6 +365,16 @@ class Filter(object):
     def get_permissions(self):
         return self.permissions
 
+    def journal_annotation(self, r, key):
+        """Record a resource's annotation before modifying it in place.
+
+        Filters modifying an existing annotation value in place, rather
+        than setting a new value, call this first so that enclosing
+        `and` and `not` blocks can restore the value.
+        """
+        if self.annotation_hook is not None:
+            self.annotation_hook(r, key)
+
     def validate(self):
         """validate filter config, return validation error or self"""
         return self
@@ -196,6 +383,28 @@ class Filter(object):
         """ Bulk process resources and return filtered set."""
         return list(filter(self, resources))
 
+    def is_streamable(self):
+        """Whether the filter can be applied to partial sets of resources.
+
+        True for filters that evaluate each resource independently,
+        ie. only implement __call__.
+        """
+        return six.get_unbound_function(
+            type(self).process) is six.get_unbound_function(Filter.process)
+
+    def get_cost(self):
+        """Get the filter's cost class, used to order the filters of a block.
+
+        None for filters whose result depends on the resource set they're
+        given, or on the annotations of other filters, which are never
+        reordered.
+        """
+        if self.cost is not None:
+            return self.cost
+        if self.is_streamable():
+            return COST_MEMORY
+        return None
+
     def get_block_operator(self):
         """Determine the immediate parent boolean operator for a filter"""
         # Top level operator is `and`
@@ -220,6 +429,7 @@ class Filter(object):
         if not values and block_op != 'or':
             return
 
+        self.journal_annotation(r, self.matched_annotation_key)
         r_matched = r.setdefault(self.matched_annotation_key, [])
         for k in values:
             if k not in r_matched:
@@ -238,8 +448,74 @@ def intersect_list(a, b):
     return res
 
 
+def plan_filters(filters):
+    """Order a block's filters from cheapest to most expensive.
+
+    Filters without a cost class, and value filters matching on the
+    annotations of an earlier filter, stay in place with the other
+    filters only reordered between them. Filters of the same cost keep
+    their relative order.
+    """
+    plan, segment, annotations = [], [], set(['c7n'])
+
+    def flush():
+        plan.extend(sorted(segment, key=lambda f: f.get_cost()))
+        del segment[:]
+
+    for f in filters:
+        cost = f.get_cost() if isinstance(f, Filter) else None
+        key = isinstance(f, ValueFilter) and f.get_key() or ''
+        if cost is None or any(key.startswith(a) for a in annotations):
+            flush()
+            plan.append(f)
+        else:
+            segment.append(f)
+        for k in ('annotation_key', 'AnnotationKey'):
+            if getattr(f, k, None):
+                annotations.add(getattr(f, k))
+    flush()
+    return plan
+
+
+def explain_filters(filters, counts=None, depth=1):
+    """Describe the plan of a block's filters and their estimated api calls.
+
+    counts optionally maps filters to the number of resources they
+    evaluated, the api calls of boolean blocks are those of their filters.
+    """
+    lines = []
+    for idx, f in enumerate(plan_filters(filters), 1):
+        cost = f.get_cost()
+        evaluated = counts.get(id(f)) if counts is not None else None
+        name = f.type
+        if isinstance(f, ValueFilter) and f.get_key():
+            name = "%s %s" % (name, f.get_key())
+        line = "%s%d. %s cost:%s" % ('  ' * depth, idx, name, COST_NAMES[cost])
+        if counts is not None:
+            line = "%s resources:%s" % (line, evaluated is None and '-' or evaluated)
+        if isinstance(f, BooleanGroupFilter):
+            lines.append(line)
+            lines.extend(explain_filters(f.filters, counts, depth + 1))
+            continue
+        if cost == COST_MEMORY:
+            calls = '0'
+        elif cost == COST_BULK_API:
+            calls = evaluated != 0 and '1+' or '0'
+        elif cost == COST_RESOURCE_API:
+            calls = evaluated is None and 'per-resource' or str(evaluated)
+        else:
+            calls = '?'
+        if counts is not None and evaluated is None:
+            calls = '-'
+        lines.append("%s api-calls:%s" % (line, calls))
+    return lines
+
+
 class BooleanGroupFilter(Filter):
 
+    # journal of the annotations of the block's resources, while it runs
+    sweeper = None
+
     def __init__(self, data, registry, manager):
         super(BooleanGroupFilter, self).__init__(data)
         self.registry = registry
@@ -251,6 +527,24 @@ class BooleanGroupFilter(Filter):
             f.validate()
         return self
 
+    def get_cost(self):
+        costs = [f.get_cost() for f in self.filters]
+        if None in costs:
+            return None
+        return max(costs or [COST_MEMORY])
+
+    def process_filter(self, f, resources, event):
+        record = getattr(self.manager, 'record_filter', None)
+        if record is not None:
+            record(f, resources)
+        f.annotation_hook = self.journal_annotation
+        return f.process(resources, event)
+
+    def journal_annotation(self, r, key):
+        if self.sweeper is not None:
+            self.sweeper.record(r, key)
+        super(BooleanGroupFilter, self).journal_annotation(r, key)
+
 
 class Or(BooleanGroupFilter):
 
@@ -267,25 +561,41 @@ class Or(BooleanGroupFilter):
         return False
 
     def process_set(self, resources, event):
+        # Filters making api calls per resource only evaluate resources
+        # that previous filters haven't matched, and so only annotate
+        # those. Other filters, and all of them when a filter depends on
+        # the set of resources as a whole, evaluate every resource.
         resource_type = self.manager.get_model()
         resource_map = {r[resource_type.id]: r for r in resources}
+        short_circuit = None not in [f.get_cost() for f in self.filters]
         results = set()
-        for f in self.filters:
-            results = results.union([
-                r[resource_type.id] for r in f.process(resources, event)])
+        for f in plan_filters(self.filters):
+            subset = resources
+            if short_circuit and f.get_cost() == COST_RESOURCE_API:
+                subset = [r for r in resources if r[resource_type.id] not in results]
+                if not subset:
+                    continue
+            results.update([
+                r[resource_type.id] for r in self.process_filter(f, subset, event)])
         return [resource_map[r_id] for r_id in results]
 
 
 class And(BooleanGroupFilter):
 
+    def is_streamable(self):
+        return all(f.is_streamable() for f in self.filters)
+
     def process(self, resources, events=None):
         if self.manager:
-            sweeper = AnnotationSweeper(self.manager.get_model().id, resources)
+            self.sweeper = AnnotationSweeper(self.manager.get_model().id, resources)
 
-        for f in self.filters:
-            resources = f.process(resources, events)
-            if not resources:
-                break
+        try:
+            for f in plan_filters(self.filters):
+                resources = self.process_filter(f, resources, events)
+                if not resources:
+                    break
+        finally:
+            sweeper, self.sweeper = self.sweeper, None
 
         if self.manager:
             sweeper.sweep(resources)
@@ -313,12 +623,15 @@ class Not(BooleanGroupFilter):
     def process_set(self, resources, event):
         resource_type = self.manager.get_model()
         resource_map = {r[resource_type.id]: r for r in resources}
-        sweeper = AnnotationSweeper(resource_type.id, resources)
+        self.sweeper = AnnotationSweeper(resource_type.id, resources)
 
-        for f in self.filters:
-            resources = f.process(resources, event)
-            if not resources:
-                break
+        try:
+            for f in plan_filters(self.filters):
+                resources = self.process_filter(f, resources, event)
+                if not resources:
+                    break
+        finally:
+            sweeper, self.sweeper = self.sweeper, None
 
         before = set(resource_map.keys())
         after = set([r[resource_type.id] for r in resources])
@@ -331,28 +644,48 @@ class Not(BooleanGroupFilter):
 class AnnotationSweeper(object):
     """Support clearing annotations set within a block filter.
 
+    Rather than deep copying annotations, a journal records each
+    resource's annotation values by reference, and values the block's
+    filters modify in place are deep copied on their first modification,
+    see Filter.journal_annotation. Sweeping removes annotations added by
+    the block and restores the recorded values.
+
     See https://github.com/cloud-custodian/cloud-custodian/issues/2116
     """
     def __init__(self, id_key, resources):
         self.id_key = id_key
-        ra_map = {}
+        journal = {}
         resource_map = {}
         for r in resources:
-            ra_map[r[id_key]] = {k: v for k, v in r.items() if k.startswith('c7n')}
+            journal[r[id_key]] = {k: v for k, v in r.items() if k.startswith('c7n')}
             resource_map[r[id_key]] = r
-        # We keep a full copy of the annotation keys to allow restore.
-        self.ra_map = copy.deepcopy(ra_map)
+        self.journal = journal
         self.resource_map = resource_map
+        self.copies = {}
+        self.lock = threading.Lock()
+
+    def record(self, r, key):
+        entries = self.journal.get(r.get(self.id_key))
+        if entries is None or key not in entries:
+            return
+        with self.lock:
+            copies = self.copies.setdefault(r[self.id_key], {})
+            if key not in copies:
+                copies[key] = copy.deepcopy(entries[key])
 
     def sweep(self, resources):
-        for rid in set(self.ra_map).difference([
+        for rid in set(self.journal).difference([
                 r[self.id_key] for r in resources]):
-            # Clear annotations if the block filter didn't match
-            akeys = [k for k in self.resource_map[rid] if k.startswith('c7n')]
-            for k in akeys:
-                del self.resource_map[rid][k]
-            # Restore annotations that may have existed prior to the block filter.
-            self.resource_map[rid].update(self.ra_map[rid])
+            # Clear annotations if the block filter didn't match, and
+            # restore those that existed prior to the block filter.
+            r = self.resource_map[rid]
+            entries = self.journal[rid]
+            for k in [k for k in r if k.startswith('c7n')]:
+                if k not in entries:
+                    del r[k]
+            copies = self.copies.get(rid, {})
+            for k, v in entries.items():
+                r[k] = copies.get(k, v)
 
 
 class ValueFilter(Filter):
@@ -360,6 +693,9 @@ class ValueFilter(Filter):
     """
     expr = None
     op = v = vtype = None
+    # compiled match function, see compile()
+    matcher = None
+    _compile_pending = False
 
     schema = {
         'type': 'object',
@@ -414,6 +750,15 @@ class ValueFilter(Filter):
         return self
 
     def validate(self):
+        self._validate()
+        if 'value_from' in self.data:
+            # values are retrieved when the filter is first evaluated
+            self._compile_pending = True
+        else:
+            self.matcher = self.compile()
+        return self
+
+    def _validate(self):
         if len(self.data) == 1:
             return self
 
@@ -474,7 +819,13 @@ class ValueFilter(Filter):
         if self.data.get('value_type') == 'resource_count':
             return self.process(i)
 
-        matched = self.match(i)
+        if self._compile_pending:
+            self._compile_pending = False
+            self.matcher = self.compile()
+        if self.matcher is not None:
+            matched = self.matcher(i)
+        else:
+            matched = self.match(i)
         if matched and self.annotate:
             set_annotation(i, ANNOTATION_KEY, self.k)
         return matched
@@ -489,23 +840,90 @@ class ValueFilter(Filter):
 
         return super(ValueFilter, self).process(resources, event)
 
+    def is_streamable(self):
+        return (six.get_unbound_function(type(self).process) is
+                six.get_unbound_function(ValueFilter.process) and
+                self.data.get('value_type') != 'resource_count')
+
+    def get_key(self):
+        if len(self.data) == 1 and 'type' not in self.data:
+            return list(self.data.keys())[0]
+        return self.data.get('key') or ''
+
+    def compile(self):
+        """Compile the filter into a function matching a single resource.
+
+        The key accessor, value regex, value type conversion and operator
+        are resolved once, rather than per resource by match. Returns None
+        for subclasses customizing how values are matched, and for value
+        types that depend on other resource values.
+        """
+        klass = type(self)
+        for m in ('__call__', 'process', 'match', 'get_resource_value',
+                  'process_value_type'):
+            if six.get_unbound_function(getattr(klass, m)) is not \
+                    six.get_unbound_function(getattr(ValueFilter, m)):
+                return None
+        vtype = self.data.get('value_type')
+        if len(self.data) != 1 and vtype not in COMPILED_VALUE_TYPES:
+            return None
+
+        # initialize the filter's content as match would
+        self.match(None)
+        k, v, op_name = self.k, self.v, self.op
+        if len(self.data) == 1:
+            vtype = op_name = None
+        if not isinstance(k, six.string_types):
+            return None
+
+        accessor = compile_accessor(k)
+        if 'value_regex' in self.data:
+            get_value, capture = accessor, re.compile(self.data['value_regex']).match
+
+            def accessor(i):
+                r = get_value(i)
+                if r is None:
+                    return r
+                try:
+                    m = capture(r)
+                except (ValueError, TypeError):
+                    return None
+                return m.group(1) if m else None
+
+        convert = COMPILED_VALUE_TYPES.get(vtype)
+        if convert is not None:
+            convert = convert(v)
+        op = op_name and compile_operator(
+            op_name, convert is None and v or None) or None
+        empty_default = op_name in ('in', 'not-in')
+
+        def matcher(i):
+            r = accessor(i)
+            if empty_default and r is None:
+                r = ()
+            sentinel = v
+            if convert is not None:
+                sentinel, r = convert(r)
+            if r is None and sentinel == 'absent':
+                return True
+            elif r is not None and sentinel == 'present':
+                return True
+            elif sentinel == 'not-null' and r:
+                return True
+            elif sentinel == 'empty' and not r:
+                return True
+            elif op is not None:
+                try:
+                    return op(r, sentinel)
+                except TypeError:
+                    return False
+            return r == v
+        return matcher
+
     def get_resource_value(self, k, i):
         if k.startswith('tag:'):
-            tk = k.split(':', 1)[1]
-            r = None
-            if 'Tags' in i:
-                for t in i.get("Tags", []):
-                    if t.get('Key') == tk:
-                        r = t.get('Value')
-                        break
-            # GCP schema: 'labels': {'key': 'value'}
-            elif 'labels' in i:
-                r = i.get('labels', {}).get(tk, None)
-            # GCP has a secondary form of labels called tags
-            # as labels without values.
-            # Azure schema: 'tags': {'key': 'value'}
-            elif 'tags' in i:
-                r = i.get('tags', {}).get(tk, None)
+            # aws Tags, gcp labels and azure tags
+            r = get_tag_value(i, k.split(':', 1)[1])
         elif k in i:
             r = i.get(k)
         elif k not in self.expr:
@@ -568,6 +986,11 @@ class ValueFilter(Filter):
 
         return False
 
+    def get_network_set(self, values):
+        if getattr(self, '_network_set', (None,))[0] is not values:
+            self._network_set = (values, NetworkSet(values))
+        return self._network_set[1]
+
     def process_value_type(self, sentinel, value, resource):
         if self.vtype == 'normalize' and isinstance(value, six.string_types):
             return sentinel, value.strip().lower()
@@ -607,6 +1030,8 @@ class ValueFilter(Filter):
             # comparisons is intuitively wrong.
             return value, sentinel
         elif self.vtype == 'cidr':
+            if isinstance(sentinel, (list, tuple)):
+                return self.get_network_set(sentinel), parse_cidr(value)
             s = parse_cidr(sentinel)
             v = parse_cidr(value)
             if (isinstance(s, ipaddress._BaseAddress) and isinstance(v, ipaddress._BaseNetwork)):
@@ -652,7 +1077,7 @@ class AgeFilter(Filter):
     def get_resource_date(self, i):
         v = i[self.date_attribute]
         if not isinstance(v, datetime.datetime):
-            v = parse(v)
+            v = parse_timestamp(v)
         if not v.tzinfo:
             v = v.replace(tzinfo=tzutc())
         return v
@@ -683,6 +1108,7 @@ class EventFilter(ValueFilter):
 
     schema = type_schema('event', rinherit=ValueFilter.schema)
     schema_alias = True
+    cost = COST_MEMORY
 
     def validate(self):
         if 'mode' not in self.manager.data:
@@ -699,6 +1125,82 @@ class EventFilter(ValueFilter):
         return []
 
 
+# ISO 8601 timestamps as returned by most apis, ie. 2019-03-25T14:02:11.000Z
+ISO_TIMESTAMP = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?(Z|[+-]\d{2}:?\d{2})?)?$')
+
+TIMESTAMP_CACHE_SIZE = 50000
+
+
+class TimestampCache(object):
+    """Least recently used cache of parsed timestamp strings.
+
+    Resources commonly share timestamps, ie. snapshots from the same
+    schedule, and are evaluated by several filters in a policy.
+    """
+
+    def __init__(self, size=TIMESTAMP_CACHE_SIZE):
+        self.size = size
+        self.data = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, k):
+        with self.lock:
+            v = self.data.pop(k, None)
+            if v is not None:
+                self.data[k] = v
+            return v
+
+    def set(self, k, v):
+        with self.lock:
+            self.data[k] = v
+            if len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+
+_timestamp_cache = TimestampCache()
+
+
+def parse_iso_timestamp(v):
+    """Parse an ISO 8601 timestamp, returning None for other formats."""
+    m = ISO_TIMESTAMP.match(v)
+    if m is None:
+        return None
+    year, month, day, hour, minute, second, fraction, offset = m.groups()
+    tzinfo = None
+    if offset == 'Z':
+        tzinfo = tzutc()
+    elif offset:
+        offset = offset.replace(':', '')
+        seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+        tzinfo = seconds and tzoffset(None, offset[0] == '-' and -seconds or seconds) or tzutc()
+    try:
+        return datetime.datetime(
+            int(year), int(month), int(day),
+            int(hour or 0), int(minute or 0), int(second or 0),
+            int((fraction or '0').ljust(6, '0')), tzinfo)
+    except ValueError:
+        return None
+
+
+def parse_timestamp(v):
+    """Parse a timestamp string as dateutil's parser, memoizing results.
+
+    Raises ValueError for strings that aren't timestamps.
+    """
+    d = _timestamp_cache.get(v)
+    if d is None:
+        try:
+            d = parse_iso_timestamp(v) or parse(v)
+        except (AttributeError, TypeError, ValueError, OverflowError):
+            d = False
+        _timestamp_cache.set(v, d)
+    if d is False:
+        raise ValueError("invalid timestamp %r" % v)
+    return d
+
+
 def cast_tz(d, tz):
     if sys.version_info.major == 2:
         return d.replace(tzinfo=tz)
@@ -718,7 +1220,7 @@ def parse_date(v, tz=None):
 
     if isinstance(v, six.string_types):
         try:
-            return cast_tz(parse(v), tz)
+            return cast_tz(parse_timestamp(v), tz)
         except (AttributeError, TypeError, ValueError):
             pass
 
@@ -16,7 +16,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import itertools
 
 from c7n.utils import local_session, chunks, type_schema
-from .core import Filter
+from .core import Filter, COST_BULK_API
 from c7n.manager import resources
 
 
@@ -29,6 +29,8 @@ class HealthEventFilter(Filter):
 
     Custodian also supports responding to phd events via a lambda execution mode.
     """
+
+    cost = COST_BULK_API
     schema_alias = True
     schema = type_schema(
         'health-event',
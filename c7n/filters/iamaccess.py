@@ -36,13 +36,17 @@ References
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import collections
 import fnmatch
+import hashlib
 import logging
 import json
+import threading
 
 import six
 
 from c7n.filters import Filter
+from c7n.filters.core import COST_RESOURCE_API
 from c7n.resolver import ValuesFrom
 from c7n.utils import type_schema
 
@@ -57,6 +61,51 @@ def _account(arn):
     return arn.split(':', 5)[4]
 
 
+def _digest(text):
+    if isinstance(text, six.text_type):
+        text = text.encode('utf8')
+    return hashlib.sha256(text).hexdigest()
+
+
+def _config_value(v):
+    if isinstance(v, (set, frozenset)):
+        return sorted(repr(i) for i in v)
+    return repr(v)
+
+
+POLICY_CACHE_SIZE = 10000
+
+
+class PolicyEvaluationCache(object):
+    """Least recently used cache of resource policy evaluations.
+
+    Resources commonly carry identical policy documents, ie. stamped out
+    from templates, so evaluations are keyed by the checker and its
+    configuration, and a digest of the policy document.
+    """
+
+    def __init__(self, size=POLICY_CACHE_SIZE):
+        self.size = size
+        self.data = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, k):
+        with self.lock:
+            v = self.data.pop(k, None)
+            if v is not None:
+                self.data[k] = v
+            return v
+
+    def set(self, k, v):
+        with self.lock:
+            self.data[k] = v
+            if len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+
+_policy_cache = PolicyEvaluationCache()
+
+
 class PolicyChecker(object):
     """
     checker_config:
@@ -68,6 +117,10 @@ class PolicyChecker(object):
     """
     def __init__(self, checker_config):
         self.checker_config = checker_config
+        # statement actions and condition keys are commonly repeated
+        # across statements and policies.
+        self.action_matches = {}
+        self.condition_handlers = {}
 
     # Config properties
     @property
@@ -122,11 +175,18 @@ class PolicyChecker(object):
             actions = s.get('Action')
             actions = isinstance(actions, six.string_types) and (actions,) or actions
             for a in actions:
-                if fnmatch.filter(self.check_actions, a):
+                if self.match_action(a):
                     return True
             return False
         return True
 
+    def match_action(self, action):
+        matched = self.action_matches.get(action)
+        if matched is None:
+            matched = self.action_matches[action] = bool(
+                fnmatch.filter(self.check_actions, action))
+        return matched
+
     def handle_effect(self, s):
         if s['Effect'] == 'Allow':
             return True
@@ -184,14 +244,23 @@ class PolicyChecker(object):
             return False
         if c['key'] in self.whitelist_conditions:
             return True
-        handler_name = "handle_%s" % c['key'].replace('-', '_').replace(':', '_')
-        handler = getattr(self, handler_name, None)
+        handler = self.get_condition_handler(c['key'])
         if handler is None:
             log.warning("no handler:%s op:%s key:%s values:%s" % (
-                handler_name, c['op'], c['key'], c['values']))
+                self.get_condition_handler_name(c['key']),
+                c['op'], c['key'], c['values']))
             return
         return not handler(s, c)
 
+    def get_condition_handler_name(self, key):
+        return "handle_%s" % key.replace('-', '_').replace(':', '_')
+
+    def get_condition_handler(self, key):
+        if key not in self.condition_handlers:
+            self.condition_handlers[key] = getattr(
+                self, self.get_condition_handler_name(key), None)
+        return self.condition_handlers[key]
+
     def normalize_conditions(self, s):
         s_cond = []
         if 'Condition' not in s:
@@ -261,6 +330,8 @@ class CrossAccountAccessFilter(Filter):
     """Check a resource's embedded iam policy for cross account access.
     """
 
+    cost = COST_RESOURCE_API
+
     schema = type_schema(
         'cross-account',
         # only consider policies that grant one of the given actions.
@@ -304,7 +375,18 @@ class CrossAccountAccessFilter(Filter):
              'everyone_only': self.everyone_only,
              'whitelist_conditions': self.conditions})
         self.checker = self.checker_factory(self.checker_config)
-        return super(CrossAccountAccessFilter, self).process(resources, event)
+        self.checker_key = "%s.%s:%s" % (
+            self.checker.__class__.__module__, self.checker.__class__.__name__,
+            _digest(json.dumps(
+                self.checker_config, sort_keys=True, default=_config_value)))
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        results = super(CrossAccountAccessFilter, self).process(resources, event)
+        if self.cache_stats['misses']:
+            self.log.debug(
+                "cross-account policy evaluations:%d cache hits:%d",
+                self.cache_stats['hits'] + self.cache_stats['misses'],
+                self.cache_stats['hits'])
+        return results
 
     def get_accounts(self):
         owner_id = self.manager.config.account_id
@@ -339,11 +421,37 @@ class CrossAccountAccessFilter(Filter):
     def get_resource_policy(self, r):
         return r.get(self.policy_attribute, None)
 
+    def check_policy(self, policy):
+        """Check a resource policy, reusing evaluations of identical policies.
+
+        Resources with identical policies share the same violations.
+        """
+        text_key = None
+        if isinstance(policy, six.string_types):
+            text_key = (self.checker_key, _digest(policy))
+            violations = _policy_cache.get(text_key)
+            if violations is not None:
+                self.cache_stats['hits'] += 1
+                return violations
+            policy = json.loads(policy)
+
+        doc_key = (self.checker_key, _digest(json.dumps(policy, sort_keys=True)))
+        violations = _policy_cache.get(doc_key)
+        if violations is None:
+            self.cache_stats['misses'] += 1
+            violations = self.checker.check(policy)
+            _policy_cache.set(doc_key, violations)
+        else:
+            self.cache_stats['hits'] += 1
+        if text_key is not None:
+            _policy_cache.set(text_key, violations)
+        return violations
+
     def __call__(self, r):
         p = self.get_resource_policy(r)
         if p is None:
             return False
-        violations = self.checker.check(p)
+        violations = self.check_policy(p)
         if violations:
             r[self.annotation_key] = violations
             return True
@@ -16,11 +16,15 @@ CloudWatch Metrics suppport for resources
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import calendar
+import math
+
 from concurrent.futures import as_completed
 from datetime import datetime, timedelta
+from dateutil.tz import tzutc
 
 from c7n.exceptions import PolicyValidationError
-from c7n.filters.core import Filter, OPERATORS
+from c7n.filters.core import Filter, OPERATORS, COST_RESOURCE_API
 from c7n.utils import local_session, type_schema, chunks
 
 
@@ -31,8 +35,8 @@ class MetricsFilter(Filter):
 
     Docs on cloud watch metrics
 
-    - GetMetricStatistics
-      https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/API_GetMetricStatistics.html
+    - GetMetricData
+      https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/API_GetMetricData.html
 
     - Supported Metrics
       https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/aws-services-cloudwatch-metrics.html
@@ -76,9 +80,15 @@ class MetricsFilter(Filter):
     Rather than skipping those resources, "missing-value: 0" causes the
     policy to treat their request counts as 0.
 
+    Metrics for up to 500 resources are retrieved with each call to
+    GetMetricData, fewer when the period is short relative to the days
+    queried.
+
     Note the default statistic for metrics is Average.
     """
 
+    cost = COST_RESOURCE_API
+
     schema = type_schema(
         'metrics',
         **{'namespace': {'type': 'string'},
@@ -99,11 +109,21 @@ class MetricsFilter(Filter):
            'missing-value': {'type': 'number'},
            'required': ('value', 'name')})
     schema_alias = True
-    permissions = ("cloudwatch:GetMetricStatistics",)
+    permissions = ("cloudwatch:GetMetricData",)
 
     MAX_QUERY_POINTS = 50850
     MAX_RESULT_POINTS = 1440
 
+    # GetMetricData accepts up to 500 metric queries per call, and
+    # returns up to 100,800 datapoints per call.
+    MAX_METRIC_QUERIES = 500
+    MAX_METRIC_DATA_POINTS = 100800
+
+    # Datapoints are kept in the datapoint cache once their period
+    # ended this long ago, cloudwatch may still be aggregating later
+    # ones.
+    CACHE_SETTLE = timedelta(hours=1)
+
     # Default per service, for overloaded services like ec2
     # we do type specific default namespace annotation
     # specifically AWS/EBS and AWS/EC2Spot
@@ -155,11 +175,13 @@ class MetricsFilter(Filter):
                 ns = self.DEFAULT_NAMESPACE[self.model.service]
         self.namespace = ns
 
+        self.cache = self.get_datapoint_cache()
+
         self.log.debug("Querying metrics for %d", len(resources))
         matched = []
         with self.executor_factory(max_workers=3) as w:
             futures = []
-            for resource_set in chunks(resources, 50):
+            for resource_set in chunks(resources, self.get_batch_size()):
                 futures.append(
                     w.submit(self.process_resource_set, resource_set))
 
@@ -183,35 +205,156 @@ class MetricsFilter(Filter):
             dims.append({'Name': k, 'Value': v})
         return dims
 
+    def get_batch_size(self):
+        # Size batches so a query's datapoints for the whole range
+        # fit in a single page of results.
+        points = max(1, int(math.ceil(
+            (self.end - self.start).total_seconds() / self.period)))
+        return max(1, min(
+            self.MAX_METRIC_QUERIES, self.MAX_METRIC_DATA_POINTS // points))
+
+    def get_datapoint_cache(self):
+        """Cache to keep datapoints in across runs, if any.
+
+        Only windows of several periods are cached, as a single period
+        spanning the whole window has a different value every run.
+        """
+        if self.period >= (self.end - self.start).total_seconds():
+            return None
+        if self.period % 60:
+            return None
+        cache = self.manager._cache
+        if not cache.load():
+            return None
+        return cache
+
+    def get_cache_key(self, dimensions):
+        return {
+            'account': self.manager.config.account_id,
+            'region': self.manager.config.region,
+            'namespace': self.namespace,
+            'metric': self.metric,
+            'statistic': self.statistics,
+            'period': self.period,
+            'dimensions': sorted(
+                (d['Name'], d['Value']) for d in dimensions)}
+
+    def get_datapoints(self, client, queries):
+        """Retrieve datapoints for a set of metric queries.
+
+        With a datapoint cache, queries only retrieve the datapoints
+        since the ones cached by previous runs, and the settled
+        datapoints of the window are cached for the next run.
+        """
+        if self.cache is None:
+            return self.get_metric_data(client, queries, self.start)
+
+        # Cached datapoints are aligned to the period, so datapoints
+        # of successive runs share timestamps, and trimmed back to the
+        # window when evaluated.
+        start = _epoch(self.start)
+        aligned = start - start % self.period
+        cached = {}
+        since_queries = {}
+        for qid, dimensions in queries.items():
+            entry = self.cache.get(self.get_cache_key(dimensions))
+            since = aligned
+            if entry is not None and entry['until'] > aligned:
+                cached[qid] = [p for p in entry['points'] if p[0] >= aligned]
+                since = entry['until']
+            since_queries.setdefault(since, {})[qid] = dimensions
+
+        fetched = {}
+        for since, since_set in since_queries.items():
+            fetched.update(self.get_metric_data(
+                client, since_set, datetime.utcfromtimestamp(since)))
+
+        settled = _epoch(self.end - self.CACHE_SETTLE)
+        settled -= settled % self.period
+        results = {}
+        for qid, dimensions in queries.items():
+            points = dict(cached.get(qid, ()))
+            for p in fetched[qid]:
+                points[_epoch(p['Timestamp'])] = p[self.statistics]
+            points = sorted(points.items(), reverse=True)
+            results[qid] = [
+                {'Timestamp': datetime.fromtimestamp(ts, tzutc()),
+                 self.statistics: v} for ts, v in points if ts >= start]
+            self.cache.save(
+                self.get_cache_key(dimensions),
+                {'until': max(settled, aligned),
+                 'points': [p for p in points if p[0] + self.period <= settled]},
+                ttl=int((self.end - self.start).total_seconds()) + self.period)
+        self.log.debug(
+            "Using cached datapoints for %d of %d metric queries",
+            len(cached), len(queries))
+        return results
+
+    def get_metric_data(self, client, queries, start):
+        """Retrieve datapoints for a set of metric queries.
+
+        Queries are a mapping of query id to dimensions, and results
+        are a mapping of query id to datapoints, in the same form as
+        GetMetricStatistics returns them, latest first.
+        """
+        metric_queries = []
+        for qid, dimensions in queries.items():
+            metric_queries.append({
+                'Id': qid,
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': self.namespace,
+                        'MetricName': self.metric,
+                        'Dimensions': dimensions},
+                    'Period': self.period,
+                    'Stat': self.statistics},
+                'ReturnData': True})
+
+        results = {qid: [] for qid in queries}
+        paginator = client.get_paginator('get_metric_data')
+        for page in paginator.paginate(
+                MetricDataQueries=metric_queries,
+                StartTime=start,
+                EndTime=self.end,
+                ScanBy='TimestampDescending'):
+            for result in page['MetricDataResults']:
+                results[result['Id']].extend(
+                    {'Timestamp': ts, self.statistics: v}
+                    for ts, v in zip(result['Timestamps'], result['Values']))
+        return results
+
     def process_resource_set(self, resource_set):
         client = local_session(
             self.manager.session_factory).client('cloudwatch')
 
-        matched = []
-        for r in resource_set:
+        # Note this annotation cache is policy scoped, not across
+        # policies, still the lack of full qualification on the key
+        # means multiple filters within a policy using the same metric
+        # across different periods or dimensions would be problematic.
+        key = "%s.%s.%s" % (self.namespace, self.metric, self.statistics)
+
+        queries = {}
+        for idx, r in enumerate(resource_set):
+            collected_metrics = r.setdefault('c7n.metrics', {})
+            if key in collected_metrics:
+                continue
+            self.journal_annotation(r, 'c7n.metrics')
             # if we overload dimensions with multiple resources we get
             # the statistics/average over those resources.
             dimensions = self.get_dimensions(r)
             # Merge in any filter specified metrics, get_dimensions is
             # commonly overridden so we can't do it there.
             dimensions.extend(self.get_user_dimensions())
+            queries['m%d' % idx] = dimensions
 
-            collected_metrics = r.setdefault('c7n.metrics', {})
-            # Note this annotation cache is policy scoped, not across
-            # policies, still the lack of full qualification on the key
-            # means multiple filters within a policy using the same metric
-            # across different periods or dimensions would be problematic.
-            key = "%s.%s.%s" % (self.namespace, self.metric, self.statistics)
-            if key not in collected_metrics:
-                collected_metrics[key] = client.get_metric_statistics(
-                    Namespace=self.namespace,
-                    MetricName=self.metric,
-                    Statistics=[self.statistics],
-                    StartTime=self.start,
-                    EndTime=self.end,
-                    Period=self.period,
-                    Dimensions=dimensions)['Datapoints']
+        if queries:
+            for qid, datapoints in self.get_datapoints(
+                    client, queries).items():
+                resource_set[int(qid[1:])]['c7n.metrics'][key] = datapoints
 
+        matched = []
+        for r in resource_set:
+            collected_metrics = r['c7n.metrics']
             # In certain cases CloudWatch reports no data for a metric.
             # If the policy specifies a fill value for missing data, add
             # that here before testing for matches. Otherwise, skip
@@ -219,6 +362,7 @@ class MetricsFilter(Filter):
             if len(collected_metrics[key]) == 0:
                 if 'missing-value' not in self.data:
                     continue
+                self.journal_annotation(r, 'c7n.metrics')
                 collected_metrics[key].append({
                     'Timestamp': self.start,
                     self.statistics: self.data['missing-value'],
@@ -238,6 +382,13 @@ class MetricsFilter(Filter):
         return matched
 
 
+def _epoch(dt):
+    """Seconds since the epoch of a datetime, naive datetimes are utc."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(tzutc()).replace(tzinfo=None)
+    return calendar.timegm(dt.timetuple()) + dt.microsecond / 1e6
+
+
 class ShieldMetrics(MetricsFilter):
     """Specialized metrics filter for shield
     """
@@ -244,7 +244,8 @@ from dateutil import zoneinfo, tz as tzutil
 
 from c7n.exceptions import PolicyValidationError
 from c7n.filters import Filter
-from c7n.utils import type_schema, dumps
+from c7n.filters.core import COST_MEMORY
+from c7n.utils import type_schema, dumps, get_tag_map
 from c7n.resolver import ValuesFrom
 
 log = logging.getLogger('custodian.offhours')
@@ -263,6 +264,9 @@ class Time(Filter):
     Schedule offhours for resources see :ref:`offhours <offhours>`
     for features and configuration.
     """
+
+    cost = COST_MEMORY
+
     schema = {
         'type': 'object',
         'properties': {
@@ -332,6 +336,10 @@ class Time(Filter):
         self.parser = ScheduleParser(self.default_schedule)
 
         self.id_key = None
+        # schedules by tag value, and the run's current hour by timezone
+        self.schedules = {}
+        self.run_hours = None
+        self.run_skip_days = None
 
         self.opted_out = []
         self.parse_errors = []
@@ -353,7 +361,12 @@ class Time(Filter):
         return self
 
     def process(self, resources, event=None):
-        resources = super(Time, self).process(resources)
+        # skip days and the current hour are resolved once per run
+        self.run_hours = {}
+        try:
+            resources = super(Time, self).process(resources)
+        finally:
+            self.run_skip_days = self.run_hours = None
         if self.parse_errors and self.manager and self.manager.ctx.log_dir:
             self.log.warning("parse errors %d", len(self.parse_errors))
             with open(join(
@@ -405,18 +418,11 @@ class Time(Filter):
         # dateutil.parser.parse to process: value='off=(m-f,1);' properly.
         # before this normalization, some cases would silently fail.
         value = ';'.join(filter(None, value.split(';')))
-        if self.parser.has_resource_schedule(value, time_type):
-            schedule = self.parser.parse(value)
-        elif self.parser.keys_are_valid(value):
-            # respect timezone from tag
-            raw_data = self.parser.raw_data(value)
-            if 'tz' in raw_data:
-                schedule = dict(self.default_schedule)
-                schedule['tz'] = raw_data['tz']
-            else:
-                schedule = self.default_schedule
+        if (value, time_type) in self.schedules:
+            schedule = self.schedules[(value, time_type)]
         else:
-            schedule = None
+            schedule = self.schedules[(value, time_type)] = self.get_schedule(
+                value, time_type)
         if schedule is None:
             log.warning(
                 "Invalid schedule on resource:%s value:%s", rid, value)
@@ -428,18 +434,47 @@ class Time(Filter):
                 "Could not resolve tz on resource:%s value:%s", rid, value)
             self.parse_errors.append((rid, value))
             return False
-        now = datetime.datetime.now(tz).replace(
-            minute=0, second=0, microsecond=0)
-        now_str = now.strftime("%Y-%m-%d")
-        if 'skip-days-from' in self.data:
-            values = ValuesFrom(self.data['skip-days-from'], self.manager)
-            self.skip_days = values.get_values()
+        now, now_str = self.get_now(schedule['tz'], tz)
+        if self.run_hours is None:
+            self.skip_days = self.get_skip_days()
         else:
-            self.skip_days = self.data.get('skip-days', [])
+            if self.run_skip_days is None:
+                self.run_skip_days = self.get_skip_days()
+            self.skip_days = self.run_skip_days
         if now_str in self.skip_days:
             return False
         return self.match(now, schedule)
 
+    def get_schedule(self, value, time_type):
+        """Get the schedule of a normalized tag value, or None if invalid."""
+        if self.parser.has_resource_schedule(value, time_type):
+            return self.parser.parse(value)
+        elif self.parser.keys_are_valid(value):
+            # respect timezone from tag
+            raw_data = self.parser.raw_data(value)
+            if 'tz' in raw_data:
+                schedule = dict(self.default_schedule)
+                schedule['tz'] = raw_data['tz']
+                return schedule
+            return self.default_schedule
+
+    def get_now(self, tz_name, tz):
+        """Get the current hour in a timezone, and its date string."""
+        if self.run_hours is not None and tz_name in self.run_hours:
+            return self.run_hours[tz_name]
+        now = datetime.datetime.now(tz).replace(
+            minute=0, second=0, microsecond=0)
+        hour = (now, now.strftime("%Y-%m-%d"))
+        if self.run_hours is not None:
+            self.run_hours[tz_name] = hour
+        return hour
+
+    def get_skip_days(self):
+        if 'skip-days-from' in self.data:
+            values = ValuesFrom(self.data['skip-days-from'], self.manager)
+            return values.get_values()
+        return self.data.get('skip-days', [])
+
     def match(self, now, schedule):
         time = schedule.get(self.time_type, ())
         for item in time:
@@ -451,11 +486,7 @@ class Time(Filter):
     def get_tag_value(self, i):
         """Get the resource's tag value specifying its schedule."""
         # Look for the tag, Normalize tag key and tag value
-        found = False
-        for t in i.get('Tags', ()):
-            if t['Key'].lower() == self.tag_key:
-                found = t['Value']
-                break
+        found = (get_tag_map(i, lower=True) or {}).get(self.tag_key, False)
         if found is False:
             return False
         # enforce utf8, or do translate tables via unicode ord mapping
@@ -465,12 +496,19 @@ class Time(Filter):
         value = value.strip("'").strip('"')
         return value
 
+    _tz_cache = {}
+
     @classmethod
     def get_tz(cls, tz):
+        if tz in cls._tz_cache:
+            return cls._tz_cache[tz]
         found = cls.TZ_ALIASES.get(tz)
         if found:
-            return tzutil.gettz(found)
-        return tzutil.gettz(tz.title())
+            resolved = tzutil.gettz(found)
+        else:
+            resolved = tzutil.gettz(tz.title())
+        cls._tz_cache[tz] = resolved
+        return resolved
 
     def get_default_schedule(self):
         raise NotImplementedError("use subclass")
@@ -14,21 +14,105 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import importlib
+import logging
+import threading
 
 import jmespath
 
-from .core import ValueFilter, OPERATORS
+from .core import ValueFilter, OPERATORS, COST_BULK_API
+
+log = logging.getLogger('custodian.filters.related')
+
+
+class RelatedIndex(object):
+    """Related resources retrieved during an execution, by id.
+
+    Shared by the related resource filters of a run's policies, and
+    keyed by resource type, account and region. Filters only fetch the
+    related ids the index doesn't already have (or know to be missing),
+    and once a type's full population has been fetched all lookups are
+    served from the index.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.stats = {'lookups': 0, 'fetches': 0, 'hits': 0}
+
+    @staticmethod
+    def get_key(manager):
+        return (
+            "%s.%s" % (manager.__class__.__module__, manager.__class__.__name__),
+            manager.config.account_id,
+            manager.config.region)
+
+    def _get_entry(self, manager):
+        return self.entries.setdefault(
+            self.get_key(manager),
+            {'resources': {}, 'missing': set(), 'complete': False})
+
+    def get(self, manager, ids, threshold):
+        """Get the related resources with the given ids.
+
+        Ids the index doesn't have are fetched individually when there
+        are fewer than threshold of them, otherwise the full population
+        of the related resource type is fetched.
+        """
+        with self.lock:
+            entry = self._get_entry(manager)
+            resources = entry['resources']
+            self.stats['lookups'] += 1
+            wanted = set()
+            if not entry['complete']:
+                wanted = set(ids).difference(resources, entry['missing'])
+            if wanted and len(wanted) < threshold:
+                self._add(manager, entry, manager.get_resources(list(wanted)))
+                entry['missing'].update(wanted.difference(resources))
+            elif wanted:
+                self._add(manager, entry, manager.resources())
+                entry['complete'] = True
+            else:
+                self.stats['hits'] += 1
+            return {rid: resources[rid] for rid in ids if rid in resources}
+
+    def get_all(self, manager):
+        """Get the full population of a related resource type."""
+        with self.lock:
+            entry = self._get_entry(manager)
+            self.stats['lookups'] += 1
+            if entry['complete']:
+                self.stats['hits'] += 1
+            else:
+                self._add(manager, entry, manager.resources())
+                entry['complete'] = True
+            return list(entry['resources'].values())
+
+    def _add(self, manager, entry, resources):
+        self.stats['fetches'] += 1
+        id_key = manager.get_model().id
+        for r in resources:
+            entry['resources'][r[id_key]] = r
+
+    def report(self):
+        if self.stats['lookups']:
+            log.info(
+                "related index lookups:%d fetches:%d hits:%d",
+                self.stats['lookups'], self.stats['fetches'], self.stats['hits'])
+        return dict(self.stats)
 
 
 class RelatedResourceFilter(ValueFilter):
 
     schema_alias = False
+    cost = COST_BULK_API
 
     RelatedResource = None
     RelatedIdsExpression = None
     AnnotationKey = None
     FetchThreshold = 10
 
+    _related_manager = None
+
     def get_permissions(self):
         return self.get_resource_manager().get_permissions()
 
@@ -53,6 +137,9 @@ class RelatedResourceFilter(ValueFilter):
     def get_related(self, resources):
         resource_manager = self.get_resource_manager()
         related_ids = self.get_related_ids(resources)
+        index = getattr(self.manager.ctx, 'related_index', None)
+        if index is not None:
+            return index.get(resource_manager, related_ids, self.FetchThreshold)
         model = resource_manager.get_model()
         if len(related_ids) < self.FetchThreshold:
             related = resource_manager.get_resources(list(related_ids))
@@ -61,11 +148,21 @@ class RelatedResourceFilter(ValueFilter):
         return {r[model.id]: r for r in related
                 if r[model.id] in related_ids}
 
+    def get_related_resources(self):
+        """Get the full population of the related resource type."""
+        resource_manager = self.get_resource_manager()
+        index = getattr(self.manager.ctx, 'related_index', None)
+        if index is not None:
+            return index.get_all(resource_manager)
+        return resource_manager.resources()
+
     def get_resource_manager(self):
-        mod_path, class_name = self.RelatedResource.rsplit('.', 1)
-        module = importlib.import_module(mod_path)
-        manager_class = getattr(module, class_name)
-        return manager_class(self.manager.ctx, {})
+        if self._related_manager is None:
+            mod_path, class_name = self.RelatedResource.rsplit('.', 1)
+            module = importlib.import_module(mod_path)
+            manager_class = getattr(module, class_name)
+            self._related_manager = manager_class(self.manager.ctx, {})
+        return self._related_manager
 
     def process_resource(self, resource, related):
         related_ids = self.get_related_ids([resource])
@@ -25,6 +25,7 @@ from dateutil.tz import tzlocal, tzutc
 
 from c7n.exceptions import PolicyValidationError, ClientError
 from c7n.filters import Filter
+from c7n.filters.core import COST_RESOURCE_API
 from c7n.manager import resources
 from c7n.utils import local_session, type_schema
 
@@ -52,6 +53,8 @@ class Diff(Filter):
     against a locked version (requires use of is-locked filter).
     """
 
+    cost = COST_RESOURCE_API
+
     schema = type_schema(
         'diff',
         selector={'enum': ['previous', 'date', 'locked']},
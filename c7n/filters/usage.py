@@ -0,0 +1,270 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Account wide usage graph for used and unused filters.
+
+Scanners enumerate a resource type and return the references its
+resources make to other resources, ie. the security groups attached
+to network interfaces, as edges from the referenced id to the
+referencing resource. The graph runs each scanner at most once per
+execution, and once per cache period when a resource cache is
+configured, and shares the scanned resource populations between
+scanners.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import logging
+import threading
+
+from c7n.registry import PluginRegistry
+
+log = logging.getLogger('custodian.usage')
+
+scanners = PluginRegistry('c7n.usage.scanners')
+
+
+class UsageGraph(object):
+    """References between resources, by scanner, account and region.
+
+    custodian run shares one graph across its policies, otherwise a
+    graph is scoped to a policy execution.
+    """
+
+    def __init__(self):
+        self.edges = {}
+        self.populations = {}
+        self.lock = threading.RLock()
+        self.stats = {}
+
+    @classmethod
+    def from_manager(cls, manager):
+        graph = getattr(manager.ctx, 'usage_graph', None)
+        if graph is None:
+            graph = manager.ctx.usage_graph = cls()
+        return graph
+
+    @staticmethod
+    def get_cache_key(manager, scanner):
+        return {'account': manager.config.account_id,
+                'region': manager.config.region,
+                'usage': scanner}
+
+    def resources(self, manager, resource_type):
+        """Get a resource type's population, shared by scanners."""
+        key = (manager.config.account_id, manager.config.region, resource_type)
+        with self.lock:
+            if key not in self.populations:
+                self.populations[key] = manager.get_resource_manager(
+                    resource_type).resources()
+            return self.populations[key]
+
+    def get_edges(self, manager, scanner):
+        """Get a scanner's references, as a mapping of id to referencing ids."""
+        cache_key = self.get_cache_key(manager, scanner)
+        key = (cache_key['account'], cache_key['region'], scanner)
+        with self.lock:
+            edges = self.edges.get(key)
+            if edges is not None:
+                return edges
+            stats = self.stats.setdefault(
+                scanner, {'scans': 0, 'cached': 0, 'references': 0})
+            edges = manager._cache.get(cache_key)
+            if edges is None:
+                edges = {}
+                for target, source in scanners.get(scanner)(self, manager):
+                    edges.setdefault(target, set()).add(source)
+                manager._cache.save(cache_key, edges)
+                stats['scans'] += 1
+            else:
+                stats['cached'] += 1
+            stats['references'] = len(edges)
+            log.debug("%s references %d resources", scanner, len(edges))
+            self.edges[key] = edges
+            return edges
+
+    def get_targets(self, manager, scanner_names, sources=None):
+        """Ids referenced by the resources of the given scanners.
+
+        Optionally only those referenced by the given source ids.
+        """
+        targets = set()
+        for scanner in scanner_names:
+            for target, target_sources in self.get_edges(manager, scanner).items():
+                if sources is None or not target_sources.isdisjoint(sources):
+                    targets.add(target)
+        return targets
+
+    def get_referrers(self, manager, targets, scanner_names):
+        """Resources referencing any of the given ids, by scanner."""
+        referrers = {}
+        for scanner in scanner_names:
+            edges = self.get_edges(manager, scanner)
+            sources = set()
+            for t in targets:
+                sources.update(edges.get(t, ()))
+            if sources:
+                referrers[scanner] = sorted(sources)
+        return referrers
+
+    def report(self):
+        for scanner, stats in sorted(self.stats.items()):
+            log.info(
+                "usage scanner:%s scans:%d cached:%d references:%d",
+                scanner, stats['scans'], stats['cached'], stats['references'])
+        return dict(self.stats)
+
+
+# Security groups
+
+@scanners.register('eni-security-groups')
+def scan_eni_security_groups(graph, manager):
+    for nic in graph.resources(manager, 'eni'):
+        for g in nic['Groups']:
+            yield g['GroupId'], nic['NetworkInterfaceId']
+
+
+@scanners.register('security-group-references')
+def scan_security_group_references(graph, manager):
+    for sg in graph.resources(manager, 'security-group'):
+        for perm_type in ('IpPermissions', 'IpPermissionsEgress'):
+            for p in sg.get(perm_type, []):
+                for g in p.get('UserIdGroupPairs', ()):
+                    yield g['GroupId'], sg['GroupId']
+
+
+@scanners.register('lambda-security-groups')
+def scan_lambda_security_groups(graph, manager):
+    for func in graph.resources(manager, 'lambda'):
+        if 'VpcConfig' not in func:
+            continue
+        for g in func['VpcConfig']['SecurityGroupIds']:
+            yield g, func['FunctionName']
+
+
+@scanners.register('launch-config-security-groups')
+def scan_launch_config_security_groups(graph, manager):
+    for cfg in graph.resources(manager, 'launch-config'):
+        for g in cfg['SecurityGroups']:
+            yield g, cfg['LaunchConfigurationName']
+        for g in cfg['ClassicLinkVPCSecurityGroups']:
+            yield g, cfg['LaunchConfigurationName']
+
+
+# Iam roles and instance profiles
+
+@scanners.register('lambda-roles')
+def scan_lambda_roles(graph, manager):
+    for func in graph.resources(manager, 'lambda'):
+        if 'Role' in func:
+            yield func['Role'], func['FunctionName']
+
+
+@scanners.register('ecs-service-roles')
+def scan_ecs_service_roles(graph, manager):
+    for service in graph.resources(manager, 'ecs-service'):
+        if 'roleArn' in service:
+            yield service['roleArn'], service['serviceArn']
+
+
+@scanners.register('launch-config-instance-profiles')
+def scan_launch_config_instance_profiles(graph, manager):
+    for cfg in graph.resources(manager, 'launch-config'):
+        if 'IamInstanceProfile' in cfg:
+            yield cfg['IamInstanceProfile'], cfg['LaunchConfigurationName']
+
+
+@scanners.register('ec2-instance-profiles')
+def scan_ec2_instance_profiles(graph, manager):
+    for e in graph.resources(manager, 'ec2'):
+        # do not include instances that have been recently terminated
+        if e['State']['Name'] == 'terminated':
+            continue
+        profile_arn = e.get('IamInstanceProfile', {}).get('Arn', None)
+        if not profile_arn:
+            continue
+        # split arn to get the profile name
+        yield profile_arn.split('/')[-1], e['InstanceId']
+
+
+@scanners.register('instance-profile-roles')
+def scan_instance_profile_roles(graph, manager):
+    for p in graph.resources(manager, 'iam-profile'):
+        for role in p.get('Roles', []):
+            yield role['RoleName'], p['InstanceProfileName']
+
+
+# Images and snapshots
+
+@scanners.register('asg-launch-configs')
+def scan_asg_launch_configs(graph, manager):
+    for a in graph.resources(manager, 'asg'):
+        if 'LaunchConfigurationName' in a:
+            yield a['LaunchConfigurationName'], a['AutoScalingGroupName']
+
+
+def _asg_template_versions(graph, manager):
+    key = (manager.config.account_id, manager.config.region, 'asg-template-versions')
+    with graph.lock:
+        if key not in graph.populations:
+            tmpl_mgr = manager.get_resource_manager('launch-template-version')
+            graph.populations[key] = tmpl_mgr.get_resources(list(
+                tmpl_mgr.get_asg_templates(graph.resources(manager, 'asg')).keys()))
+        return graph.populations[key]
+
+
+def _template_version_id(tversion):
+    return "%s:%s" % (tversion['LaunchTemplateId'], tversion['VersionNumber'])
+
+
+@scanners.register('asg-launch-template-images')
+def scan_asg_launch_template_images(graph, manager):
+    for tversion in _asg_template_versions(graph, manager):
+        image_id = tversion['LaunchTemplateData'].get('ImageId')
+        if image_id:
+            yield image_id, _template_version_id(tversion)
+
+
+@scanners.register('asg-launch-template-snapshots')
+def scan_asg_launch_template_snapshots(graph, manager):
+    for tversion in _asg_template_versions(graph, manager):
+        for bd in tversion['LaunchTemplateData'].get('BlockDeviceMappings', ()):
+            if 'Ebs' in bd and 'SnapshotId' in bd['Ebs']:
+                yield bd['Ebs']['SnapshotId'], _template_version_id(tversion)
+
+
+@scanners.register('launch-config-images')
+def scan_launch_config_images(graph, manager):
+    for cfg in graph.resources(manager, 'launch-config'):
+        yield cfg['ImageId'], cfg['LaunchConfigurationName']
+
+
+@scanners.register('launch-config-snapshots')
+def scan_launch_config_snapshots(graph, manager):
+    for cfg in graph.resources(manager, 'launch-config'):
+        for b in cfg.get('BlockDeviceMappings'):
+            if 'Ebs' in b and 'SnapshotId' in b['Ebs']:
+                yield b['Ebs']['SnapshotId'], cfg['LaunchConfigurationName']
+
+
+@scanners.register('ec2-images')
+def scan_ec2_images(graph, manager):
+    for i in graph.resources(manager, 'ec2'):
+        yield i['ImageId'], i['InstanceId']
+
+
+@scanners.register('ami-snapshots')
+def scan_ami_snapshots(graph, manager):
+    for i in graph.resources(manager, 'ami'):
+        for dev in i.get('BlockDeviceMappings'):
+            if 'Ebs' in dev and 'SnapshotId' in dev['Ebs']:
+                yield dev['Ebs']['SnapshotId'], i['ImageId']
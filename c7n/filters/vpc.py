@@ -16,7 +16,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 from c7n.exceptions import PolicyValidationError
 from c7n.utils import local_session, type_schema
 
-from .core import Filter, ValueFilter
+from .core import Filter, ValueFilter, COST_BULK_API
 from .related import RelatedResourceFilter
 
 
@@ -69,6 +69,7 @@ class DefaultVpcBase(Filter):
     vpcs = None
     default_vpc = None
     permissions = ('ec2:DescribeVpcs',)
+    cost = COST_BULK_API
 
     def match(self, vpc_id):
         if self.default_vpc is None:
@@ -110,6 +111,8 @@ class NetworkLocation(Filter):
                 isolation-group: sg-xxxxxxxx
     """
 
+    cost = COST_BULK_API
+
     schema = type_schema(
         'network-location',
         **{'missing-ok': {
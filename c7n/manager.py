@@ -45,6 +45,8 @@ class ResourceManager(object):
         self.config = ctx.options
         self.data = data
         self._cache = cache.factory(self.ctx.options)
+        # number of resources each filter has evaluated
+        self.filter_counts = {}
         self.log = logging.getLogger('custodian.resources.%s' % (
             self.__class__.__name__.lower()))
 
@@ -94,15 +96,19 @@ class ResourceManager(object):
             return klass(self.ctx, {'source': self.source_type})
         return klass(self.ctx, data or {})
 
-    def filter_resources(self, resources, event=None):
+    def filter_resources(self, resources, event=None, filters=None):
+        from c7n.filters.core import plan_filters
+        if filters is None:
+            filters = self.filters
         original = len(resources)
         if event and event.get('debug', False):
             self.log.info(
-                "Filtering resources with %s", self.filters)
-        for f in self.filters:
+                "Filtering resources with %s", filters)
+        for f in plan_filters(filters):
             if not resources:
                 break
             rcount = len(resources)
+            self.record_filter(f, resources)
 
             with self.ctx.tracer.subsegment("filter:%s" % f.type):
                 resources = f.process(resources, event)
@@ -114,6 +120,9 @@ class ResourceManager(object):
             original, len(resources), self.__class__.__name__.lower()))
         return resources
 
+    def record_filter(self, f, resources):
+        self.filter_counts[id(f)] = self.filter_counts.get(id(f), 0) + len(resources)
+
     def get_model(self):
         """Returns the resource meta-model.
         """
@@ -0,0 +1,136 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Share resource fetches across the policies of a run.
+
+Pull mode policies are grouped by the cache key of their resource
+manager, ie. provider, account, region, resource type and source, along
+with the policy's query. The first policy of a group to execute fetches and augments the
+resources, subsequent policies in the group receive a private copy to
+filter and annotate, and the group's resources are released after its
+last policy executes.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import copy
+import json
+import logging
+
+log = logging.getLogger('custodian.planner')
+
+
+class FetchPlanner(object):
+
+    def __init__(self, policies):
+        self.groups = {}
+        self.policy_keys = {}
+        self.consumed = set()
+        self.shared = set()
+        self.stats = {'policies': 0, 'groups': 0, 'fetches': 0, 'shared': 0}
+        self.plan(policies)
+
+    @staticmethod
+    def get_key(policy):
+        m = policy.resource_manager
+        return json.dumps(
+            [policy.provider_name, m.get_cache_key(None), policy.data.get('query')],
+            sort_keys=True, default=str)
+
+    def plan(self, policies):
+        candidates = {}
+        for p in policies:
+            if not p.options.dryrun and p.execution_mode != 'pull':
+                continue
+            # streaming policies don't retain the resource population
+            if p.data.get('stream') or not hasattr(p.resource_manager, 'get_cache_key'):
+                continue
+            key = self.get_key(p)
+            candidates.setdefault(key, []).append(p)
+
+        for key, group in candidates.items():
+            if len(group) < 2:
+                continue
+            self.groups[key] = {'remaining': len(group), 'size': len(group),
+                                'resources': None}
+            for p in group:
+                self.policy_keys[id(p)] = key
+                p.ctx.fetch_planner = self
+            self.stats['policies'] += len(group)
+            self.stats['groups'] += 1
+
+    def get(self, manager):
+        """Get a private copy of a group's resources if already fetched.
+
+        Only a policy's own resource manager is planned, not the
+        managers of related resources used by its filters.
+        """
+        policy = manager.ctx.policy
+        group = self._get_group(manager)
+        if group is None or id(policy) in self.consumed:
+            return None
+
+        self.consumed.add(id(policy))
+        group['remaining'] -= 1
+        resources = group['resources']
+        if resources is None:
+            return None
+        self.stats['shared'] += 1
+        self.shared.add(id(policy))
+        if not group['remaining']:
+            group['resources'] = None
+            return resources
+        return copy.deepcopy(resources)
+
+    def save(self, manager, resources):
+        group = self._get_group(manager)
+        if group is None or group['resources'] is not None:
+            return
+        self.stats['fetches'] += 1
+        if group['remaining']:
+            group['resources'] = copy.deepcopy(resources)
+
+    def done(self, policy):
+        """Mark a policy as executed.
+
+        Policies that didn't consume their group (ie. errored before
+        fetching) still release their reference on it.
+        """
+        key = self.policy_keys.get(id(policy))
+        if key is None or id(policy) in self.consumed:
+            return
+        self.consumed.add(id(policy))
+        group = self.groups[key]
+        group['remaining'] -= 1
+        if not group['remaining']:
+            group['resources'] = None
+
+    def _get_group(self, manager):
+        key = self.policy_keys.get(id(manager.ctx.policy))
+        if key is None or manager.data != manager.ctx.policy.data:
+            return None
+        return self.groups[key]
+
+    def get_metadata(self, policy):
+        key = self.policy_keys.get(id(policy))
+        if key is None:
+            return {}
+        return {'group-size': self.groups[key]['size'],
+                'shared': id(policy) in self.shared}
+
+    def report(self):
+        if self.stats['groups']:
+            log.info(
+                "fetch plan policies:%d groups:%d fetches:%d shared:%d",
+                self.stats['policies'], self.stats['groups'],
+                self.stats['fetches'], self.stats['shared'])
+        return dict(self.stats)
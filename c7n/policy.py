@@ -244,6 +244,14 @@ class PullMode(PolicyExecutionMode):
                 "ResourceCount", len(resources), "Count", Scope="Policy")
             self.policy.ctx.metrics.put_metric(
                 "ResourceTime", rt, "Seconds", Scope="Policy")
+            child_stats = getattr(self.policy.resource_manager, 'child_stats', None)
+            if child_stats:
+                self.policy.ctx.metrics.put_metric(
+                    "ChildQueryErrors", len(child_stats['errors']), "Count",
+                    Scope="Policy")
+            for k, v in sorted(getattr(self.policy.get_cache(), 'stats', {}).items()):
+                self.policy.ctx.metrics.put_metric(
+                    "Cache%s" % k.title(), v, "Count", Scope="Policy")
             self.policy._write_file(
                 'resources.json', utils.dumps(resources, indent=2))
 
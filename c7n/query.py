@@ -18,22 +18,27 @@ tags_spec -> s3, elb, rds
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import collections
 import functools
 import itertools
 import json
+import logging
 
 import jmespath
 import six
 import os
+import time
 
 from c7n.actions import ActionRegistry
+from c7n.delta import DeltaRefresh
 from c7n.exceptions import ClientError, ResourceLimitExceeded, PolicyExecutionError
+from c7n.executor import AdaptiveConcurrency
 from c7n.filters import FilterRegistry, MetricsFilter
 from c7n.manager import ResourceManager
 from c7n.registry import PluginRegistry
 from c7n.tags import register_ec2_tags, register_universal_tags
 from c7n.utils import (
-    local_session, generate_arn, get_retry, chunks, camelResource)
+    local_session, generate_arn, get_retry, chunks, camelResource, THROTTLE_CODES)
 
 
 try:
@@ -47,6 +52,20 @@ except ImportError:
         pass
 
 
+log = logging.getLogger('custodian.query')
+
+# Ceiling on concurrent augment calls by service, absent a policy's
+# max-workers. Services with low api rate limits stay conservative.
+DEFAULT_MAX_WORKERS = 8
+SERVICE_MAX_WORKERS = {
+    'cloudformation': 4,
+    'ec2': 16,
+    'iam': 4,
+    'route53': 3,
+    's3': 16,
+}
+
+
 class ResourceQuery(object):
 
     def __init__(self, session_factory):
@@ -69,7 +88,10 @@ class ResourceQuery(object):
             data = results.build_full_result()
         else:
             op = getattr(client, enum_op)
-            data = op(**params)
+            if retry:
+                data = retry(op, **params)
+            else:
+                data = op(**params)
 
         if path:
             path = jmespath.compile(path)
@@ -77,6 +99,19 @@ class ResourceQuery(object):
 
         return data
 
+    def _iter_client_enum(self, client, enum_op, params, path, retry=None):
+        if not path or not client.can_paginate(enum_op):
+            yield self._invoke_client_enum(
+                client, enum_op, params, path, retry) or []
+            return
+
+        p = client.get_paginator(enum_op)
+        if retry:
+            p.PAGE_ITERATOR_CLS = RetryPageIterator
+        path = jmespath.compile(path)
+        for page in p.paginate(**params):
+            yield path.search(page) or []
+
     def filter(self, resource_manager, **params):
         """Query a set of resources."""
         m = self.resolve(resource_manager.resource_type)
@@ -89,6 +124,18 @@ class ResourceQuery(object):
             client, enum_op, params, path,
             getattr(resource_manager, 'retry', None)) or []
 
+    def iter_filter(self, resource_manager, **params):
+        """Query a set of resources, yielding each page of results."""
+        m = self.resolve(resource_manager.resource_type)
+        client = local_session(self.session_factory).client(
+            m.service, resource_manager.config.region)
+        enum_op, path, extra_args = m.enum_spec
+        if extra_args:
+            params.update(extra_args)
+        return self._iter_client_enum(
+            client, enum_op, params, path,
+            getattr(resource_manager, 'retry', None))
+
     def get(self, resource_manager, identities):
         """Get resources by identities
         """
@@ -155,12 +202,20 @@ class ChildResourceQuery(ResourceQuery):
         if existing_param:
             return self._invoke_client_enum(client, enum_op, params, path)
 
-        # Have to query separately for each parent's children.
+        # Have to query separately for each parent's children, results
+        # are collected in parent order.
+        self.parent_stats = collections.OrderedDict()
+        with self.manager.executor_factory(
+                max_workers=self.manager.max_workers) as w:
+            futures = [
+                (parent_id, w.submit(
+                    self.get_parent_children, m, params, parent_key, parent_id))
+                for parent_id in parent_ids]
+
         results = []
-        for parent_id in parent_ids:
-            merged_params = self.get_parent_parameters(params, parent_id, parent_key)
-            subset = self._invoke_client_enum(
-                client, enum_op, merged_params, path, retry=self.manager.retry)
+        for parent_id, f in futures:
+            subset, stats = f.result()
+            self.parent_stats[parent_id] = stats
             if annotate_parent:
                 for r in subset:
                     r[self.parent_key] = parent_id
@@ -168,8 +223,50 @@ class ChildResourceQuery(ResourceQuery):
                 results.extend([(parent_id, s) for s in subset])
             elif subset:
                 results.extend(subset)
+        self.manager.child_stats = self.get_parent_summary()
         return results
 
+    def get_parent_summary(self, slowest=5):
+        """Summarize per parent stats for the policy's metadata."""
+        errors = {pid: s['error'] for pid, s in self.parent_stats.items()
+                  if 'error' in s}
+        durations = sorted(
+            ((s['duration'], pid) for pid, s in self.parent_stats.items()),
+            reverse=True)
+        return {
+            'parents': len(self.parent_stats),
+            'errors': errors,
+            'duration': sum(d for d, _ in durations),
+            'slowest': [[pid, d] for d, pid in durations[:slowest]]}
+
+    def get_parent_children(self, model, params, parent_key, parent_id):
+        """Query the children of a single parent.
+
+        Api errors are logged and recorded in the returned stats, so a
+        parent removed or inaccessible mid query doesn't fail the others.
+        """
+        client = local_session(self.session_factory).client(model.service)
+        enum_op, path, _ = model.enum_spec
+        merged_params = self.get_parent_parameters(params, parent_id, parent_key)
+        stats = {}
+        t = time.time()
+        try:
+            subset = self._invoke_client_enum(
+                client, enum_op, merged_params, path,
+                retry=self.manager.retry) or []
+        except ClientError as e:
+            log.warning(
+                "%s error querying children of parent:%s error:%s",
+                self.manager.__class__.__name__.lower(), parent_id, e)
+            stats['error'] = e.response['Error']['Code']
+            subset = []
+        stats['duration'] = time.time() - t
+        stats['count'] = len(subset)
+        return subset, stats
+
+    def iter_filter(self, resource_manager, **params):
+        yield self.filter(resource_manager, **params)
+
     def get_parent_parameters(self, params, parent_id, parent_key):
         return dict(params, **{parent_key: parent_id})
 
@@ -207,6 +304,12 @@ class QueryMeta(type):
         return super(QueryMeta, cls).__new__(cls, name, parents, attrs)
 
 
+def _overrides(obj, base, name):
+    return six.get_unbound_function(
+        getattr(type(obj), name)) is not six.get_unbound_function(
+            getattr(base, name))
+
+
 def _napi(op_name):
     return op_name.title().replace('_', '')
 
@@ -229,6 +332,19 @@ class DescribeSource(object):
     def resources(self, query):
         return self.query.filter(self.manager, **query)
 
+    def iter_resources(self, query):
+        """Yield pages of resources as they're retrieved.
+
+        Sources or queries that customize resource retrieval yield
+        their results as a single page.
+        """
+        if (_overrides(self, DescribeSource, 'resources') or
+                _overrides(self.query, ResourceQuery, 'filter')):
+            yield self.resources(query)
+            return
+        for page in self.query.iter_filter(self.manager, **query):
+            yield page
+
     def get_query(self):
         return self.resource_query_factory(self.manager.session_factory)
 
@@ -254,13 +370,15 @@ class DescribeSource(object):
             _augment = _batch_augment
         else:
             return resources
+        concurrency = self.manager.get_augment_concurrency()
         _augment = functools.partial(
-            _augment, self.manager, model, detail_spec)
+            _augment, self.manager, model, detail_spec, concurrency=concurrency)
         with self.manager.executor_factory(
-                max_workers=self.manager.max_workers) as w:
-            results = list(w.map(
-                _augment, chunks(resources, self.manager.chunk_size)))
-            return list(itertools.chain(*results))
+                max_workers=concurrency.ceiling) as w:
+            results = concurrency.map(
+                w, _augment, chunks(resources, self.manager.chunk_size))
+        self.manager.augment_stats = dict(concurrency.stats)
+        return list(itertools.chain(*results))
 
 
 @sources.register('describe-child')
@@ -278,28 +396,65 @@ class ConfigSource(object):
 
     retry = staticmethod(get_retry(('ThrottlingException',)))
 
+    # maximum resource keys per batch_get_resource_config call
+    batch_size = 100
+
     def __init__(self, manager):
         self.manager = manager
 
     def get_permissions(self):
-        return ["config:GetResourceConfigHistory",
+        return ["config:BatchGetResourceConfig",
+                "config:GetResourceConfigHistory",
                 "config:ListDiscoveredResources"]
 
     def get_resources(self, ids, cache=True):
+        """Get the current configuration items of the given resource ids.
+
+        Ids are retrieved in batches, concurrently, with resources the
+        batch api doesn't return (ie. unprocessed keys or recently
+        deleted resources) retrieved from their configuration history.
+        """
         client = local_session(self.manager.session_factory).client('config')
-        results = []
         m = self.manager.get_model()
+        ids = list(ids)
+
+        items = {}
+        with self.manager.executor_factory(
+                max_workers=self.manager.max_workers) as w:
+            for batch in w.map(
+                    functools.partial(self._batch_get, client, m.config_type),
+                    chunks(ids, self.batch_size)):
+                items.update(batch)
+
+        results = []
         for i in ids:
-            revisions = self.retry(
-                client.get_resource_config_history,
-                resourceId=i,
-                resourceType=m.config_type,
-                limit=1).get('configurationItems')
-            if not revisions:
-                continue
-            results.append(self.load_resource(revisions[0]))
+            item = items.get(i)
+            if item is None:
+                revisions = self.retry(
+                    client.get_resource_config_history,
+                    resourceId=i,
+                    resourceType=m.config_type,
+                    limit=1).get('configurationItems')
+                if not revisions:
+                    continue
+                item = revisions[0]
+            results.append(self.load_resource(item))
         return list(filter(None, results))
 
+    def _batch_get(self, client, config_type, ids):
+        try:
+            response = self.retry(
+                client.batch_get_resource_config,
+                resourceKeys=[
+                    {'resourceType': config_type, 'resourceId': i} for i in ids])
+        except ClientError as e:
+            log.warning(
+                "Batch config retrieval of %d %s failed %s",
+                len(ids), config_type, e)
+            return {}
+        return {item['resourceId']: item
+                for item in response.get('baseConfigurationItems', ())}
+
     def get_query_params(self, query):
         """Parse config select expression from policy and parameter.
 
@@ -345,6 +500,17 @@ class ConfigSource(object):
         return camelResource(item_config)
 
     def resources(self, query=None):
+        results = []
+        for page in self.iter_resources(query):
+            results.extend(page)
+        return results
+
+    def iter_resources(self, query=None):
+        """Yield pages of resources as they're selected.
+
+        Each page is parsed as it's retrieved, rather than retaining
+        the raw select results for the whole population.
+        """
         client = local_session(self.manager.session_factory).client('config')
         query = self.get_query_params(query)
         pager = Paginator(
@@ -354,11 +520,8 @@ class ConfigSource(object):
             client.meta.service_model.operation_model('SelectResourceConfig'))
         pager.PAGE_ITERATOR_CLS = RetryPageIterator
 
-        results = []
         for page in pager.paginate(Expression=query['expr']):
-            results.extend([
-                self.load_resource(json.loads(r)) for r in page['Results']])
-        return results
+            yield [self.load_resource(json.loads(r)) for r in page['Results']]
 
     def augment(self, resources):
         return resources
@@ -377,17 +540,26 @@ class QueryResourceManager(ResourceManager):
 
     _generate_arn = None
 
-    retry = staticmethod(
-        get_retry((
-            'ThrottlingException',
-            'RequestLimitExceeded',
-            'Throttled',
-            'Throttling',
-            'Client.RequestLimitExceeded')))
+    retry = staticmethod(get_retry(THROTTLE_CODES))
 
     def __init__(self, data, options):
         super(QueryResourceManager, self).__init__(data, options)
         self.source = self.get_source(self.source_type)
+        self.augment_stats = None
+        self.refresh_stats = None
+
+    def get_augment_concurrency(self):
+        """Get an adaptive concurrency limit for augmenting resources.
+
+        Concurrency starts at max_workers and is capped by the policy's
+        max-workers if specified, else the service's ceiling.
+        """
+        ceiling = self.ctx.policy.data.get('max-workers') if (
+            self.data == self.ctx.policy.data) else None
+        if ceiling is None:
+            ceiling = SERVICE_MAX_WORKERS.get(
+                self.get_model().service, DEFAULT_MAX_WORKERS)
+        return AdaptiveConcurrency(self.max_workers, ceiling)
 
     @property
     def source_type(self):
@@ -422,6 +594,10 @@ class QueryResourceManager(ResourceManager):
         perms = self.source.get_permissions()
         if getattr(self, 'permissions', None):
             perms.extend(self.permissions)
+        if self.data.get('refresh'):
+            perms.append(
+                self.data['refresh'].get('feed') == 'config' and
+                'config:SelectResourceConfig' or 'cloudtrail:LookupEvents')
         return perms
 
     def get_cache_key(self, query):
@@ -446,14 +622,31 @@ class QueryResourceManager(ResourceManager):
                                self.__class__.__name__),
                     len(resources)))
 
+        planner = getattr(self.ctx, 'fetch_planner', None)
+        if resources is None and planner is not None:
+            resources = planner.get(self)
+
+        if resources is None and self.data.get('stream'):
+            return self.stream_resources(query or {})
+
         if resources is None:
-            if query is None:
-                query = {}
-            with self.ctx.tracer.subsegment('resource-fetch'):
-                resources = self.source.resources(query)
-            with self.ctx.tracer.subsegment('resource-augment'):
-                resources = self.augment(resources)
+            refresh = DeltaRefresh.from_manager(self, query)
+            if refresh is not None:
+                with self.ctx.tracer.subsegment('resource-refresh'):
+                    resources = refresh.resources()
+                self.refresh_stats = refresh.stats
+            if resources is None:
+                if query is None:
+                    query = {}
+                with self.ctx.tracer.subsegment('resource-fetch'):
+                    resources = self.source.resources(query)
+                with self.ctx.tracer.subsegment('resource-augment'):
+                    resources = self.augment(resources)
+            if refresh is not None:
+                refresh.save(resources)
             self._cache.save(cache_key, resources)
+            if planner is not None:
+                planner.save(self, resources)
 
         resource_count = len(resources)
         with self.ctx.tracer.subsegment('filter'):
@@ -464,6 +657,56 @@ class QueryResourceManager(ResourceManager):
             self.check_resource_limit(len(resources), resource_count)
         return resources
 
+    def stream_resources(self, query):
+        """Augment and filter pages of resources as they're retrieved.
+
+        The leading filters that evaluate each resource independently
+        are applied page by page, so only matched resources are retained.
+        The first filter operating on the full set (ie. or, not, resource
+        count, related resources) and any after it are applied once all
+        pages have been retrieved. Streamed resources aren't cached.
+        """
+        filters = list(self.filters)
+        idx = 0
+        while idx < len(filters) and filters[idx].is_streamable():
+            idx += 1
+        stream_filters, set_filters = filters[:idx], filters[idx:]
+
+        stats = {'pages': 0, 'population': 0, 'peak-resident': 0,
+                 'first-match': None}
+        start = time.time()
+        if hasattr(self.source, 'iter_resources'):
+            pages = self.source.iter_resources(query)
+        else:
+            pages = [self.source.resources(query)]
+
+        resources = []
+        for page in pages:
+            stats['pages'] += 1
+            with self.ctx.tracer.subsegment('resource-augment'):
+                page = self.augment(page)
+            stats['population'] += len(page)
+            stats['peak-resident'] = max(
+                stats['peak-resident'], len(resources) + len(page))
+            with self.ctx.tracer.subsegment('filter'):
+                page = self.filter_resources(page, filters=stream_filters)
+            if page and stats['first-match'] is None:
+                stats['first-match'] = time.time() - start
+            resources.extend(page)
+
+        if set_filters and resources:
+            with self.ctx.tracer.subsegment('filter'):
+                resources = self.filter_resources(resources, filters=set_filters)
+        self.stream_stats = stats
+        self.log.debug(
+            "Streamed %d pages population:%d peak-resident:%d first-match:%s",
+            stats['pages'], stats['population'], stats['peak-resident'],
+            stats['first-match'] is not None and "%0.2f" % stats['first-match'])
+
+        if self.data == self.ctx.policy.data:
+            self.check_resource_limit(len(resources), stats['population'])
+        return resources
+
     def check_resource_limit(self, selection_count, population_count):
         """Check if policy's execution affects more resources then its limit.
 
@@ -615,6 +858,7 @@ class MaxResourceLimit(object):
 class ChildResourceManager(QueryResourceManager):
 
     child_source = 'describe-child'
+    child_stats = None
 
     @property
     def source_type(self):
@@ -627,11 +871,28 @@ class ChildResourceManager(QueryResourceManager):
         return self.get_resource_manager(self.resource_type.parent_spec[0])
 
 
-def _batch_augment(manager, model, detail_spec, resource_set):
+def observe_throttles(op, concurrency):
+    """Report throttled calls, including those retried by botocore."""
+    def _op(*args, **kw):
+        try:
+            response = op(*args, **kw)
+        except ClientError as e:
+            if e.response['Error']['Code'] in THROTTLE_CODES:
+                concurrency.throttled()
+            raise
+        if response.get('ResponseMetadata', {}).get('RetryAttempts'):
+            concurrency.throttled()
+        return response
+    return _op
+
+
+def _batch_augment(manager, model, detail_spec, resource_set, concurrency=None):
     detail_op, param_name, param_key, detail_path, detail_args = detail_spec
     client = local_session(manager.session_factory).client(
         model.service, region_name=manager.config.region)
     op = getattr(client, detail_op)
+    if concurrency is not None:
+        op = observe_throttles(op, concurrency)
     if manager.retry:
         args = (op,)
         op = manager.retry
@@ -644,11 +905,13 @@ def _batch_augment(manager, model, detail_spec, resource_set):
     return response[detail_path]
 
 
-def _scalar_augment(manager, model, detail_spec, resource_set):
+def _scalar_augment(manager, model, detail_spec, resource_set, concurrency=None):
     detail_op, param_name, param_key, detail_path = detail_spec
     client = local_session(manager.session_factory).client(
         model.service, region_name=manager.config.region)
     op = getattr(client, detail_op)
+    if concurrency is not None:
+        op = observe_throttles(op, concurrency)
     if manager.retry:
         args = (op,)
         op = manager.retry
@@ -0,0 +1,239 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Client side api rate limiting.
+
+Token buckets keyed by account, region, service and operation are
+consulted before each api call made through a session from a
+:py:class:`c7n.credentials.SessionFactory`, so threads and policies
+share one budget per api rather than each retrying on throttles.
+
+Rates (calls per second) are configured with the `C7N_API_RATES`
+environment variable as a json mapping of `service.Operation`,
+`service` or `*` to a rate, ie. `{"ec2": 20, "ec2.DescribeTags": 5}`.
+Apis without a matching rate aren't limited. Bucket rates are halved
+when an api throttles, and recover towards the configured rate as
+calls succeed.
+
+Setting `C7N_API_RATE_STATE` to a file path shares bucket state across
+processes on the same host, ie. c7n-org workers.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from c7n.utils import THROTTLE_CODES
+
+log = logging.getLogger('custodian.ratelimit')
+
+
+class TokenBucket(object):
+    """Process local token bucket.
+
+    Callers reserve a token and sleep until it accrues, so waiting
+    callers are served in order without contending on the lock.
+    """
+
+    # fraction of the configured rate recovered per successful call
+    recovery = 0.05
+
+    def __init__(self, rate, burst=None):
+        self.max_rate = float(rate)
+        self.min_rate = self.max_rate / 16
+        self.burst = burst or max(1.0, self.max_rate)
+        self.lock = threading.Lock()
+        self.state = {'rate': self.max_rate, 'tokens': self.burst,
+                      'updated': time.time()}
+
+    def acquire(self):
+        with self.lock:
+            delay = self._reserve(self.state)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def throttled(self):
+        with self.lock:
+            self._adjust(self.state, throttled=True)
+
+    def succeeded(self):
+        with self.lock:
+            self._adjust(self.state, throttled=False)
+
+    def _reserve(self, state):
+        now = time.time()
+        state['tokens'] = min(
+            self.burst,
+            state['tokens'] + (now - state['updated']) * state['rate'])
+        state['updated'] = now
+        state['tokens'] -= 1
+        if state['tokens'] >= 0:
+            return 0
+        return -state['tokens'] / state['rate']
+
+    def _adjust(self, state, throttled):
+        if throttled:
+            state['rate'] = max(self.min_rate, state['rate'] / 2)
+        else:
+            state['rate'] = min(
+                self.max_rate, state['rate'] + self.max_rate * self.recovery)
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket with state in a locked file shared across processes."""
+
+    def __init__(self, path, key, rate, burst=None):
+        super(SharedTokenBucket, self).__init__(rate, burst)
+        self.path = path
+        self.key = key
+
+    def acquire(self):
+        delay = self._update(self._reserve)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def throttled(self):
+        self._update(lambda state: self._adjust(state, throttled=True))
+
+    def succeeded(self):
+        self._update(lambda state: self._adjust(state, throttled=False))
+
+    def _update(self, func):
+        with self.lock, open(self.path, 'a+') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                content = fh.read()
+                states = content and json.loads(content) or {}
+                state = states.setdefault(self.key, dict(self.state))
+                result = func(state)
+                fh.seek(0)
+                fh.truncate()
+                json.dump(states, fh)
+                fh.flush()
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+        return result
+
+
+class RateLimiter(object):
+    """Registry of token buckets, subscribed to session api call events."""
+
+    def __init__(self, rates, state_path=None):
+        self.rates = rates
+        self.state_path = state_path
+        if state_path and fcntl is None:
+            log.warning("Shared api rate state unsupported on this platform")
+            self.state_path = None
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'delayed': 0, 'delay': 0.0, 'throttles': 0}
+
+    @classmethod
+    def from_env(cls):
+        rates = os.environ.get('C7N_API_RATES')
+        if not rates:
+            return None
+        return cls(json.loads(rates), os.environ.get('C7N_API_RATE_STATE'))
+
+    def get_rate(self, service, operation):
+        for k in ('%s.%s' % (service, operation), service, '*'):
+            if k in self.rates:
+                return self.rates[k]
+
+    def get_bucket(self, account, region, service, operation):
+        key = (account, region, service, operation)
+        with self.lock:
+            if key in self.buckets:
+                return self.buckets[key]
+            rate = self.get_rate(service, operation)
+            if rate is None:
+                bucket = None
+            elif self.state_path:
+                bucket = SharedTokenBucket(self.state_path, ':'.join(key), rate)
+            else:
+                bucket = TokenBucket(rate)
+            self.buckets[key] = bucket
+            return bucket
+
+    def register(self, session, account):
+        """Subscribe to the api call events of a boto3 session."""
+        session.events.register(
+            'before-call.*.*', self._before_call(account),
+            unique_id='c7n-rate-limit-before')
+        session.events.register(
+            'needs-retry.*.*', self._needs_retry(account),
+            unique_id='c7n-rate-limit-retry')
+
+    def _lookup(self, account, model, context):
+        return self.get_bucket(
+            account, (context or {}).get('client_region'),
+            model.service_model.service_name, model.name)
+
+    def _before_call(self, account):
+        def acquire(model, context=None, **kw):
+            bucket = self._lookup(account, model, context)
+            if bucket is None:
+                return
+            delay = bucket.acquire()
+            with self.lock:
+                self.stats['calls'] += 1
+                if delay:
+                    self.stats['delayed'] += 1
+                    self.stats['delay'] += delay
+        return acquire
+
+    def _needs_retry(self, account):
+        def observe(response, operation, request_dict=None, **kw):
+            if response is None:
+                return
+            bucket = self._lookup(
+                account, operation, (request_dict or {}).get('context'))
+            if bucket is None:
+                return
+            if response[1].get('Error', {}).get('Code') in THROTTLE_CODES:
+                bucket.throttled()
+                with self.lock:
+                    self.stats['throttles'] += 1
+            else:
+                bucket.succeeded()
+        return observe
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Get the process wide rate limiter, if one is configured."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter.from_env() or False
+        return _limiter or None
+
+
+def reset_rate_limiter():
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
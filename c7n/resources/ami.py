@@ -23,6 +23,7 @@ from c7n.actions import BaseAction
 from c7n.exceptions import ClientError
 from c7n.filters import (
     AgeFilter, Filter, CrossAccountAccessFilter)
+from c7n.filters.usage import UsageGraph
 from c7n.manager import resources
 from c7n.query import QueryResourceManager, DescribeSource, TypeInfo
 from c7n.resolver import ValuesFrom
@@ -281,25 +282,19 @@ class ImageUnusedFilter(Filter):
             for m in ('asg', 'launch-config', 'ec2')]))
 
     def _pull_asg_images(self):
-        asgs = self.manager.get_resource_manager('asg').resources()
+        graph = UsageGraph.from_manager(self.manager)
         image_ids = set()
-        lcfgs = set(a['LaunchConfigurationName'] for a in asgs if 'LaunchConfigurationName' in a)
-        lcfg_mgr = self.manager.get_resource_manager('launch-config')
-
+        lcfgs = graph.get_targets(self.manager, ('asg-launch-configs',))
         if lcfgs:
-            image_ids.update([
-                lcfg['ImageId'] for lcfg in lcfg_mgr.resources()
-                if lcfg['LaunchConfigurationName'] in lcfgs])
-
-        tmpl_mgr = self.manager.get_resource_manager('launch-template-version')
-        for tversion in tmpl_mgr.get_resources(
-                list(tmpl_mgr.get_asg_templates(asgs).keys())):
-            image_ids.add(tversion['LaunchTemplateData'].get('ImageId'))
+            image_ids.update(graph.get_targets(
+                self.manager, ('launch-config-images',), sources=lcfgs))
+        image_ids.update(graph.get_targets(
+            self.manager, ('asg-launch-template-images',)))
         return image_ids
 
     def _pull_ec2_images(self):
-        ec2_manager = self.manager.get_resource_manager('ec2')
-        return set([i['ImageId'] for i in ec2_manager.resources()])
+        graph = UsageGraph.from_manager(self.manager)
+        return graph.get_targets(self.manager, ('ec2-images',))
 
     def process(self, resources, event=None):
         images = self._pull_ec2_images().union(self._pull_asg_images())
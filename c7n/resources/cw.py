@@ -15,12 +15,16 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from concurrent.futures import as_completed
 from datetime import datetime, timedelta
+import calendar
+import functools
 
 from c7n.actions import BaseAction
 from c7n.exceptions import PolicyValidationError
+from c7n.executor import AdaptiveConcurrency
 from c7n.filters import Filter, MetricsFilter
 from c7n.filters.iamaccess import CrossAccountAccessFilter
-from c7n.query import QueryResourceManager, ChildResourceManager, TypeInfo
+from c7n.query import (
+    QueryResourceManager, ChildResourceManager, TypeInfo, observe_throttles)
 from c7n.manager import resources
 from c7n.resolver import ValuesFrom
 from c7n.tags import universal_augment, register_universal_tags
@@ -234,6 +238,14 @@ class Delete(BaseAction):
 class LastWriteDays(Filter):
     """Filters CloudWatch log groups by last write
 
+    Log groups are probed concurrently, within any configured api rate
+    limits. When a cache is configured, the last write found for each
+    group is kept for `days`, and groups that a previous run shows were
+    written to since the threshold, either by their last write or by
+    their stored bytes growing since then, aren't probed again. Their
+    `lastWrite` annotation is the earliest write known to have
+    happened, and `streams` isn't annotated.
+
     :example:
 
     .. code-block:: yaml
@@ -249,30 +261,83 @@ class LastWriteDays(Filter):
     schema = type_schema(
         'last-write', days={'type': 'number'})
     permissions = ('logs:DescribeLogStreams',)
+    # DescribeLogStreams is limited to five calls per second
+    max_workers = 4
 
     def process(self, resources, event=None):
         client = local_session(self.manager.session_factory).client('logs')
-        self.date_threshold = datetime.utcnow() - timedelta(
-            days=self.data['days'])
-        return [r for r in resources if self.check_group(client, r)]
-
-    def check_group(self, client, group):
-        streams = client.describe_log_streams(
+        now = datetime.utcnow()
+        self.date_threshold = now - timedelta(days=self.data['days'])
+        self.threshold_timestamp = _timestamp(self.date_threshold)
+        # resources may have been listed up to a cache period ago
+        observed = _timestamp(now - timedelta(
+            minutes=self.manager.config.cache_period or 0))
+
+        cache_key = self.get_cache_key()
+        entries = self.manager._cache.get(cache_key) or {}
+        probe = []
+        for r in resources:
+            last_timestamp = self.get_cached_write(
+                r, entries.get(r['logGroupName']))
+            if last_timestamp is None:
+                probe.append(r)
+            else:
+                r['lastWrite'] = datetime.utcfromtimestamp(last_timestamp / 1000.0)
+        self.log.debug(
+            "probing %d of %d log groups for last write",
+            len(probe), len(resources))
+
+        if probe:
+            concurrency = AdaptiveConcurrency(1, self.max_workers)
+            describe = observe_throttles(client.describe_log_streams, concurrency)
+            with self.executor_factory(max_workers=self.max_workers) as w:
+                timestamps = concurrency.map(
+                    w, functools.partial(self.get_last_write, describe), probe)
+            for r, last_timestamp in zip(probe, timestamps):
+                r['lastWrite'] = datetime.utcfromtimestamp(last_timestamp / 1000.0)
+                entries[r['logGroupName']] = {
+                    'creationTime': r['creationTime'],
+                    'storedBytes': r.get('storedBytes', 0),
+                    'observed': observed,
+                    'lastWrite': last_timestamp}
+            self.manager._cache.save(
+                cache_key, entries, ttl=self.data['days'] * 86400)
+
+        return [r for r in resources if self.date_threshold > r['lastWrite']]
+
+    def get_cache_key(self):
+        return {'account': self.manager.config.account_id,
+                'region': self.manager.config.region,
+                'resource': 'log-group-last-write'}
+
+    def get_cached_write(self, group, entry):
+        """Get the timestamp of a write since the threshold from a previous probe."""
+        if entry is None or entry['creationTime'] != group['creationTime']:
+            return None
+        if entry['lastWrite'] >= self.threshold_timestamp:
+            return entry['lastWrite']
+        # stored bytes only grow with writes after the previous listing
+        if (group.get('storedBytes', 0) > entry['storedBytes'] and
+                entry['observed'] >= self.threshold_timestamp):
+            return entry['observed']
+
+    def get_last_write(self, describe, group):
+        streams = self.manager.retry(
+            describe,
             logGroupName=group['logGroupName'],
             orderBy='LastEventTime',
             descending=True,
             limit=3).get('logStreams')
         group['streams'] = streams
         if not streams:
-            last_timestamp = group['creationTime']
+            return group['creationTime'] * 1000
         elif streams[0]['storedBytes'] == 0:
-            last_timestamp = streams[0]['creationTime']
-        else:
-            last_timestamp = streams[0]['lastIngestionTime']
+            return streams[0]['creationTime']
+        return streams[0]['lastIngestionTime']
+
 
-        last_write = datetime.fromtimestamp(last_timestamp / 1000.0)
-        group['lastWrite'] = last_write
-        return self.date_threshold > last_write
+def _timestamp(dt):
+    return calendar.timegm(dt.utctimetuple()) * 1000
 
 
 @LogGroup.filter_registry.register('cross-account')
@@ -317,6 +382,7 @@ class LogCrossAccountFilter(CrossAccountAccessFilter):
                     continue
                 account_id = f['destinationArn'].split(':', 5)[4]
                 if account_id not in accounts:
+                    self.journal_annotation(r, 'c7n:CrossAccountViolations')
                     r.setdefault('c7n:CrossAccountViolations', []).append(
                         account_id)
                     found = True
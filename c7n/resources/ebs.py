@@ -30,6 +30,7 @@ from c7n.filters import (
     CrossAccountAccessFilter, Filter, AgeFilter, ValueFilter,
     ANNOTATION_KEY)
 from c7n.filters.health import HealthEventFilter
+from c7n.filters.usage import UsageGraph
 
 from c7n.manager import resources
 from c7n.resources.kms import ResourceKmsKeyAlias
@@ -273,33 +274,18 @@ class SnapshotUnusedFilter(Filter):
             for m in ('asg', 'launch-config', 'ami')]))
 
     def _pull_asg_snapshots(self):
-        asgs = self.manager.get_resource_manager('asg').resources()
+        graph = UsageGraph.from_manager(self.manager)
         snap_ids = set()
-        lcfgs = set(a['LaunchConfigurationName'] for a in asgs if 'LaunchConfigurationName' in a)
-        lcfg_mgr = self.manager.get_resource_manager('launch-config')
-
-        if lcfgs:
-            for lc in lcfg_mgr.resources():
-                for b in lc.get('BlockDeviceMappings'):
-                    if 'Ebs' in b and 'SnapshotId' in b['Ebs']:
-                        snap_ids.add(b['Ebs']['SnapshotId'])
-
-        tmpl_mgr = self.manager.get_resource_manager('launch-template-version')
-        for tversion in tmpl_mgr.get_resources(
-                list(tmpl_mgr.get_asg_templates(asgs).keys())):
-            for bd in tversion['LaunchTemplateData'].get('BlockDeviceMappings', ()):
-                if 'Ebs' in bd and 'SnapshotId' in bd['Ebs']:
-                    snap_ids.add(bd['Ebs']['SnapshotId'])
+        if graph.get_edges(self.manager, 'asg-launch-configs'):
+            snap_ids.update(graph.get_targets(
+                self.manager, ('launch-config-snapshots',)))
+        snap_ids.update(graph.get_targets(
+            self.manager, ('asg-launch-template-snapshots',)))
         return snap_ids
 
     def _pull_ami_snapshots(self):
-        amis = self.manager.get_resource_manager('ami').resources()
-        ami_snaps = set()
-        for i in amis:
-            for dev in i.get('BlockDeviceMappings'):
-                if 'Ebs' in dev and 'SnapshotId' in dev['Ebs']:
-                    ami_snaps.add(dev['Ebs']['SnapshotId'])
-        return ami_snaps
+        graph = UsageGraph.from_manager(self.manager)
+        return graph.get_targets(self.manager, ('ami-snapshots',))
 
     def process(self, resources, event=None):
         snaps = self._pull_asg_snapshots().union(self._pull_ami_snapshots())
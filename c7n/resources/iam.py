@@ -21,6 +21,7 @@ import json
 import io
 from datetime import timedelta
 import itertools
+import threading
 import time
 
 from concurrent.futures import as_completed
@@ -36,6 +37,7 @@ from c7n.exceptions import PolicyValidationError
 from c7n.filters import ValueFilter, Filter
 from c7n.filters.multiattr import MultiAttrFilter
 from c7n.filters.iamaccess import CrossAccountAccessFilter
+from c7n.filters.usage import UsageGraph
 from c7n.manager import resources
 from c7n.query import QueryResourceManager, DescribeSource, TypeInfo
 from c7n.resolver import ValuesFrom
@@ -558,75 +560,34 @@ class IamRoleUsage(Filter):
     def get_permissions(self):
         perms = list(itertools.chain(*[
             self.manager.get_resource_manager(m).get_permissions()
-            for m in ['lambda', 'launch-config', 'ec2']]))
-        perms.extend(['ecs:DescribeClusters', 'ecs:DescribeServices'])
+            for m in ['lambda', 'launch-config', 'ec2', 'ecs', 'ecs-service']]))
+        perms.append('ecs:DescribeServices')
         return perms
 
+    service_role_scanners = ('lambda-roles', 'ecs-service-roles')
+    instance_profile_scanners = (
+        'launch-config-instance-profiles', 'ec2-instance-profiles')
+
     def service_role_usage(self):
-        results = set()
-        results.update(self.scan_lambda_roles())
-        results.update(self.scan_ecs_roles())
+        graph = UsageGraph.from_manager(self.manager)
+        results = graph.get_targets(self.manager, self.service_role_scanners)
         results.update(self.collect_profile_roles())
         return results
 
     def instance_profile_usage(self):
-        results = set()
-        results.update(self.scan_asg_roles())
-        results.update(self.scan_ec2_roles())
-        return results
-
-    def scan_lambda_roles(self):
-        manager = self.manager.get_resource_manager('lambda')
-        return [r['Role'] for r in manager.resources() if 'Role' in r]
-
-    def scan_ecs_roles(self):
-        results = []
-        client = local_session(self.manager.session_factory).client('ecs')
-        for cluster in client.describe_clusters()['clusters']:
-            services = client.list_services(
-                cluster=cluster['clusterName'])['serviceArns']
-            if services:
-                for service in client.describe_services(
-                        cluster=cluster['clusterName'],
-                        services=services)['services']:
-                    if 'roleArn' in service:
-                        results.append(service['roleArn'])
-        return results
+        graph = UsageGraph.from_manager(self.manager)
+        return graph.get_targets(self.manager, self.instance_profile_scanners)
 
     def collect_profile_roles(self):
         # Collect iam roles attached to instance profiles of EC2/ASG resources
-        profiles = set()
-        profiles.update(self.scan_asg_roles())
-        profiles.update(self.scan_ec2_roles())
-
-        manager = self.manager.get_resource_manager('iam-profile')
-        iprofiles = manager.resources()
-        results = []
-        for p in iprofiles:
-            if p['InstanceProfileName'] not in profiles:
-                continue
-            for role in p.get('Roles', []):
-                results.append(role['RoleName'])
-        return results
+        graph = UsageGraph.from_manager(self.manager)
+        return graph.get_targets(
+            self.manager, ('instance-profile-roles',),
+            sources=self.instance_profile_usage())
 
-    def scan_asg_roles(self):
-        manager = self.manager.get_resource_manager('launch-config')
-        return [r['IamInstanceProfile'] for r in manager.resources() if (
-            'IamInstanceProfile' in r)]
-
-    def scan_ec2_roles(self):
-        manager = self.manager.get_resource_manager('ec2')
-        results = []
-        for e in manager.resources():
-            # do not include instances that have been recently terminated
-            if e['State']['Name'] == 'terminated':
-                continue
-            profile_arn = e.get('IamInstanceProfile', {}).get('Arn', None)
-            if not profile_arn:
-                continue
-            # split arn to get the profile name
-            results.append(profile_arn.split('/')[-1])
-        return results
+    def get_referrers(self, targets, scanners):
+        graph = UsageGraph.from_manager(self.manager)
+        return graph.get_referrers(self.manager, targets, scanners)
 
 
 ###################
@@ -637,7 +598,8 @@ class IamRoleUsage(Filter):
 class UsedIamRole(IamRoleUsage):
     """Filter IAM roles that are either being used or not
 
-    Checks for usage on EC2, Lambda, ECS only
+    Checks for usage on EC2, Lambda, ECS only. Used roles are annotated
+    with the resources referencing them, by usage scanner, in `c7n:usage`.
 
     :example:
 
@@ -658,8 +620,13 @@ class UsedIamRole(IamRoleUsage):
     def process(self, resources, event=None):
         roles = self.service_role_usage()
         if self.data.get('state', True):
-            return [r for r in resources if (
+            results = [r for r in resources if (
                 r['Arn'] in roles or r['RoleName'] in roles)]
+            for r in results:
+                r['c7n:usage'] = self.get_referrers(
+                    (r['Arn'], r['RoleName']),
+                    self.service_role_scanners + ('instance-profile-roles',))
+            return results
 
         return [r for r in resources if (
             r['Arn'] not in roles and r['RoleName'] not in roles)]
@@ -1098,6 +1065,9 @@ class PolicyDelete(BaseAction):
 class UsedInstanceProfiles(IamRoleUsage):
     """Filter IAM profiles that are being used.
 
+    Used profiles are annotated with the resources referencing them, by
+    usage scanner, in `c7n:usage`.
+
     :example:
 
     .. code-block:: yaml
@@ -1116,6 +1086,9 @@ class UsedInstanceProfiles(IamRoleUsage):
         profiles = self.instance_profile_usage()
         for r in resources:
             if r['Arn'] in profiles or r['InstanceProfileName'] in profiles:
+                r['c7n:usage'] = self.get_referrers(
+                    (r['Arn'], r['InstanceProfileName']),
+                    self.instance_profile_scanners)
                 results.append(r)
         self.log.info(
             "%d of %d instance profiles currently in use." % (
@@ -1228,7 +1201,7 @@ class CredentialReport(Filter):
             'default': True,
             'type': 'boolean'},
         report_delay={
-            'title': 'Number of seconds to wait for report generation.',
+            'title': 'Maximum number of seconds to wait for report generation.',
             'default': 10,
             'type': 'number'},
         report_max_age={
@@ -1253,11 +1226,55 @@ class CredentialReport(Filter):
             return self.data[k]
         return self.schema['properties'][k]['default']
 
+    _reports_lock = threading.Lock()
+
+    # Initial seconds between checks on report generation, doubled
+    # after each check.
+    report_poll_interval = 1
+
+    def get_cache_key(self):
+        return {'account': self.manager.config.account_id,
+                'resource': 'iam-credential-report'}
+
+    def is_current(self, generated):
+        threshold = datetime.datetime.now(tz=tzutc()) - timedelta(
+            seconds=self.get_value_or_schema_default('report_max_age'))
+        if not generated.tzinfo:
+            threshold = threshold.replace(tzinfo=None)
+        return generated >= threshold
+
     def get_credential_report(self):
-        report = self.manager._cache.get('iam-credential-report')
-        if report:
-            return report
-        data = self.fetch_credential_report()
+        """Get the account's parsed credential report.
+
+        Parsed reports are kept in the cache, versioned by their
+        generation time, and shared by the credential filters of
+        a run.
+        """
+        cache_key = self.get_cache_key()
+        # by account, custodian run shares these across its policies
+        reports = getattr(self.manager.ctx, 'credential_reports', None)
+        if reports is None:
+            reports = self.manager.ctx.credential_reports = {}
+        with self._reports_lock:
+            entry = reports.get(cache_key['account'])
+            if entry is None or not self.is_current(entry['generated']):
+                cached = self.manager._cache.get(cache_key)
+                if cached is not None and self.is_current(cached['generated']):
+                    entry = cached
+                else:
+                    entry = self.fetch_report_entry(entry or cached)
+                    self.manager._cache.save(cache_key, entry)
+                reports[cache_key['account']] = entry
+        return entry['report']
+
+    def fetch_report_entry(self, previous=None):
+        response = self.fetch_credential_report()
+        if previous is not None and previous['generated'] == response['GeneratedTime']:
+            return previous
+        return {'generated': response['GeneratedTime'],
+                'report': self.parse_credential_report(response['Content'])}
+
+    def parse_credential_report(self, data):
         report = {}
         if isinstance(data, six.binary_type):
             reader = csv.reader(io.StringIO(data.decode('utf-8')))
@@ -1267,7 +1284,6 @@ class CredentialReport(Filter):
         for line in reader:
             info = dict(zip(headers, line))
             report[info['user']] = self.process_user_record(info)
-        self.manager._cache.save('iam-credential-report', report)
         return report
 
     @classmethod
@@ -1299,26 +1315,37 @@ class CredentialReport(Filter):
             if e.response['Error']['Code'] != 'ReportNotPresent':
                 raise
             report = None
-        if report:
-            threshold = datetime.datetime.now(tz=tzutc()) - timedelta(
-                seconds=self.get_value_or_schema_default(
-                    'report_max_age'))
-            if not report['GeneratedTime'].tzinfo:
-                threshold = threshold.replace(tzinfo=None)
-            if report['GeneratedTime'] < threshold:
-                report = None
+        if report and not self.is_current(report['GeneratedTime']):
+            report = None
         if report is None:
             if not self.get_value_or_schema_default('report_generate'):
                 raise ValueError("Credential Report Not Present")
-            client.generate_credential_report()
-            time.sleep(self.get_value_or_schema_default('report_delay'))
+            self.generate_credential_report(client)
             report = client.get_credential_report()
-        return report['Content']
+        return report
+
+    def generate_credential_report(self, client):
+        """Generate a report, polling with backoff until it's complete.
+
+        Waits at most report_delay seconds.
+        """
+        deadline = time.time() + self.get_value_or_schema_default('report_delay')
+        interval = self.report_poll_interval
+        state = client.generate_credential_report()['State']
+        while state != 'COMPLETE':
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+            interval *= 2
+            state = client.generate_credential_report()['State']
 
     def process(self, resources, event=None):
+        config = dict(self.data)
         if '.' in self.data['key']:
-            self.matcher_config = dict(self.data)
-            self.matcher_config['key'] = self.data['key'].split('.', 1)[1]
+            config['key'] = self.data['key'].split('.', 1)[1]
+        self.value_filter = ValueFilter(config).validate()
+        self.value_filter.annotate = False
         return []
 
     def match(self, resource, info):
@@ -1326,21 +1353,19 @@ class CredentialReport(Filter):
             return False
         k = self.data.get('key')
         if '.' not in k:
-            vf = ValueFilter(self.data)
-            vf.annotate = False
-            return vf(info)
+            return self.value_filter(info)
 
         # access key matching
         prefix, sk = k.split('.', 1)
-        vf = ValueFilter(self.matcher_config)
-        vf.annotate = False
 
         # annotation merging with previous respecting block operators
         k_matched = []
         for v in info.get(prefix, ()):
-            if vf.match(v):
+            if self.value_filter(v):
                 k_matched.append(v)
 
+        if k_matched:
+            self.journal_annotation(resource, 'c7n:credential-report')
         for k in k_matched:
             k['c7n:match-type'] = 'credential'
 
@@ -1421,6 +1446,7 @@ class UserPolicy(ValueFilter):
         for u in user_set:
             if 'c7n:Policies' not in u:
                 u['c7n:Policies'] = []
+            self.journal_annotation(u, 'c7n:Policies')
             aps = client.list_attached_user_policies(
                 UserName=u['UserName'])['AttachedPolicies']
             for ap in aps:
@@ -1533,6 +1559,8 @@ class UserAccessKey(ValueFilter):
             for k in r[self.annotation_key]:
                 if self.match(k):
                     k_matched.append(k)
+            if k_matched:
+                self.journal_annotation(r, self.annotation_key)
             for k in k_matched:
                 k['c7n:matched-type'] = 'access'
             self.merge_annotation(r, self.matched_annotation_key, k_matched)
@@ -1541,6 +1541,7 @@ class ParameterFilter(ValueFilter):
             for pg in resource['DBParameterGroups']:
                 pg_values = paramcache[pg['DBParameterGroupName']]
                 if self.match(pg_values):
+                    self.journal_annotation(resource, 'c7n:MatchedDBParameter')
                     resource.setdefault('c7n:MatchedDBParameter', []).append(
                         self.data.get('key'))
                     results.append(resource)
@@ -25,6 +25,7 @@ from c7n.filters import (
 import c7n.filters.vpc as net_filters
 from c7n.filters.iamaccess import CrossAccountAccessFilter
 from c7n.filters.related import RelatedResourceFilter
+from c7n.filters.usage import UsageGraph
 from c7n.filters.revisions import Diff
 from c7n import query, resolver
 from c7n.manager import resources
@@ -198,7 +199,7 @@ class VpcSecurityGroupFilter(RelatedResourceFilter):
         vpc_ids = [vpc['VpcId'] for vpc in resources]
         vpc_group_ids = {
             g['GroupId'] for g in
-            self.manager.get_resource_manager('security-group').resources()
+            self.get_related_resources()
             if g.get('VpcId', '') in vpc_ids
         }
         return vpc_group_ids
@@ -232,7 +233,7 @@ class VpcSubnetFilter(RelatedResourceFilter):
         vpc_ids = [vpc['VpcId'] for vpc in resources]
         vpc_subnet_ids = {
             g['SubnetId'] for g in
-            self.manager.get_resource_manager('subnet').resources()
+            self.get_related_resources()
             if g.get('VpcId', '') in vpc_ids
         }
         return vpc_subnet_ids
@@ -266,7 +267,7 @@ class VpcNatGatewayFilter(RelatedResourceFilter):
         vpc_ids = [vpc['VpcId'] for vpc in resources]
         vpc_natgw_ids = {
             g['NatGatewayId'] for g in
-            self.manager.get_resource_manager('nat-gateway').resources()
+            self.get_related_resources()
             if g.get('VpcId', '') in vpc_ids
         }
         return vpc_natgw_ids
@@ -299,7 +300,7 @@ class VpcInternetGatewayFilter(RelatedResourceFilter):
     def get_related_ids(self, resources):
         vpc_ids = [vpc['VpcId'] for vpc in resources]
         vpc_igw_ids = set()
-        for igw in self.manager.get_resource_manager('internet-gateway').resources():
+        for igw in self.get_related_resources():
             for attachment in igw['Attachments']:
                 if attachment.get('VpcId', '') in vpc_ids:
                     vpc_igw_ids.add(igw['InternetGatewayId'])
@@ -696,15 +697,18 @@ class SGUsage(Filter):
             "%d of %d groups w/ peered refs", len(peered_ids), len(resources))
         return [r for r in resources if r['GroupId'] not in peered_ids]
 
+    scanners = (
+        ('nics', 'eni-security-groups'),
+        ('sg-perm-refs', 'security-group-references'),
+        ('lambdas', 'lambda-security-groups'),
+        ('launch-configs', 'launch-config-security-groups'),
+    )
+
     def scan_groups(self):
+        graph = UsageGraph.from_manager(self.manager)
         used = set()
-        for kind, scanner in (
-                ("nics", self.get_eni_sgs),
-                ("sg-perm-refs", self.get_sg_refs),
-                ('lambdas', self.get_lambda_sgs),
-                ("launch-configs", self.get_launch_config_sgs),
-        ):
-            sg_ids = scanner()
+        for kind, scanner in self.scanners:
+            sg_ids = graph.get_targets(self.manager, (scanner,))
             new_refs = sg_ids.difference(used)
             used = used.union(sg_ids)
             self.log.debug(
@@ -713,41 +717,12 @@ class SGUsage(Filter):
 
         return used
 
-    def get_launch_config_sgs(self):
-        # Note assuming we also have launch config garbage collection
-        # enabled.
-        sg_ids = set()
-        for cfg in self.manager.get_resource_manager('launch-config').resources():
-            for g in cfg['SecurityGroups']:
-                sg_ids.add(g)
-            for g in cfg['ClassicLinkVPCSecurityGroups']:
-                sg_ids.add(g)
-        return sg_ids
-
-    def get_lambda_sgs(self):
-        sg_ids = set()
-        for func in self.manager.get_resource_manager('lambda').resources():
-            if 'VpcConfig' not in func:
-                continue
-            for g in func['VpcConfig']['SecurityGroupIds']:
-                sg_ids.add(g)
-        return sg_ids
-
-    def get_eni_sgs(self):
-        sg_ids = set()
-        for nic in self.manager.get_resource_manager('eni').resources():
-            for g in nic['Groups']:
-                sg_ids.add(g['GroupId'])
-        return sg_ids
-
-    def get_sg_refs(self):
-        sg_ids = set()
-        for sg in self.manager.get_resource_manager('security-group').resources():
-            for perm_type in ('IpPermissions', 'IpPermissionsEgress'):
-                for p in sg.get(perm_type, []):
-                    for g in p.get('UserIdGroupPairs', ()):
-                        sg_ids.add(g['GroupId'])
-        return sg_ids
+    def annotate_usage(self, resources):
+        graph = UsageGraph.from_manager(self.manager)
+        scanners = [scanner for _, scanner in self.scanners]
+        for r in resources:
+            r['c7n:usage'] = graph.get_referrers(
+                self.manager, (r['GroupId'],), scanners)
 
 
 @SecurityGroup.filter_registry.register('unused')
@@ -788,7 +763,8 @@ class UsedSecurityGroup(SGUsage):
     """Filter to security groups that are used.
 
     This operates as a complement to the unused filter for multi-step
-    workflows.
+    workflows. Matched groups are annotated with the resources
+    referencing them, by usage scanner, in `c7n:usage`.
 
     :example:
 
@@ -808,7 +784,9 @@ class UsedSecurityGroup(SGUsage):
             r for r in resources
             if r['GroupId'] not in used and 'VpcId' in r]
         unused = set([g['GroupId'] for g in self.filter_peered_refs(unused)])
-        return [r for r in resources if r['GroupId'] not in unused]
+        used = [r for r in resources if r['GroupId'] not in unused]
+        self.annotate_usage(used)
+        return used
 
 
 @SecurityGroup.filter_registry.register('stale')
@@ -986,6 +964,7 @@ class SGPermission(Filter):
 
     def process(self, resources, event=None):
         self.vfilters = []
+        self.cidr_filters = {}
         fattrs = list(sorted(self.perm_attrs.intersection(self.data.keys())))
         self.ports = 'Ports' in self.data and self.data['Ports'] or ()
         self.only_ports = (
@@ -1026,15 +1005,17 @@ class SGPermission(Filter):
         if not ip_perms:
             return False
 
-        match_range = self.data[cidr_key]
-
-        if isinstance(match_range, dict):
-            match_range['key'] = cidr_type
-        else:
-            match_range = {cidr_type: match_range}
-
-        vf = ValueFilter(match_range, self.manager)
-        vf.annotate = False
+        # the filter, and its parsed cidrs, are reused across rules
+        vf = self.cidr_filters.get(cidr_key)
+        if vf is None:
+            match_range = self.data[cidr_key]
+            if isinstance(match_range, dict):
+                match_range['key'] = cidr_type
+            else:
+                match_range = {cidr_type: match_range}
+            vf = ValueFilter(match_range, self.manager).validate()
+            vf.annotate = False
+            self.cidr_filters[cidr_key] = vf
 
         for ip_range in ip_perms:
             found = vf(ip_range)
@@ -1478,7 +1459,6 @@ class SubnetRoute(net_filters.SubnetFilter):
         rt_subnet_map = {}
         main_tables = {}
 
-        manager = self.get_resource_manager()
         for r in resources:
             rt_subnet_map[r['RouteTableId']] = []
             for a in r.get('Associations', ()):
@@ -1487,7 +1467,7 @@ class SubnetRoute(net_filters.SubnetFilter):
                 elif a.get('Main'):
                     main_tables[r['VpcId']] = r['RouteTableId']
         explicit_subnet_ids = set(itertools.chain(*rt_subnet_map.values()))
-        subnets = manager.resources()
+        subnets = self.get_related_resources()
         for s in subnets:
             if s['SubnetId'] in explicit_subnet_ids:
                 continue
@@ -1514,6 +1494,7 @@ class Route(ValueFilter):
                 if self.match(route):
                     matched.append(route)
             if matched:
+                self.journal_annotation(r, 'c7n:matched-routes')
                 r.setdefault('c7n:matched-routes', []).extend(matched)
                 results.append(r)
         return results
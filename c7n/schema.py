@@ -229,6 +229,16 @@ def generate(resource_types=()):
                 'tags': {'type': 'array', 'items': {'type': 'string'}},
                 'mode': {'$ref': '#/definitions/policy-mode'},
                 'source': {'enum': ['describe', 'config']},
+                'stream': {'type': 'boolean'},
+                'max-workers': {'type': 'integer', 'minimum': 1},
+                'refresh': {
+                    'type': 'object',
+                    'additionalProperties': False,
+                    'required': ['type'],
+                    'properties': {
+                        'type': {'enum': ['incremental']},
+                        'feed': {'enum': ['cloudtrail', 'config']},
+                        'max-age': {'type': 'integer', 'minimum': 1}}},
                 'actions': {
                     'type': 'array',
                 },
@@ -132,6 +132,9 @@ def _common_tag_processer(executor_factory, batch_size, concurrency, client,
                 log.error(
                     "Exception with tags: %s  %s", tags, f.exception())
 
+    for r in resources:
+        utils.invalidate_tag_map(r)
+
     if error:
         raise error
 
@@ -207,8 +210,8 @@ class TagTrim(Action):
         # without some more complex matching wrt to grouping resources
         # by common tags populations.
         tag_map = {
-            t['Key']: t['Value'] for t in i.get('Tags', [])
-            if not t['Key'].startswith('aws:')}
+            k: v for k, v in (utils.get_tag_map(i) or {}).items()
+            if not k.startswith('aws:')}
 
         # Space == 0 means remove all but specified
         if self.space and len(tag_map) + self.space <= self.max_tag_count:
@@ -308,12 +311,7 @@ class TagActionFilter(Filter):
         skew_hours = self.data.get('skew_hours', 0)
         tz = tzutil.gettz(Time.TZ_ALIASES.get(self.data.get('tz', 'utc')))
 
-        v = None
-        for n in i.get('Tags', ()):
-            if n['Key'] == tag:
-                v = n['Value']
-                break
-
+        v = utils.get_tag_value(i, tag)
         if v is None:
             return False
         if ':' not in v or '@' not in v:
@@ -370,8 +368,8 @@ class TagCountFilter(Filter):
         op_name = self.data.get('op', 'gte')
         op = OPERATORS.get(op_name)
         tag_count = len([
-            t['Key'] for t in i.get('Tags', [])
-            if not t['Key'].startswith('aws:')])
+            k for k in utils.get_tag_map(i) or ()
+            if not k.startswith('aws:')])
         return op(tag_count, count)
 
 
@@ -540,7 +538,7 @@ class RenameTag(Action):
         old_key = self.data.get('old_key', None)
         resource_set = {}
         for r in instances:
-            tags = {t['Key']: t['Value'] for t in r.get('Tags', [])}
+            tags = utils.get_tag_map(r) or {}
             if tags[old_key] not in resource_set:
                 resource_set[tags[old_key]] = []
             resource_set[tags[old_key]].append(r)
@@ -550,7 +548,7 @@ class RenameTag(Action):
         old_key = self.data.get('old_key', None)
         res = 0
         for r in resources:
-            tags = {t['Key']: t['Value'] for t in r.get('Tags', [])}
+            tags = utils.get_tag_map(r) or {}
             if old_key not in tags.keys():
                 resources.pop(res)
             res += 1
@@ -575,6 +573,8 @@ class RenameTag(Action):
                     self.log.error(
                         "Exception renaming tag set \n %s" % (
                             f.exception()))
+        for r in resources:
+            utils.invalidate_tag_map(r)
         return resources
 
     def get_client(self):
@@ -776,7 +776,7 @@ class NormalizeTag(Action):
         key = self.data.get('key', None)
         resource_set = {}
         for r in instances:
-            tags = {t['Key']: t['Value'] for t in r.get('Tags', [])}
+            tags = utils.get_tag_map(r) or {}
             if tags[key] not in resource_set:
                 resource_set[tags[key]] = []
             resource_set[tags[key]].append(r)
@@ -786,7 +786,7 @@ class NormalizeTag(Action):
         key = self.data.get('key', None)
         res = 0
         for r in resources:
-            tags = {t['Key']: t['Value'] for t in r.get('Tags', [])}
+            tags = utils.get_tag_map(r) or {}
             if key not in tags.keys():
                 resources.pop(res)
             res += 1
@@ -13,6 +13,7 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import bisect
 import copy
 import csv
 from datetime import datetime, timedelta
@@ -307,6 +308,109 @@ def set_annotation(i, k, v):
         i[k] = v
 
 
+class TagMapIndex(object):
+    """Index of resource tag maps, active while policies execute.
+
+    Entries are keyed by the id of a resource's tags and retain them, so
+    ids can't be reused while they're indexed. The index is discarded
+    when the last execution using it ends, and cleared when full.
+    """
+
+    size = 100000
+
+    def __init__(self):
+        self.entries = None
+        self.executions = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with self.lock:
+            self.executions += 1
+            if self.entries is None:
+                self.entries = {}
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
+        with self.lock:
+            self.executions -= 1
+            if not self.executions:
+                self.entries = None
+
+
+TAG_MAP_INDEX = TagMapIndex()
+
+
+def get_resource_tags(resource):
+    """Get a resource's tags, either an aws tag list or a dict of tags."""
+    if 'Tags' in resource:
+        return resource['Tags'] or ()
+    # GCP schema: 'labels': {'key': 'value'}
+    elif 'labels' in resource:
+        return resource['labels'] or {}
+    # Azure schema: 'tags': {'key': 'value'}
+    elif 'tags' in resource:
+        return resource['tags'] or {}
+    return None
+
+
+def get_tag_map(resource, lower=False):
+    """Get a dict of a resource's tag values by key, or None if it has no tags.
+
+    While policies execute, tag lists are indexed on first access and the
+    index reused while the list is unchanged, tags modified in place
+    without changing the number of tags need invalidate_tag_map. With
+    `lower` tag keys are lower cased.
+
+    >>> get_tag_map({'Tags': [{'Key': 'App', 'Value': 'web'}]}, lower=True)
+    {'app': 'web'}
+    """
+    tags = get_resource_tags(resource)
+    if tags is None:
+        return None
+    if not tags:
+        return {}
+    if isinstance(tags, dict) and not lower:
+        return tags
+    entries = TAG_MAP_INDEX.entries
+    entry = entries is not None and entries.get(id(tags)) or None
+    if entry is None or entry[0] is not tags or entry[1] != len(tags):
+        if isinstance(tags, dict):
+            tag_map = tags
+        else:
+            tag_map = {}
+            for t in tags:
+                tag_map.setdefault(t.get('Key'), t.get('Value'))
+        entry = [tags, len(tags), tag_map, None]
+        if entries is not None:
+            if len(entries) >= TAG_MAP_INDEX.size:
+                entries.clear()
+            entries[id(tags)] = entry
+    if not lower:
+        return entry[2]
+    if entry[3] is None:
+        lower_map = {}
+        for k, v in entry[2].items():
+            lower_map.setdefault(k.lower(), v)
+        entry[3] = lower_map
+    return entry[3]
+
+
+def get_tag_value(resource, key, default=None):
+    """Get the value of a resource's tag."""
+    tag_map = get_tag_map(resource)
+    if tag_map is None:
+        return default
+    return tag_map.get(key, default)
+
+
+def invalidate_tag_map(resource):
+    """Discard a resource's tag index after modifying its tags in place."""
+    tags = get_resource_tags(resource)
+    entries = TAG_MAP_INDEX.entries
+    if tags is not None and entries is not None:
+        entries.pop(id(tags), None)
+
+
 def parse_s3(s3_path):
     if not s3_path.startswith('s3://'):
         raise ValueError("invalid s3 path")
@@ -362,6 +466,15 @@ def snapshot_identifier(prefix, db_identifier):
 
 retry_log = logging.getLogger('c7n.retry')
 
+# Error codes aws apis use to signal throttling
+THROTTLE_CODES = (
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'Throttled',
+    'Throttling',
+    'Client.RequestLimitExceeded',
+    'TooManyRequestsException')
+
 
 def get_retry(codes=(), max_attempts=8, min_delay=1, log_retries=False):
     """Decorator for retry boto3 api call on transient errors.
@@ -414,8 +527,16 @@ def backoff_delays(start, stop, factor=2.0, jitter=False):
         cur = cur * factor
 
 
+# parsed cidrs by string value
+CIDR_CACHE = {}
+CIDR_CACHE_SIZE = 100000
+
+
 def parse_cidr(value):
     """Process cidr ranges."""
+    cacheable = isinstance(value, six.string_types)
+    if cacheable and value in CIDR_CACHE:
+        return CIDR_CACHE[value]
     klass = IPv4Network
     if '/' not in value:
         klass = ipaddress.ip_address
@@ -423,9 +544,112 @@ def parse_cidr(value):
         v = klass(six.text_type(value))
     except (ipaddress.AddressValueError, ValueError):
         v = None
+    if cacheable:
+        if len(CIDR_CACHE) >= CIDR_CACHE_SIZE:
+            CIDR_CACHE.clear()
+        CIDR_CACHE[value] = v
     return v
 
 
+class NetworkSet(object):
+    """A set of ip networks and addresses with logarithmic time lookups.
+
+    Members are kept per ip version as sorted integer intervals, members
+    nested within another member are subsumed by it. As cidrs either
+    nest or are disjoint, the intervals are disjoint. Supernet lookups
+    use the members' own intervals, with the least end of those starting
+    at or after each.
+
+    >>> networks = NetworkSet(['10.0.0.0/16', '10.0.1.0/24', '192.168.1.1'])
+    >>> '10.0.1.0/28' in networks, networks.overlaps('10.0.0.0/8')
+    (True, True)
+    """
+
+    def __init__(self, networks=()):
+        intervals = {4: [], 6: []}
+        for n in networks:
+            n = self.parse(n)
+            if n is not None:
+                intervals[n.version].append(self.interval(n))
+        self.starts = {}
+        self.ends = {}
+        self.member_starts = {}
+        self.member_min_ends = {}
+        for version, members in intervals.items():
+            members.sort()
+            self.member_starts[version] = [m[0] for m in members]
+            min_ends = [m[1] for m in members]
+            for i in range(len(min_ends) - 2, -1, -1):
+                min_ends[i] = min(min_ends[i], min_ends[i + 1])
+            self.member_min_ends[version] = min_ends
+            starts, ends = [], []
+            for start, end in members:
+                if ends and start <= ends[-1]:
+                    ends[-1] = max(end, ends[-1])
+                    continue
+                starts.append(start)
+                ends.append(end)
+            self.starts[version] = starts
+            self.ends[version] = ends
+
+    def __len__(self):
+        return sum(map(len, self.starts.values()))
+
+    @staticmethod
+    def parse(value):
+        if isinstance(value, (ipaddress._BaseNetwork, ipaddress._BaseAddress)):
+            return value
+        if not isinstance(value, six.string_types):
+            return None
+        v = parse_cidr(value)
+        if v is None and ':' in value:
+            try:
+                v = ipaddress.ip_network(six.text_type(value))
+            except ValueError:
+                pass
+        return v
+
+    @staticmethod
+    def interval(n):
+        if isinstance(n, ipaddress._BaseAddress):
+            return int(n), int(n)
+        return int(n.network_address), int(n.broadcast_address)
+
+    def find(self, value):
+        n = self.parse(value)
+        if n is None:
+            return None, None, None
+        start, end = self.interval(n)
+        return n.version, start, end
+
+    def __contains__(self, value):
+        """Is the network or address a subnet of, or within, a member."""
+        version, start, end = self.find(value)
+        if version is None:
+            return False
+        idx = bisect.bisect_right(self.starts[version], start) - 1
+        return idx >= 0 and end <= self.ends[version][idx]
+
+    subnet_of = __contains__
+
+    def supernet_of(self, value):
+        """Does the network contain a member."""
+        version, start, end = self.find(value)
+        if version is None:
+            return False
+        idx = bisect.bisect_left(self.member_starts[version], start)
+        return (idx < len(self.member_starts[version]) and
+                self.member_min_ends[version][idx] <= end)
+
+    def overlaps(self, value):
+        """Does the network or address overlap a member."""
+        version, start, end = self.find(value)
+        if version is None:
+            return False
+        idx = bisect.bisect_right(self.starts[version], end) - 1
+        return idx >= 0 and self.ends[version][idx] >= start
+
+
 class IPv4Network(ipaddress.IPv4Network):
 
     # Override for net 2 net containment comparison
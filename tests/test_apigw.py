@@ -15,6 +15,8 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from botocore.exceptions import ClientError
 
+from c7n.executor import MainThreadExecutor
+from c7n.resources.apigw import RestResource, RestStage
 from .common import BaseTest
 
 
@@ -123,6 +125,7 @@ class TestRestResource(BaseTest):
 
     def test_rest_resource_query(self):
         session_factory = self.replay_flight_data("test_rest_resource_resource")
+        self.patch(RestResource, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {"name": "all-rest-resources", "resource": "rest-resource"},
             session_factory=session_factory,
@@ -237,6 +240,7 @@ class TestRestResource(BaseTest):
 
     def test_rest_resource_method_update(self):
         session_factory = self.replay_flight_data("test_rest_resource_method_update")
+        self.patch(RestResource, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {
                 "name": "rest-method-iam",
@@ -285,6 +289,7 @@ class TestRestStage(BaseTest):
 
     def test_rest_stage_resource(self):
         session_factory = self.replay_flight_data("test_rest_stage")
+        self.patch(RestStage, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {
                 "name": "all-rest-stages",
@@ -299,6 +304,7 @@ class TestRestStage(BaseTest):
 
     def test_rest_stage_update(self):
         session_factory = self.replay_flight_data("test_rest_stage_update")
+        self.patch(RestStage, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {
                 "name": "rest-stage-update",
@@ -17,7 +17,9 @@ from unittest import TestCase
 from c7n import cache, config
 from argparse import Namespace
 from six.moves import cPickle as pickle
+import shutil
 import tempfile
+import time
 import mock
 import os
 
@@ -27,7 +29,7 @@ class TestCache(TestCase):
     def test_factory(self):
         self.assertIsInstance(cache.factory(None), cache.NullCache)
         test_config = Namespace(cache_period=60, cache="test-cloud-custodian.cache")
-        self.assertIsInstance(cache.factory(test_config), cache.FileCacheManager)
+        self.assertIsInstance(cache.factory(test_config), cache.SqlKvCache)
         test_config.cache = None
         self.assertIsInstance(cache.factory(test_config), cache.NullCache)
 
@@ -42,7 +44,9 @@ class MemCacheTest(TestCase):
     def test_get_set(self):
         mem_cache = cache.InMemoryCache()
         mem_cache.save({'region': 'us-east-1'}, {'hello': 'world'})
-        self.assertEqual(mem_cache.size(), 1)
+        self.assertEqual(
+            mem_cache.size(),
+            len(pickle.dumps({'hello': 'world'}, protocol=2)))
         self.assertEqual(mem_cache.load(), True)
 
         mem_cache = cache.InMemoryCache()
@@ -50,6 +54,132 @@ class MemCacheTest(TestCase):
             mem_cache.get({'region': 'us-east-1'}),
             {'hello': 'world'})
 
+    def test_eviction(self):
+        budget = len(pickle.dumps(list(range(10)), protocol=2)) * 2
+        mem_cache = cache.InMemoryCache(
+            config.Bag(cache_period=5, cache_memory_limit=budget))
+        mem_cache.save({'k': 1}, list(range(10)))
+        mem_cache.save({'k': 2}, list(range(10)))
+        self.assertEqual(mem_cache.get({'k': 1}), list(range(10)))
+        # k2 is now least recently used
+        mem_cache.save({'k': 3}, list(range(10)))
+        self.assertEqual(mem_cache.get({'k': 2}), None)
+        self.assertEqual(mem_cache.get({'k': 1}), list(range(10)))
+        self.assertEqual(mem_cache.size(), budget)
+        # entries over the budget aren't cached
+        mem_cache.save({'k': 4}, list(range(100)))
+        self.assertEqual(mem_cache.get({'k': 4}), None)
+        self.assertEqual(
+            mem_cache.stats, {'hits': 2, 'misses': 2, 'evictions': 1})
+
+    def test_expiration(self):
+        mem_cache = cache.InMemoryCache(config.Bag(cache_period=5))
+        mem_cache.save('key', 'value')
+        later = time.time() + 301
+        with mock.patch.object(cache.time, 'time') as mock_time:
+            mock_time.return_value = later
+            self.assertEqual(mem_cache.get('key'), None)
+        self.assertEqual(mem_cache.stats['evictions'], 1)
+
+    def test_key_equivalence(self):
+        mem_cache = cache.InMemoryCache()
+        mem_cache.save({'b': [1, {'c': None}], 'a': 'x'}, 'value')
+        self.assertEqual(mem_cache.get({'a': 'x', 'b': [1, {'c': None}]}), 'value')
+        mem_cache.save({'a': {1, 2}}, 'unhashable')
+        self.assertEqual(mem_cache.get({'a': {1, 2}}), 'unhashable')
+
+    def test_save_error(self):
+        mem_cache = cache.InMemoryCache(config.Bag(cache_period=5))
+        mem_cache.save('key', lambda: None)
+        self.assertEqual(mem_cache.get('key'), None)
+        self.assertEqual(mem_cache.size(), 0)
+
+    def test_memory_limit_option(self):
+        from c7n.cli import setup_parser
+        options = setup_parser().parse_args(
+            ['run', '-s', 'out', '--cache', 'memory', '--cache-memory-limit', '64', 'p.yml'])
+        mem_cache = cache.InMemoryCache(options)
+        self.assertEqual(mem_cache.memory_limit, 64 * 1024 * 1024)
+        self.assertEqual(
+            cache.InMemoryCache(config.Config.empty()).memory_limit,
+            cache.InMemoryCache.DEFAULT_MEMORY_LIMIT)
+
+    def tearDown(self):
+        mem_cache = cache.InMemoryCache()
+        with mem_cache.lock:
+            while mem_cache.data:
+                mem_cache._evict(next(iter(mem_cache.data)))
+
+
+class SqlKvCacheTest(TestCase):
+
+    def get_cache(self, path, period=60):
+        c = cache.SqlKvCache(Namespace(cache_period=period, cache=path))
+        self.addCleanup(c.close)
+        return c
+
+    def test_get_set(self):
+        path = os.path.join(tempfile.mkdtemp(), 'sub', 'cache.db')
+        self.addCleanup(shutil.rmtree, os.path.dirname(os.path.dirname(path)))
+        c = self.get_cache(path)
+        self.assertTrue(c.load())
+        self.assertTrue(os.path.exists(path))
+        k1 = {"account": "12345678901234", "region": "us-west-2", "resource": "ec2"}
+        k2 = {"account": "98765432101234", "region": "eu-west-1", "resource": "asg"}
+        self.assertEqual(c.get(k1), None)
+        c.save(k1, [{'InstanceId': 'i-1'}])
+        c.save(k2, [])
+        self.assertEqual(c.get(k1), [{'InstanceId': 'i-1'}])
+        self.assertEqual(c.get(k2), [])
+        self.assertTrue(c.size() > 0)
+
+        # a second cache on the same path, ie. another process
+        c2 = self.get_cache(path)
+        self.assertEqual(c2.get(k1), [{'InstanceId': 'i-1'}])
+        c2.save(k1, [{'InstanceId': 'i-2'}])
+        self.assertEqual(c.get(k1), [{'InstanceId': 'i-2'}])
+        self.assertEqual(c.get(k2), [])
+
+    def test_expiration(self):
+        t = tempfile.NamedTemporaryFile(suffix='.cache', delete=False)
+        t.close()
+        self.addCleanup(os.unlink, t.name)
+        c = self.get_cache(t.name)
+        c.save('fresh', 1)
+        c.save('stale', 2, ttl=-1)
+        self.assertEqual(c.get('fresh'), 1)
+        self.assertEqual(c.get('stale'), None)
+
+        c2 = self.get_cache(t.name)
+        self.assertTrue(c2.load())
+        self.assertEqual(
+            c2.conn.execute('select count(*) from c7n_cache').fetchone()[0], 1)
+
+    def test_replaces_pickle_cache(self):
+        t = tempfile.NamedTemporaryFile(suffix='.cache', delete=False)
+        self.addCleanup(os.unlink, t.name)
+        pickle.dump({pickle.dumps('key'): 'value'}, t, protocol=2)
+        t.close()
+        c = self.get_cache(t.name)
+        self.assertTrue(c.load())
+        self.assertEqual(c.get('key'), None)
+        c.save('key', 'value')
+        self.assertEqual(c.get('key'), 'value')
+
+    def test_save_error(self):
+        t = tempfile.NamedTemporaryFile(suffix='.cache', delete=False)
+        t.close()
+        self.addCleanup(os.unlink, t.name)
+        c = self.get_cache(t.name)
+        c.save('key', lambda: None)
+        self.assertEqual(c.get('key'), None)
+
+    def test_load_error(self):
+        c = self.get_cache(tempfile.gettempdir())
+        self.assertFalse(c.load())
+        self.assertEqual(c.get('key'), None)
+        c.save('key', 'value')
+
 
 class FileCacheManagerTest(TestCase):
 
@@ -548,6 +548,40 @@ class RunTest(CliTest):
             ["custodian", "run", "-s", temp_dir, "--debug", yaml_file], CustomError
         )
 
+    def test_explain(self):
+        from c7n.policy import Policy
+
+        # explaining policies doesn't execute them
+        self.patch(
+            Policy, "__call__", lambda x: (_ for _ in ()).throw(Exception("foobar"))
+        )
+
+        temp_dir = self.get_temp_dir()
+        yaml_file = self.write_policy_file(
+            {
+                "policies": [
+                    {
+                        "name": "ec2-explain",
+                        "resource": "ec2",
+                        "filters": [
+                            {"type": "metrics", "name": "CPUUtilization", "days": 4,
+                             "value": 30, "op": "less-than"},
+                            {"tag:Env": "dev"},
+                        ],
+                        "actions": ["stop"],
+                    }
+                ]
+            }
+        )
+
+        out = self.get_output(
+            ["custodian", "run", "-s", temp_dir, "--explain", yaml_file])
+        self.assertEqual(
+            out.splitlines(),
+            ["policy:ec2-explain resource:ec2",
+             "  1. value tag:Env cost:memory api-calls:0",
+             "  2. metrics cost:resource-api api-calls:per-resource"])
+
 
 class MetricsTest(CliTest):
 
@@ -16,6 +16,8 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import jmespath
 from unittest import TestCase
 
+from c7n.executor import MainThreadExecutor
+from c7n.resources.cw import EventRuleTarget
 from .common import event_data, BaseTest, TestConfig as Config
 
 from c7n.cwe import CloudWatchEvents
@@ -25,6 +27,7 @@ class CloudWatchRuleTarget(BaseTest):
 
     def test_target_cross_account_remove(self):
         session_factory = self.replay_flight_data("test_cwe_rule_target_cross")
+        self.patch(EventRuleTarget, "executor_factory", MainThreadExecutor)
         client = session_factory().client("events")
         policy = self.load_policy(
             {
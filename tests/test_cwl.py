@@ -13,8 +13,15 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import os
+from datetime import datetime
+
 from .common import BaseTest, functional
 
+from c7n.executor import MainThreadExecutor
+from c7n.resources import cw
+from c7n.testing import mock_datetime_now
+
 
 class LogGroupTest(BaseTest):
 
@@ -65,6 +72,49 @@ class LogGroupTest(BaseTest):
         self.assertEqual(len(resources), 1)
         self.assertEqual(resources[0]["logGroupName"], "/aws/lambda/ec2-instance-type")
 
+    def test_last_write_cache(self):
+        factory = self.replay_flight_data("test_log_group_last_write_cache")
+        self.patch(cw.LastWriteDays, "executor_factory", MainThreadExecutor)
+        config = {
+            "cache": os.path.join(self.get_temp_dir(), "c7n.cache"),
+            "cache_period": 5}
+
+        def run(stored):
+            p = self.load_policy(
+                {
+                    "name": "stale-groups",
+                    "resource": "log-group",
+                    "filters": [{"type": "last-write", "days": 30}],
+                },
+                config=dict(config), session_factory=factory,
+            )
+            groups = [
+                {"logGroupName": "/aws/lambda/%s" % name,
+                 "creationTime": 1541030400.0,
+                 "storedBytes": stored_bytes}
+                for name, stored_bytes in zip(("fresh", "growing", "stale"), stored)]
+            with mock_datetime_now(datetime(2019, 3, 1), cw):
+                resources = p.resource_manager.filters[0].process(groups)
+            p.get_cache().close()
+            return groups, resources
+
+        groups, resources = run((1000, 500, 200))
+        self.assertEqual(
+            [r["logGroupName"] for r in resources],
+            ["/aws/lambda/growing", "/aws/lambda/stale"])
+        self.assertTrue(all("streams" in g for g in groups))
+
+        # the fresh group's last write and the growing group's stored
+        # bytes show they've been written to, only the stale group is probed.
+        groups, resources = run((1000, 600, 200))
+        self.assertEqual(
+            [r["logGroupName"] for r in resources], ["/aws/lambda/stale"])
+        self.assertEqual(
+            [g["logGroupName"] for g in groups if "streams" in g],
+            ["/aws/lambda/stale"])
+        self.assertEqual(groups[0]["lastWrite"], datetime(2019, 2, 25, 0, 1, 1))
+        self.assertEqual(groups[1]["lastWrite"], datetime(2019, 2, 28, 23, 55))
+
     @functional
     def test_retention(self):
         log_group = "c7n-test-a"
@@ -0,0 +1,118 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import os
+
+from c7n.delta import DeltaRefresh, DEFAULT_MAX_AGE
+
+from .common import BaseTest
+
+
+class DeltaRefreshTest(BaseTest):
+
+    snapshot = [
+        {'InstanceId': 'i-0a1', 'State': {'Name': 'stopped'}},
+        {'InstanceId': 'i-0dead', 'State': {'Name': 'running'}},
+        {'InstanceId': 'i-0same', 'State': {'Name': 'running'}}]
+
+    def get_refresh(self, flight, feed, age=3600):
+        factory = self.replay_flight_data(flight)
+        p = self.load_policy(
+            {'name': 'ec2-delta', 'resource': 'ec2',
+             'refresh': {'type': 'incremental', 'feed': feed}},
+            config={'account_id': '644160558196'},
+            session_factory=factory, cache=True)
+        refresh = DeltaRefresh.from_manager(p.resource_manager, None)
+        refresh.watermark -= age
+        refresh.full_at -= age
+        refresh.save(self.snapshot)
+        return DeltaRefresh.from_manager(p.resource_manager, None)
+
+    def assert_refreshed(self, refresh, changed=1):
+        resources = refresh.resources()
+        self.assertEqual(
+            sorted([(r['InstanceId'], r['State']['Name']) for r in resources]),
+            [('i-0a1', 'running'), ('i-0same', 'running')])
+        self.assertEqual(
+            refresh.stats, {'mode': 'incremental', 'changed': changed, 'deleted': 1})
+        return resources
+
+    def test_cloudtrail_refresh(self):
+        # i-0same is only changed by the tagging api
+        resources = self.assert_refreshed(
+            self.get_refresh('test_delta_refresh_cloudtrail', 'cloudtrail'), 2)
+        self.assertEqual(
+            [r['Tags'] for r in resources if r['InstanceId'] == 'i-0same'],
+            [[{'Key': 'Owner', 'Value': 'ops'}]])
+
+    def test_config_refresh(self):
+        self.assert_refreshed(
+            self.get_refresh('test_delta_refresh_config', 'config'))
+
+    def test_expired_snapshot(self):
+        refresh = self.get_refresh('test_delta_refresh_config', 'config')
+        refresh.watermark += refresh.max_age * 60
+        self.assertEqual(refresh.resources(), None)
+
+    def test_incremental_refresh_expires(self):
+        refresh = self.get_refresh(
+            'test_delta_refresh_config', 'config', age=DEFAULT_MAX_AGE * 60 - 60)
+        full_at = refresh.watermark - DEFAULT_MAX_AGE * 60 + 60
+        refresh.save(self.assert_refreshed(refresh))
+        snapshot = refresh.manager._cache.get(refresh.key)
+        self.assertEqual(snapshot['watermark'], refresh.watermark)
+        self.assertTrue(abs(snapshot['full_at'] - full_at) < 5)
+
+        # runs past max-age since the last full retrieval retrieve all
+        # resources, however recent the previous incremental run
+        refresh = DeltaRefresh.from_manager(refresh.manager, None)
+        refresh.watermark += 120
+        self.assertEqual(refresh.resources(), None)
+        self.assertEqual(refresh.full_at, refresh.watermark - 120)
+
+    def test_full_refresh_saves_snapshot(self):
+        factory = self.replay_flight_data('test_delta_refresh_full')
+        p = self.load_policy(
+            {'name': 'ec2-delta', 'resource': 'ec2',
+             'refresh': {'type': 'incremental'}},
+            session_factory=factory, cache=True)
+        resources = p.run()
+        self.assertEqual(len(resources), 2)
+
+        # ec2 queries with its default (empty) filters
+        refresh = DeltaRefresh.from_manager(p.resource_manager, {'Filters': []})
+        snapshot = p.resource_manager._cache.get(refresh.key)
+        self.assertEqual(
+            [r['InstanceId'] for r in snapshot['resources']], ['i-0a1', 'i-0same'])
+        self.assertTrue(snapshot['watermark'] <= refresh.watermark)
+
+        with open(os.path.join(p.ctx.log_dir, 'metadata.json')) as fh:
+            self.assertEqual(
+                json.load(fh)['refresh'],
+                {'mode': 'full', 'changed': 0, 'deleted': 0})
+
+    def test_query_disables_refresh(self):
+        factory = self.replay_flight_data('test_delta_refresh_full')
+        p = self.load_policy(
+            {'name': 'ec2-delta', 'resource': 'ec2',
+             'query': [{'instance-state-name': 'running'}],
+             'refresh': {'type': 'incremental'}},
+            session_factory=factory, cache=True)
+        self.assertEqual(
+            DeltaRefresh.from_manager(p.resource_manager, {'Filters': []}), None)
+        self.assertEqual(len(p.run()), 2)
+        with open(os.path.join(p.ctx.log_dir, 'metadata.json')) as fh:
+            self.assertFalse('refresh' in json.load(fh))
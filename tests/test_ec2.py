@@ -14,6 +14,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import logging
+import os
 import unittest
 import time
 
@@ -27,6 +28,8 @@ from c7n.exceptions import PolicyValidationError, ClientError
 from c7n.resources import ec2
 from c7n.resources.ec2 import actions, QueryFilter
 from c7n import tags, utils
+from c7n.filters import metrics
+from c7n.testing import mock_datetime_now
 
 from .common import BaseTest
 
@@ -132,6 +135,98 @@ class TestMetricFilter(BaseTest):
         resources = policy.run()
         self.assertEqual(len(resources), 1)
 
+    def test_metric_filter_paged(self):
+        session_factory = self.replay_flight_data("test_ec2_metric_paged")
+        policy = self.load_policy(
+            {
+                "name": "ec2-utilization",
+                "resource": "ec2",
+                "filters": [
+                    {
+                        "type": "metrics",
+                        "name": "CPUUtilization",
+                        "days": 3,
+                        "period": 86400,
+                        "value": 1,
+                    }
+                ],
+            },
+            session_factory=session_factory,
+        )
+        resources = policy.run()
+        self.assertEqual(len(resources), 1)
+        self.assertEqual(
+            [p["Average"] for p in
+             resources[0]["c7n.metrics"]["AWS/EC2.CPUUtilization.Average"]],
+            [0.5, 2.5, 1.0])
+
+    def test_metric_filter_batch_size(self):
+        policy = self.load_policy(
+            {
+                "name": "ec2-utilization",
+                "resource": "ec2",
+                "filters": [
+                    {
+                        "type": "metrics",
+                        "name": "CPUUtilization",
+                        "days": 14,
+                        "period": 300,
+                        "value": 1,
+                    }
+                ],
+            }
+        )
+        f = policy.resource_manager.filters[0]
+        f.end = datetime(2019, 1, 15)
+        f.start = datetime(2019, 1, 1)
+        f.period = 300
+        # 4032 datapoints per query
+        self.assertEqual(f.get_batch_size(), 25)
+        f.period = 86400
+        self.assertEqual(f.get_batch_size(), f.MAX_METRIC_QUERIES)
+        f.period = 60
+        f.start = datetime(2018, 1, 1)
+        self.assertEqual(f.get_batch_size(), 1)
+
+    def test_metric_filter_datapoint_cache(self):
+        session_factory = self.replay_flight_data("test_ec2_metric_cache")
+        config = {
+            "cache": os.path.join(self.get_temp_dir(), "c7n.cache"),
+            "cache_period": 300}
+        data = {
+            "name": "ec2-utilization",
+            "resource": "ec2",
+            "filters": [
+                {
+                    "type": "metrics",
+                    "name": "CPUUtilization",
+                    "days": 1,
+                    "period": 3600,
+                    "value": 10,
+                }
+            ],
+        }
+
+        def run(now):
+            policy = self.load_policy(
+                data, config=dict(config), session_factory=session_factory)
+            with mock_datetime_now(now, metrics):
+                resources = policy.run()
+            policy.get_cache().close()
+            self.assertEqual(len(resources), 1)
+            return [
+                p["Average"] for p in
+                resources[0]["c7n.metrics"]["AWS/EC2.CPUUtilization.Average"]]
+
+        # the datapoint of the period the window starts in is cached,
+        # but isn't evaluated.
+        self.assertEqual(
+            run(datetime(2019, 1, 2, 12, 30)), [3.0, 2.0, 1.0])
+        # only the datapoints since the settled ones of the first run
+        # are retrieved, the rest of the window comes from the cache.
+        self.assertEqual(
+            run(datetime(2019, 1, 2, 14, 30)), [5.0, 4.0, 3.5, 2.5, 1.0])
+
 
 class TestPropagateSpotTags(BaseTest):
 
@@ -13,6 +13,8 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from c7n.executor import MainThreadExecutor
+from c7n.resources.ecs import ContainerInstance, Task
 from .common import BaseTest
 
 import fnmatch
@@ -328,6 +330,7 @@ class TestEcsTask(BaseTest):
 
     def test_task_delete(self):
         session_factory = self.replay_flight_data("test_ecs_task_delete")
+        self.patch(Task, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {
                 "name": "tasks",
@@ -348,6 +351,7 @@ class TestEcsContainerInstance(BaseTest):
 
     def test_container_instance_resource(self):
         session_factory = self.replay_flight_data("test_ecs_container_instance")
+        self.patch(ContainerInstance, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {"name": "container-instances", "resource": "ecs-container-instance"},
             session_factory=session_factory,
@@ -359,6 +363,7 @@ class TestEcsContainerInstance(BaseTest):
         session_factory = self.replay_flight_data(
             "test_ecs_container_instance_update_agent"
         )
+        self.patch(ContainerInstance, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {
                 "name": "container-instance-update-agent",
@@ -391,6 +396,7 @@ class TestEcsContainerInstance(BaseTest):
         session_factory = self.replay_flight_data(
             "test_ecs_container_instance_set_state"
         )
+        self.patch(ContainerInstance, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {
                 "name": "container-instance-update-agent",
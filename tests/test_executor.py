@@ -47,6 +47,50 @@ class ExecutorBase(object):
             )
 
 
+class AdaptiveConcurrencyTest(unittest.TestCase):
+
+    def test_aimd(self):
+        c = executor.AdaptiveConcurrency(2, 4)
+        self.assertEqual(c.limit, 2)
+        # grows by one per limit's worth of completed calls
+        for i in range(3):
+            c.completed()
+        self.assertEqual(int(c.limit), 3)
+        for i in range(10):
+            c.completed()
+        self.assertEqual(c.limit, 4)
+        c.throttled()
+        self.assertEqual(c.limit, 2)
+        for i in range(3):
+            c.throttled()
+        self.assertEqual(c.limit, 1)
+        self.assertEqual(c.stats['throttles'], 4)
+
+    def test_map(self):
+        c = executor.AdaptiveConcurrency(1, 3)
+
+        def func(i):
+            if i == 5:
+                c.throttled()
+            return i * 2
+
+        with executor.ThreadPoolExecutor(max_workers=c.ceiling) as w:
+            self.assertEqual(c.map(w, func, range(20)), [i * 2 for i in range(20)])
+        self.assertEqual(c.stats['concurrency'], 3)
+        self.assertEqual(c.stats['throttles'], 1)
+
+    def test_map_error(self):
+        c = executor.AdaptiveConcurrency(2, 2)
+
+        def func(i):
+            if i == 1:
+                raise ValueError(i)
+            return i
+
+        with executor.MainThreadExecutor() as w:
+            self.assertRaises(ValueError, c.map, w, func, range(3))
+
+
 class ProcessExecutorTest(ExecutorBase, unittest.TestCase):
     executor_factory = executor.ProcessPoolExecutor
 
@@ -26,7 +26,7 @@ from c7n.resources.ec2 import filters
 from c7n.resources.elb import ELB
 from c7n.utils import annotation
 from .common import instance, event_data, Bag, BaseTest
-from c7n.filters.core import ValueRegex
+from c7n.filters.core import AnnotationSweeper, ValueRegex
 
 
 class BaseFilterTest(unittest.TestCase):
@@ -74,6 +74,70 @@ class TestOrFilter(unittest.TestCase):
         self.assertEqual(f.process([instance(Architecture="amd64")]), [])
 
 
+class OrShortCircuitTest(BaseTest):
+
+    def test_or_skips_matched_resources(self):
+        p = self.load_policy({
+            "name": "ec2-or", "resource": "ec2",
+            "filters": [
+                {"or": [
+                    {"type": "metrics", "name": "CPUUtilization", "days": 4,
+                     "value": 30, "op": "less-than"},
+                    {"tag:Env": "dev"},
+                    {"InstanceType": "m5.large"}]}]})
+        block = p.resource_manager.filters[0]
+        evaluated = []
+
+        def process(resources, event=None):
+            evaluated.extend([r['InstanceId'] for r in resources])
+            return [r for r in resources if r['InstanceId'] == 'i-2']
+        self.patch(block.filters[0], 'process', process)
+
+        resources = [
+            instance(InstanceId="i-1", Tags=[{"Key": "Env", "Value": "dev"}]),
+            instance(InstanceId="i-2", Tags=[]),
+            instance(InstanceId="i-3", Tags=[], InstanceType="m5.large"),
+            instance(InstanceId="i-4", Tags=[])]
+        self.assertEqual(
+            sorted([r['InstanceId'] for r in p.resource_manager.filter_resources(resources)]),
+            ["i-1", "i-2", "i-3"])
+        # the metrics filter runs last, on resources the others didn't match
+        self.assertEqual(evaluated, ["i-2", "i-4"])
+        self.assertEqual(resources[0]['c7n:MatchedFilters'], ['tag:Env'])
+        self.assertEqual(resources[2]['c7n:MatchedFilters'], ['InstanceType'])
+
+    def test_or_resource_count(self):
+        p = self.load_policy({
+            "name": "ec2-or-count", "resource": "ec2",
+            "filters": [
+                {"or": [
+                    {"tag:Env": "dev"},
+                    {"type": "value", "value_type": "resource_count",
+                     "op": "gte", "value": 4}]}]})
+        resources = [
+            instance(InstanceId="i-%d" % i,
+                     Tags=[{"Key": "Env", "Value": i == 1 and "dev" or "prod"}])
+            for i in range(1, 5)]
+        # the resource count filter evaluates the full set of resources
+        self.assertEqual(
+            sorted([r['InstanceId'] for r in p.resource_manager.filter_resources(resources)]),
+            ["i-1", "i-2", "i-3", "i-4"])
+
+    def test_or_memory_filters_annotate(self):
+        p = self.load_policy({
+            "name": "ec2-or-annotate", "resource": "ec2",
+            "filters": [
+                {"or": [
+                    {"tag:Env": "dev"},
+                    {"InstanceType": "m5.large"}]}]})
+        resources = [
+            instance(InstanceId="i-1", InstanceType="m5.large",
+                     Tags=[{"Key": "Env", "Value": "dev"}])]
+        self.assertEqual(len(p.resource_manager.filter_resources(resources)), 1)
+        self.assertEqual(
+            resources[0]['c7n:MatchedFilters'], ['tag:Env', 'InstanceType'])
+
+
 class TestAndFilter(unittest.TestCase):
 
     def test_and(self):
@@ -84,6 +148,177 @@ class TestAndFilter(unittest.TestCase):
         self.assertEqual(f.process([instance(Architecture="x86_64")]), [])
 
 
+class AnnotationSweeperTest(unittest.TestCase):
+
+    def test_sweep_restores_annotations(self):
+        metrics = {'CPU': [1]}
+        matched = ['tag:Env']
+        resources = [
+            {'Id': 'r-1', 'c7n.metrics': metrics, 'c7n:MatchedFilters': matched,
+             'c7n:Owner': 'ops'},
+            {'Id': 'r-2', 'c7n:MatchedFilters': ['tag:App']}]
+        sweeper = AnnotationSweeper('Id', resources)
+
+        for r in resources:
+            sweeper.record(r, 'c7n.metrics')
+            r['c7n.metrics'] = r.get('c7n.metrics', {})
+            r['c7n.metrics']['Network'] = [2]
+            sweeper.record(r, 'c7n:MatchedFilters')
+            r['c7n:MatchedFilters'].append('State.Name')
+            r['c7n:Owner'] = 'dev'
+            r['c7n:Violations'] = ['x']
+        sweeper.sweep(resources[1:])
+
+        self.assertEqual(
+            resources[0],
+            {'Id': 'r-1', 'c7n.metrics': {'CPU': [1]}, 'c7n:MatchedFilters': ['tag:Env'],
+             'c7n:Owner': 'ops'})
+        self.assertEqual(
+            resources[1],
+            {'Id': 'r-2', 'c7n.metrics': {'Network': [2]},
+             'c7n:MatchedFilters': ['tag:App', 'State.Name'],
+             'c7n:Owner': 'dev', 'c7n:Violations': ['x']})
+
+    def test_sweep_restores_nested_values(self):
+        metrics = {'AWS/EC2.CPUUtilization.Average.4': [{'Average': 10.0}]}
+        matched = ['tag:Env', 'State.Name']
+        resources = [{'Id': 'r-1', 'c7n.metrics': metrics, 'c7n:MatchedFilters': matched}]
+        sweeper = AnnotationSweeper('Id', resources)
+
+        # a filter in the block fills a missing datapoint, and the
+        # block's list annotation shrinks.
+        sweeper.record(resources[0], 'c7n.metrics')
+        metrics['AWS/EC2.CPUUtilization.Average.4'].append({'Average': 0})
+        metrics['AWS/EC2.CPUUtilization.Average.4'][0]['Average'] = 90.0
+        sweeper.record(resources[0], 'c7n:MatchedFilters')
+        sweeper.record(resources[0], 'c7n:MatchedFilters')
+        matched[0] = 'InstanceType'
+        matched.pop()
+        sweeper.sweep([])
+
+        self.assertEqual(
+            resources[0],
+            {'Id': 'r-1',
+             'c7n.metrics': {'AWS/EC2.CPUUtilization.Average.4': [{'Average': 10.0}]},
+             'c7n:MatchedFilters': ['tag:Env', 'State.Name']})
+        # values the block didn't modify aren't copied
+        self.assertEqual(sorted(sweeper.copies['r-1']), ['c7n.metrics', 'c7n:MatchedFilters'])
+
+
+class NestedAnnotationFilter(base_filters.Filter):
+    """Modifies an existing annotation in place, ie. a metrics fill value."""
+
+    def process(self, resources, event=None):
+        for r in resources:
+            self.journal_annotation(r, 'c7n.metrics')
+            r['c7n.metrics']['CPU'].append({'Average': 0})
+            r['c7n.metrics']['CPU'][0]['c7n:detail'] = 'filled'
+        return resources
+
+
+class BlockAnnotationTest(BaseTest):
+
+    def get_resources(self):
+        return [instance(InstanceId='i-%d' % i,
+                         **{'c7n.metrics': {'CPU': [{'Average': 10.0}]}})
+                for i in range(2)]
+
+    def process(self, block, resources):
+        self.patch(filters, '_factories', dict(filters._factories))
+        filters.register('nested-annotation', NestedAnnotationFilter)
+        p = self.load_policy(
+            {'name': 'ec2-block', 'resource': 'ec2', 'filters': [block]},
+            validate=False)
+        return p.resource_manager.filter_resources(resources)
+
+    def test_and_block_restores_nested_annotations(self):
+        resources = self.get_resources()
+        matched = self.process(
+            {'and': [{'or': [{'type': 'nested-annotation'}]},
+                     {'InstanceId': 'i-1'}]}, resources)
+        self.assertEqual([r['InstanceId'] for r in matched], ['i-1'])
+        self.assertEqual(resources[0]['c7n.metrics'], {'CPU': [{'Average': 10.0}]})
+        self.assertEqual(
+            resources[1]['c7n.metrics'],
+            {'CPU': [{'Average': 10.0, 'c7n:detail': 'filled'}, {'Average': 0}]})
+
+    def test_not_block_restores_nested_annotations(self):
+        resources = self.get_resources()
+        matched = self.process(
+            {'not': [{'type': 'nested-annotation'}, {'InstanceId': 'i-1'}]}, resources)
+        self.assertEqual([r['InstanceId'] for r in matched], ['i-0'])
+        for r in resources:
+            self.assertEqual(r['c7n.metrics'], {'CPU': [{'Average': 10.0}]})
+
+
+class FilterPlanTest(BaseTest):
+
+    def test_plan_order(self):
+        p = self.load_policy({
+            "name": "ec2-plan", "resource": "ec2",
+            "filters": [
+                {"type": "metrics", "name": "CPUUtilization", "days": 4,
+                 "value": 30, "op": "less-than"},
+                {"type": "security-group", "key": "GroupName", "value": "default"},
+                {"tag:Env": "dev"},
+                {"type": "value", "op": "greater-than", "value": 1,
+                 "key": 'c7n.metrics."AWS/EC2.CPUUtilization.Average.4"'},
+                {"State.Name": "running"},
+                {"type": "value", "value_type": "resource_count",
+                 "op": "less-than", "value": 10},
+                {"InstanceType": "t2.micro"}]})
+        fs = p.resource_manager.filters
+        self.assertEqual(
+            base_filters.plan_filters(fs),
+            [fs[2], fs[1], fs[0], fs[3], fs[4], fs[5], fs[6]])
+        from c7n.filters.core import explain_filters
+        self.assertEqual(
+            explain_filters(fs),
+            ["  1. value tag:Env cost:memory api-calls:0",
+             "  2. security-group GroupName cost:bulk-api api-calls:1+",
+             "  3. metrics cost:resource-api api-calls:per-resource",
+             '  4. value c7n.metrics."AWS/EC2.CPUUtilization.Average.4" '
+             'cost:memory api-calls:0',
+             "  5. value State.Name cost:memory api-calls:0",
+             "  6. value cost:ordered api-calls:?",
+             "  7. value InstanceType cost:memory api-calls:0"])
+        self.assertEqual(
+            [f.get_cost() for f in fs],
+            [base_filters.COST_RESOURCE_API, base_filters.COST_BULK_API,
+             base_filters.COST_MEMORY, base_filters.COST_MEMORY,
+             base_filters.COST_MEMORY, None, base_filters.COST_MEMORY])
+
+    def test_filter_costs(self):
+        p = self.load_policy({
+            "name": "ec2-plan", "resource": "ec2",
+            "filters": [{"type": "default-vpc"}, {"type": "instance-age"}]})
+        self.assertEqual(
+            [f.get_cost() for f in p.resource_manager.filters],
+            [base_filters.COST_BULK_API, base_filters.COST_MEMORY])
+
+    def test_and_block_short_circuits_api_filter(self):
+        p = self.load_policy({
+            "name": "ec2-plan", "resource": "ec2",
+            "filters": [
+                {"and": [
+                    {"type": "metrics", "name": "CPUUtilization", "days": 4,
+                     "value": 30, "op": "less-than"},
+                    {"tag:Env": "prod"}]}]})
+        manager = p.resource_manager
+        resources = [instance(Tags=[{"Key": "Env", "Value": "dev"}]),
+                     instance(InstanceId="i-2", Tags=[])]
+        # the metrics filter would fail without flight data
+        self.assertEqual(manager.filter_resources(resources), [])
+
+        from c7n.commands import explain_policy
+        self.assertEqual(
+            explain_policy(p, manager.filter_counts),
+            ["policy:ec2-plan resource:ec2",
+             "  1. and cost:resource-api resources:2",
+             "    1. value tag:Env cost:memory resources:2 api-calls:0",
+             "    2. metrics cost:resource-api resources:- api-calls:-"])
+
+
 class TestNotFilter(unittest.TestCase):
 
     def test_not(self):
@@ -203,6 +438,90 @@ class TestValueFilter(unittest.TestCase):
         self.assertFalse(res)
 
 
+class TestCompiledValueFilter(unittest.TestCase):
+
+    resources = [
+        instance(Cidr="10.1.0.0/16", Ip="10.0.0.1"),
+        instance(Tags=[{"Key": "Env", "Value": " Dev "}], Size="12",
+                 Cidr="10.0.1.0/24", Groups=["a", "b", "a"],
+                 Name="prod-web-01", Ip="10.0.1.5"),
+        instance(LaunchTime=None, Tags=[], Groups=None, Size="x",
+                 Name=42, Cidr="bogus", Ip="bogus"),
+        {"tags": {"Env": "dev"}, "Name": "azure-vm", "Cidr": "", "Ip": ""},
+        {"labels": {"Env": "DEV"}, "Name": "gcp-vm", "Cidr": "", "Ip": ""},
+    ]
+
+    specs = [
+        {"tag:Env": "absent"},
+        {"tag:Env": "present"},
+        {"tag:Env": "dev"},
+        {"Name": "not-null"},
+        {"Groups": "empty"},
+        {"State.Name": "running"},
+        {"type": "value", "key": "tag:Env", "value": "dev",
+         "value_type": "normalize"},
+        {"type": "value", "key": "Size", "value": 10, "op": "gt",
+         "value_type": "integer"},
+        {"type": "value", "key": "Groups", "value": 2, "op": "eq",
+         "value_type": "unique_size"},
+        {"type": "value", "key": "Groups", "value": 3, "op": "eq",
+         "value_type": "size"},
+        {"type": "value", "key": "Name", "value": "PROD-.*", "op": "regex"},
+        {"type": "value", "key": "Name", "value": "PROD-.*", "op": "regex-case"},
+        {"type": "value", "key": "Name", "value": "prod-*", "op": "glob"},
+        {"type": "value", "key": "Name", "op": "in",
+         "value": ["azure-vm", "gcp-vm", 42]},
+        {"type": "value", "key": "Groups", "op": "not-in", "value": [["a"]]},
+        {"type": "value", "key": "Name", "op": "ni", "value": ["gcp-vm"]},
+        {"type": "value", "key": "Name", "op": "in", "value": "prod-web-01-x"},
+        {"type": "value", "key": "Name", "op": "eq", "value": "web",
+         "value_regex": "prod-([a-z]+)-.*"},
+        {"type": "value", "key": "Groups", "op": "intersect", "value": ["b"]},
+        {"type": "value", "key": "Cidr", "op": "in", "value": "10.0.0.0/16",
+         "value_type": "cidr"},
+        {"type": "value", "key": "Cidr", "op": "eq", "value": 24,
+         "value_type": "cidr_size"},
+        {"type": "value", "key": "Ip", "op": "in", "value": "10.0.1.0/24",
+         "value_type": "cidr"},
+        {"type": "value", "key": "Cidr", "op": "in", "value_type": "cidr",
+         "value": ["10.0.0.0/16", "192.168.0.0/24", "bogus"]},
+        {"type": "value", "key": "Ip", "op": "not-in", "value_type": "cidr",
+         "value": ["10.0.1.0/28", "10.0.0.1"]},
+        {"type": "value", "key": "LaunchTime", "op": "gt", "value": 30,
+         "value_type": "age"},
+        {"type": "value", "key": "LaunchTime", "op": "lt", "value": 30,
+         "value_type": "expiration"},
+        {"type": "value", "key": "LaunchTime", "op": "gt",
+         "value": "2016-01-01", "value_type": "date"},
+        {"type": "value", "key": "Name", "op": "in", "value": ["gcp-vm", "x"],
+         "value_type": "swap"},
+    ]
+
+    def test_compiled_parity(self):
+        for spec in self.specs:
+            compiled = filters.factory(spec).validate()
+            self.assertTrue(compiled.matcher is not None, spec)
+            for r in self.resources:
+                self.assertEqual(
+                    compiled(r), filters.factory(spec).match(r), (spec, r))
+
+    def test_compile_unsupported(self):
+        f = filters.factory({
+            "type": "value", "key": "a", "value": "b", "op": "eq",
+            "value_type": "expr"})
+        self.assertEqual(f.validate().matcher, None)
+        self.assertTrue(f({"a": 1, "b": 1}))
+
+        class TagValue(base_filters.ValueFilter):
+
+            def get_resource_value(self, k, i):
+                return 'dev'
+
+        f = TagValue({"type": "value", "key": "x", "value": "dev"}).validate()
+        self.assertEqual(f.matcher, None)
+        self.assertTrue(f({}))
+
+
 class TestAgeFilter(unittest.TestCase):
 
     def test_age_filter(self):
@@ -381,6 +700,24 @@ class TestValueTypes(BaseFilterTest):
         self.assertFilter(fdata, i(parse_date('2019/04/01')), True)
         self.assertFilter(fdata, i(datetime.now().isoformat()), False)
 
+    def test_parse_timestamp(self):
+        for v in ('2019-03-25T14:02:11.000Z', '2019-03-25T14:02:11.5+05:30',
+                  '2019-03-25 14:02:11-0800', '2019-03-25T14:02:11+00:00',
+                  '2019-03-25', '2019/03/25 2pm'):
+            self.assertEqual(base_filters.core.parse_timestamp(v), parse_date(v))
+        self.assertEqual(base_filters.core.parse_iso_timestamp('2019/03/25'), None)
+        self.assertEqual(base_filters.core.parse_iso_timestamp('2019-02-30'), None)
+        self.assertRaises(ValueError, base_filters.core.parse_timestamp, 'bogus')
+        self.assertRaises(ValueError, base_filters.core.parse_timestamp, 'bogus')
+        self.assertEqual(base_filters.core.parse_date('bogus'), None)
+
+        cache = base_filters.core.TimestampCache(size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(list(cache.data), ['a', 'c'])
+
     def test_expiration(self):
 
         now = datetime.now(tz=tz.tzutc())
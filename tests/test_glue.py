@@ -13,6 +13,8 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from c7n.executor import MainThreadExecutor
+from c7n.resources.glue import GlueTable
 from .common import BaseTest
 
 
@@ -309,6 +311,7 @@ class TestGlueCrawlers(BaseTest):
 class TestGlueTables(BaseTest):
     def test_tables_delete(self):
         session_factory = self.replay_flight_data("test_glue_table_delete")
+        self.patch(GlueTable, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {
                 "name": "glue-table-delete",
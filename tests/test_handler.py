@@ -71,6 +71,7 @@ class HandleTest(BaseTest):
              'cache': '',
              'regions': (),
              'cache_period': 0,
+             'cache_memory_limit': None,
              'log_group': None,
              'metrics': None})
 
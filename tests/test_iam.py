@@ -25,12 +25,15 @@ from .common import load_data, BaseTest, functional, TestConfig as Config
 from .test_offhours import mock_datetime_now
 
 from dateutil import parser
+from dateutil.tz import tzutc
 
 from c7n.exceptions import PolicyValidationError
 from c7n.filters.iamaccess import CrossAccountAccessFilter, PolicyChecker
+from c7n.filters.usage import UsageGraph
 from c7n.mu import LambdaManager, LambdaFunction, PythonPackageArchive
 from botocore.exceptions import ClientError
 from c7n.resources.sns import SNS
+from c7n.resources import ecs, iam
 from c7n.resources.iam import (
     UserMfaDevice,
     UsedIamPolicies,
@@ -176,6 +179,93 @@ class UserCredentialReportTest(BaseTest):
             sorted([r["UserName"] for r in resources]), ["anthony", "chrissy", "matt"]
         )
 
+    def test_credential_report_poll(self):
+        p = self.load_policy(
+            {
+                "name": "user-mfa",
+                "resource": "iam-user",
+                "filters": [
+                    {"type": "credential", "key": "mfa_active", "value": True}],
+            }
+        )
+        f = p.resource_manager.filters[0]
+        client = mock.MagicMock()
+        client.generate_credential_report.side_effect = [
+            {"State": "STARTED"}, {"State": "INPROGRESS"}, {"State": "COMPLETE"}]
+        sleeps = []
+        self.patch(iam.time, "sleep", sleeps.append)
+        f.generate_credential_report(client)
+        self.assertEqual(sleeps, [1, 2])
+        self.assertEqual(client.generate_credential_report.call_count, 3)
+
+    def test_credential_report_shared(self):
+        session_factory = self.replay_flight_data("test_iam_user_console_old")
+        config = {
+            "cache": os.path.join(self.get_temp_dir(), "c7n.cache"),
+            "cache_period": 300}
+        reports = {}
+        runs = []
+
+        def run_policy(key, value):
+            runs.append(key)
+            p = self.load_policy(
+                {
+                    "name": "user-cred-%d" % len(runs),
+                    "resource": "iam-user",
+                    "filters": [
+                        {
+                            "type": "credential",
+                            "report_max_age": 1543724277,
+                            "key": key,
+                            "value": value,
+                        }
+                    ],
+                },
+                session_factory=session_factory,
+                config=dict(config),
+            )
+            p.ctx.credential_reports = reports
+            return p.run()
+
+        self.assertEqual(
+            [r["UserName"] for r in run_policy("access_keys.last_used_service", "iam")],
+            ["kapil"])
+        self.assertEqual(len(reports), 1)
+        entry = list(reports.values())[0]
+
+        def fail(self):
+            raise AssertionError("report already retrieved")
+
+        self.patch(UserCredentialReport, "fetch_credential_report", fail)
+        self.assertEqual(
+            len(run_policy("access_keys", "absent")), 3)
+
+        # across runs the parsed report is retrieved from the cache
+        reports.clear()
+        self.assertEqual(
+            len(run_policy("access_keys", "absent")), 3)
+        self.assertEqual(reports[None]["generated"], entry["generated"])
+
+    def test_credential_report_version(self):
+        p = self.load_policy(
+            {
+                "name": "user-mfa",
+                "resource": "iam-user",
+                "filters": [
+                    {"type": "credential", "key": "mfa_active", "value": True}],
+            }
+        )
+        f = p.resource_manager.filters[0]
+        generated = datetime.datetime(2016, 11, 25, tzinfo=tzutc())
+        previous = {"generated": generated, "report": {}}
+        self.patch(
+            UserCredentialReport, "fetch_credential_report",
+            lambda self: {"GeneratedTime": generated, "Content": "user\n"})
+        self.assertIs(f.fetch_report_entry(previous), previous)
+        entry = f.fetch_report_entry(
+            dict(previous, generated=generated - datetime.timedelta(days=1)))
+        self.assertEqual(entry["generated"], generated)
+
     def test_record_transform(self):
         info = {
             "access_key_2_active": "false",
@@ -329,6 +419,34 @@ class IamRoleFilterUsage(BaseTest):
             p.resource_manager.get_arns(resources),
             ['arn:aws:iam::644160558196:role/service-role/AmazonSageMaker-ExecutionRole-20180108T122369']) # NOQA
 
+    def test_iam_role_ecs_usage(self):
+        session_factory = self.replay_flight_data("test_iam_role_ecs_usage")
+        self.patch(ecs.Service, "executor_factory", MainThreadExecutor)
+        graph = UsageGraph()
+        results = {}
+        for state in (True, False):
+            p = self.load_policy(
+                {
+                    "name": "iam-role-usage",
+                    "resource": "iam-role",
+                    "filters": [{"type": "used", "state": state}],
+                },
+                session_factory=session_factory,
+            )
+            p.ctx.usage_graph = graph
+            results[state] = p.run()
+        self.assertEqual(results[False], [])
+        self.assertEqual(
+            {r["RoleName"]: r["c7n:usage"] for r in results[True]},
+            {"AmazonSageMaker-ExecutionRole-20180108T122369": {
+                "ecs-service-roles": [
+                    "arn:aws:ecs:us-east-1:644160558196:service/batch/batch-worker"]},
+             "custodian-mu": {"lambda-roles": [
+                 "guard-duty-archiver-EnhancedEventArchiver-RUML739UKXP0"]}})
+        # clusters and services were paged, services described in batches of 10
+        self.assertEqual(
+            len(graph.resources(p.resource_manager, "ecs-service")), 12)
+
     def test_iam_role_get_resources(self):
         session_factory = self.replay_flight_data("test_iam_role_get_resource")
         p = self.load_policy(
@@ -1427,6 +1545,61 @@ class CrossAccountChecker(TestCase):
             self.assertEqual(bool(violations), expected)
 
 
+class CrossAccountPolicyCacheTest(BaseTest):
+
+    def test_policy_evaluation_cache(self):
+        p = self.load_policy(
+            {
+                "name": "sqs-cross-account",
+                "resource": "sqs",
+                "filters": [
+                    {"type": "cross-account", "whitelist": ["112233445566"]}],
+            }
+        )
+        f = p.resource_manager.filters[0]
+        policy = {
+            "Version": "2012-10-17",
+            "Statement": [
+                {"Action": "SQS:SendMessage", "Effect": "Allow",
+                 "Principal": {"AWS": "arn:aws:iam::998877665544:root"},
+                 "Resource": "*"},
+                {"Action": "SQS:SendMessage", "Effect": "Allow",
+                 "Principal": {"AWS": "arn:aws:iam::112233445566:root"},
+                 "Resource": "*"}]}
+        resources = [
+            {"QueueUrl": "a", "Policy": json.dumps(policy)},
+            {"QueueUrl": "b", "Policy": json.dumps(policy)},
+            {"QueueUrl": "c", "Policy": json.dumps(policy, indent=2)},
+            {"QueueUrl": "d"}]
+
+        with mock.patch.object(
+                PolicyChecker, "check", side_effect=PolicyChecker.check,
+                autospec=True) as check:
+            results = f.process(resources)
+        self.assertEqual(check.call_count, 1)
+        self.assertEqual(f.cache_stats, {"hits": 2, "misses": 1})
+        self.assertEqual([r["QueueUrl"] for r in results], ["a", "b", "c"])
+        self.assertEqual(
+            results[0]["CrossAccountViolations"][0]["Principal"]["AWS"],
+            "arn:aws:iam::998877665544:root")
+        self.assertEqual(len(results[0]["CrossAccountViolations"]), 1)
+        self.assertIs(
+            results[0]["CrossAccountViolations"],
+            results[2]["CrossAccountViolations"])
+
+    def test_checker_memoizes_actions(self):
+        checker = PolicyChecker({"check_actions": ["s3:GetObject"]})
+        s = {"Action": ["s3:Get*", "s3:Put*"]}
+        self.assertTrue(checker.handle_action(s))
+        self.assertFalse(checker.handle_action({"Action": "s3:Put*"}))
+        self.assertEqual(
+            checker.action_matches, {"s3:Get*": True, "s3:Put*": False})
+        self.assertEqual(
+            checker.get_condition_handler("aws:sourcevpc"),
+            checker.handle_aws_sourcevpc)
+        self.assertEqual(checker.get_condition_handler("aws:unknown"), None)
+
+
 class SetRolePolicyAction(BaseTest):
     def test_set_policy_attached(self):
         factory = self.replay_flight_data("test_iam_set_policy_attached")
@@ -22,6 +22,7 @@ from dateutil import tz as tzutil
 from .common import BaseTest, instance
 
 from c7n.exceptions import PolicyValidationError
+from c7n.filters import offhours
 from c7n.filters.offhours import OffHour, OnHour, ScheduleParser, Time
 from c7n.testing import mock_datetime_now
 
@@ -633,6 +634,33 @@ class ScheduleParserTest(BaseTest):
         for value, expected in self.table:
             self.assertEqual(parser.parse(value), expected)
 
+    def test_offhours_skip_days_from_per_run(self):
+        t = datetime.datetime(
+            year=2015, month=12, day=1, hour=19, minute=5,
+            tzinfo=tzutil.gettz("America/New_York"))
+        fetches = []
+
+        class ValuesFrom(object):
+
+            def __init__(self, data, manager):
+                pass
+
+            def get_values(self):
+                fetches.append(1)
+                return ["2015-12-02"]
+
+        self.patch(offhours, "ValuesFrom", ValuesFrom)
+        f = OffHour({"skip-days-from": {"url": "s3://bucket/holidays.csv", "format": "csv"}})
+        instances = [
+            instance(InstanceId="i-%d" % n, Tags=[{"Key": "maid_offhours", "Value": v}])
+            for n, v in enumerate(
+                ["tz=est", "tz=est", "off=(m-f,20);tz=pt", "off=(m-f,19);tz=est"])]
+        with mock_datetime_now(t, datetime):
+            self.assertEqual(f.process(instances), [instances[0], instances[1], instances[3]])
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(len(f.schedules), 3)
+        self.assertEqual(f.run_hours, None)
+
     def test_offhours_skip(self):
         t = datetime.datetime(
             year=2015,
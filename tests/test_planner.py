@@ -0,0 +1,81 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import os
+
+from c7n.planner import FetchPlanner
+
+from .common import BaseTest
+
+
+class FetchPlannerTest(BaseTest):
+
+    def test_shared_fetch(self):
+        factory = self.replay_flight_data("test_ec2_augment_tags")
+        p1 = self.load_policy(
+            {"name": "ec2-all", "resource": "ec2"}, session_factory=factory)
+        p2 = self.load_policy(
+            {"name": "ec2-prod", "resource": "ec2",
+             "filters": [{"tag:Env": "Production"}]},
+            session_factory=factory)
+        p3 = self.load_policy(
+            {"name": "ebs", "resource": "ebs"}, session_factory=factory)
+        planner = FetchPlanner([p1, p2, p3])
+        self.assertEqual(planner.stats['groups'], 1)
+        self.assertEqual(p3.ctx.fetch_planner, None)
+
+        resources = p1.run()
+        planner.done(p1)
+        self.assertEqual(len(resources), 1)
+        resources[0]['c7n:annotation'] = True
+
+        def fail(query):
+            raise AssertionError("shouldn't fetch")
+        p2.resource_manager.source.resources = fail
+        resources = p2.run()
+        planner.done(p2)
+        self.assertEqual(len(resources), 1)
+        self.assertNotIn('c7n:annotation', resources[0])
+
+        group = list(planner.groups.values())[0]
+        self.assertEqual(group['remaining'], 0)
+        self.assertEqual(group['resources'], None)
+        self.assertEqual(
+            planner.report(),
+            {'policies': 2, 'groups': 1, 'fetches': 1, 'shared': 1})
+
+        with open(os.path.join(p2.ctx.log_dir, 'metadata.json')) as fh:
+            self.assertEqual(
+                json.load(fh)['fetch-plan'], {'group-size': 2, 'shared': True})
+
+    def test_release_on_error(self):
+        factory = self.replay_flight_data("test_ec2_augment_tags")
+        policies = [
+            self.load_policy(
+                {"name": "ec2-%d" % i, "resource": "ec2"}, session_factory=factory)
+            for i in range(3)]
+        planner = FetchPlanner(policies)
+        policies[0].run()
+        planner.done(policies[0])
+        # a policy which fails before fetching still releases the group
+        planner.done(policies[1])
+        group = list(planner.groups.values())[0]
+        self.assertEqual(group['remaining'], 1)
+        resources = policies[2].run()
+        planner.done(policies[2])
+        self.assertEqual(len(resources), 1)
+        self.assertEqual(group['resources'], None)
+        self.assertEqual(planner.stats['shared'], 1)
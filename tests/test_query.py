@@ -16,9 +16,13 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import json
 import logging
 import os
+import time
 
 
-from c7n.query import ResourceQuery, RetryPageIterator
+from c7n.exceptions import ClientError
+from c7n.executor import MainThreadExecutor
+from c7n.query import ChildResourceQuery, ResourceQuery, RetryPageIterator
+from c7n.resources.route53 import HostedZone, ResourceRecordSet
 from c7n.resources.vpc import InternetGateway
 
 from botocore.config import Config
@@ -86,6 +90,16 @@ class ResourceQueryTest(BaseTest):
         self.assertEqual(len(resources), 1)
         self.assertEqual(resources[0]["InstanceId"], "i-9432cb49")
 
+    def test_query_iter_filter(self):
+        session_factory = self.replay_flight_data('test_query_pagination_retry')
+        p = self.load_policy(
+            {"name": "log-groups", "resource": "log-group"},
+            session_factory=session_factory)
+        q = ResourceQuery(p.session_factory)
+        pages = list(q.iter_filter(p.resource_manager))
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(sum(map(len, pages)), 11)
+
     def test_query_get(self):
         session_factory = self.replay_flight_data("test_query_get")
         p = self.load_policy(
@@ -109,11 +123,98 @@ class ResourceQueryTest(BaseTest):
         self.assertEqual(len(resources), 1)
 
 
+class ChildResourceQueryTest(BaseTest):
+
+    def test_child_query_parent_error(self):
+        p = self.load_policy({"name": "records", "resource": "rrset"})
+        self.patch(ResourceRecordSet, "executor_factory", MainThreadExecutor)
+        manager = p.resource_manager
+        self.patch(
+            HostedZone, "resources",
+            lambda self: [{"Id": "z-1"}, {"Id": "z-2"}, {"Id": "z-3"}])
+
+        def invoke(client, enum_op, params, path, retry=None):
+            self.assertEqual(retry, manager.retry)
+            if params["HostedZoneId"] == "z-2":
+                raise ClientError(
+                    {"Error": {"Code": "NoSuchHostedZone", "Message": ""}},
+                    enum_op)
+            return [{"Name": "%s.example.com" % params["HostedZoneId"]}]
+
+        q = ChildResourceQuery(p.session_factory, manager)
+        q._invoke_client_enum = invoke
+        resources = q.filter(manager)
+        self.assertEqual(
+            resources, [{"Name": "z-1.example.com"}, {"Name": "z-3.example.com"}])
+        self.assertEqual(list(q.parent_stats), ["z-1", "z-2", "z-3"])
+        self.assertEqual(q.parent_stats["z-2"]["error"], "NoSuchHostedZone")
+        self.assertEqual(q.parent_stats["z-3"]["count"], 1)
+        self.assertIn("duration", q.parent_stats["z-1"])
+        self.assertEqual(manager.child_stats["parents"], 3)
+        self.assertEqual(manager.child_stats["errors"], {"z-2": "NoSuchHostedZone"})
+        self.assertEqual(
+            sorted(pid for pid, _ in manager.child_stats["slowest"]),
+            ["z-1", "z-2", "z-3"])
+
+    def test_child_query_parent_order_threaded(self):
+        p = self.load_policy({"name": "records", "resource": "rrset"})
+        manager = p.resource_manager
+        zones = ["z-%d" % i for i in range(8)]
+        self.patch(HostedZone, "resources", lambda self: [{"Id": z} for z in zones])
+
+        def invoke(client, enum_op, params, path, retry=None):
+            # earlier parents finish last
+            zone = params["HostedZoneId"]
+            time.sleep(0.01 * (len(zones) - zones.index(zone)))
+            return [{"Name": "%s-%d.example.com" % (zone, i)} for i in range(2)]
+
+        q = ChildResourceQuery(p.session_factory, manager)
+        q.capture_parent_id = True
+        q._invoke_client_enum = invoke
+        resources = q.filter(manager)
+        self.assertEqual(
+            resources,
+            [(z, {"Name": "%s-%d.example.com" % (z, i)}) for z in zones for i in range(2)])
+        self.assertEqual(len(manager.child_stats["slowest"]), 5)
+        self.assertEqual(manager.child_stats["errors"], {})
+
+    def test_child_query_stats_metadata(self):
+        p = self.load_policy({"name": "records", "resource": "rrset"})
+        stats = {"parents": 2, "errors": {"z-2": "NoSuchHostedZone"},
+                 "duration": 0.2, "slowest": [["z-2", 0.15], ["z-1", 0.05]]}
+
+        def resources(manager):
+            manager.child_stats = stats
+            return []
+
+        self.patch(ResourceRecordSet, "resources", resources)
+        p.run()
+        with open(os.path.join(p.ctx.log_dir, 'metadata.json')) as fh:
+            md = json.load(fh)
+        self.assertEqual(md['child-query'], stats)
+        self.assertIn(
+            ("ChildQueryErrors", 1),
+            [(m["MetricName"], m["Value"]) for m in md["metrics"]])
+
+
 class ConfigSourceTest(BaseTest):
 
     def test_config_select(self):
         pass
 
+    def test_config_get_resources(self):
+        factory = self.replay_flight_data('test_config_source_get_resources')
+        p = self.load_policy(
+            {'name': 'x', 'resource': 'ec2', 'source': 'config'},
+            session_factory=factory)
+        source = p.resource_manager.source
+        self.patch(p.resource_manager, 'executor_factory', MainThreadExecutor)
+        resources = source.get_resources(['i-0a1', 'i-0b2'])
+        # the unprocessed key falls back to config history
+        self.assertEqual(
+            [(r['InstanceId'], r['State']['Name']) for r in resources],
+            [('i-0a1', 'running'), ('i-0b2', 'stopped')])
+
     def test_config_get_query(self):
         p = self.load_policy({'name': 'x', 'resource': 'ec2'})
         source = p.resource_manager.get_source('config')
@@ -164,6 +265,44 @@ class QueryResourceManagerTest(BaseTest):
         p.run()
         self.assertTrue("Using cached internet-gateway: 3", output.getvalue())
 
+    def test_stream_resources(self):
+        session_factory = self.replay_flight_data("test_query_manager")
+        p = self.load_policy(
+            {
+                "name": "igw-check",
+                "resource": "internet-gateway",
+                "stream": True,
+                "filters": [
+                    {"Attachments": "not-null"},
+                    {"or": [
+                        {"InternetGatewayId": "igw-2e65104a"},
+                        {"InternetGatewayId": "igw-nothere"}]}],
+            },
+            session_factory=session_factory,
+        )
+        manager = p.resource_manager
+        self.assertEqual(
+            [f.is_streamable() for f in manager.filters], [True, False])
+        resources = manager.resources()
+        self.assertEqual(len(resources), 1)
+        self.assertEqual(resources[0]['InternetGatewayId'], 'igw-2e65104a')
+        self.assertEqual(manager.stream_stats['pages'], 1)
+        self.assertEqual(manager.stream_stats['population'], 1)
+        self.assertTrue(manager.stream_stats['first-match'] is not None)
+
+    def test_augment_concurrency(self):
+        factory = self.replay_flight_data('test_dlm_query')
+        p = self.load_policy(
+            {'name': 'dlm-query', 'resource': 'dlm-policy', 'max-workers': 5},
+            session_factory=factory)
+        concurrency = p.resource_manager.get_augment_concurrency()
+        self.assertEqual(concurrency.ceiling, 5)
+        self.assertEqual(concurrency.limit, p.resource_manager.max_workers)
+        p.run()
+        with open(os.path.join(p.ctx.log_dir, 'metadata.json')) as fh:
+            self.assertEqual(
+                json.load(fh)['augment'], {'concurrency': 1, 'throttles': 0})
+
     def test_get_resources(self):
         session_factory = self.replay_flight_data("test_query_manager_get")
         p = self.load_policy(
@@ -0,0 +1,131 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import boto3
+from botocore.stub import Stubber
+import mock
+
+from c7n import ratelimit
+
+
+class TokenBucketTest(TestCase):
+
+    def test_acquire(self):
+        bucket = ratelimit.TokenBucket(2)
+        with mock.patch.object(ratelimit.time, 'time') as mock_time, \
+                mock.patch.object(ratelimit.time, 'sleep') as mock_sleep:
+            mock_time.return_value = bucket.state['updated']
+            self.assertEqual(bucket.acquire(), 0)
+            self.assertEqual(bucket.acquire(), 0)
+            # bucket is empty, wait for the next token to accrue
+            self.assertEqual(bucket.acquire(), 0.5)
+            self.assertEqual(bucket.acquire(), 1.0)
+            mock_sleep.assert_called_with(1.0)
+            mock_time.return_value += 10
+            self.assertEqual(bucket.acquire(), 0)
+
+    def test_self_tuning(self):
+        bucket = ratelimit.TokenBucket(10)
+        bucket.throttled()
+        bucket.throttled()
+        self.assertEqual(bucket.state['rate'], 2.5)
+        for i in range(5):
+            bucket.succeeded()
+        self.assertEqual(bucket.state['rate'], 5.0)
+        for i in range(100):
+            bucket.succeeded()
+        self.assertEqual(bucket.state['rate'], 10)
+        for i in range(10):
+            bucket.throttled()
+        self.assertEqual(bucket.state['rate'], bucket.min_rate)
+
+    def test_shared_bucket(self):
+        fh = tempfile.NamedTemporaryFile(delete=False)
+        fh.close()
+        self.addCleanup(os.unlink, fh.name)
+        b1 = ratelimit.SharedTokenBucket(fh.name, 'ec2', 1)
+        b2 = ratelimit.SharedTokenBucket(fh.name, 'ec2', 1)
+        with mock.patch.object(ratelimit.time, 'sleep'):
+            self.assertEqual(b1.acquire(), 0)
+            # second process sees the bucket drained by the first
+            self.assertTrue(b2.acquire() > 0.9)
+        b2.throttled()
+        with open(fh.name) as state_fh:
+            self.assertEqual(json.load(state_fh)['ec2']['rate'], 0.5)
+
+
+class RateLimiterTest(TestCase):
+
+    def test_from_env(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(ratelimit.RateLimiter.from_env(), None)
+        with mock.patch.dict(os.environ, {
+                'C7N_API_RATES': '{"ec2": 5}', 'C7N_API_RATE_STATE': '/tmp/rates'}):
+            limiter = ratelimit.RateLimiter.from_env()
+            self.assertEqual(limiter.rates, {'ec2': 5})
+            self.assertEqual(limiter.state_path, '/tmp/rates')
+
+    def test_get_rate_limiter(self):
+        self.addCleanup(ratelimit.reset_rate_limiter)
+        ratelimit.reset_rate_limiter()
+        with mock.patch.dict(os.environ, {'C7N_API_RATES': '{"*": 5}'}):
+            limiter = ratelimit.get_rate_limiter()
+            self.assertIs(ratelimit.get_rate_limiter(), limiter)
+        ratelimit.reset_rate_limiter()
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(ratelimit.get_rate_limiter(), None)
+
+    def test_get_bucket(self):
+        limiter = ratelimit.RateLimiter(
+            {'ec2.DescribeTags': 1, 'ec2': 10})
+        b = limiter.get_bucket('acct', 'us-east-1', 'ec2', 'DescribeTags')
+        self.assertEqual(b.max_rate, 1)
+        self.assertIs(
+            b, limiter.get_bucket('acct', 'us-east-1', 'ec2', 'DescribeTags'))
+        self.assertEqual(
+            limiter.get_bucket('acct', 'us-east-1', 'ec2', 'DescribeVpcs').max_rate, 10)
+        self.assertIsNot(
+            b, limiter.get_bucket('acct', 'us-west-2', 'ec2', 'DescribeTags'))
+        self.assertEqual(
+            limiter.get_bucket('acct', 'us-east-1', 'sqs', 'ListQueues'), None)
+
+    def test_session_events(self):
+        limiter = ratelimit.RateLimiter({'sqs': 100})
+        session = boto3.Session(
+            region_name='us-east-1',
+            aws_access_key_id='foo', aws_secret_access_key='bar')
+        limiter.register(session, 'acct')
+        client = session.client('sqs')
+        with Stubber(client) as stubber:
+            stubber.add_response('list_queues', {'QueueUrls': []})
+            client.list_queues()
+        self.assertEqual(limiter.stats['calls'], 1)
+        bucket = limiter.get_bucket('acct', 'us-east-1', 'sqs', 'ListQueues')
+        self.assertEqual(bucket.state['tokens'] < 100, True)
+
+        model = client.meta.service_model.operation_model('ListQueues')
+        observe = limiter._needs_retry('acct')
+        context = {'context': {'client_region': 'us-east-1'}}
+        observe(({}, {'Error': {'Code': 'Throttling'}}), model, context)
+        self.assertEqual(bucket.state['rate'], 50)
+        observe(({}, {}), model, context)
+        self.assertEqual(bucket.state['rate'], 55)
+        observe(None, model, context)
+        self.assertEqual(limiter.stats['throttles'], 1)
@@ -130,6 +130,102 @@ class ProxyUrlTest(BaseTest):
             self.assertEqual(proxy_url, 'http://mock.all.proxy.server:8000')
 
 
+class TagMapTest(BaseTest):
+
+    def test_tag_map(self):
+        with utils.TAG_MAP_INDEX:
+            r = {'Tags': [{'Key': 'Env', 'Value': 'dev'}, {'Key': 'App', 'Value': 'web'},
+                          {'Key': 'Env', 'Value': 'prod'}]}
+            tag_map = utils.get_tag_map(r)
+            self.assertEqual(tag_map, {'Env': 'dev', 'App': 'web'})
+            self.assertTrue(utils.get_tag_map(r) is tag_map)
+            self.assertEqual(utils.get_tag_map(r, lower=True), {'env': 'dev', 'app': 'web'})
+            self.assertEqual(utils.get_tag_value(r, 'App'), 'web')
+            self.assertEqual(utils.get_tag_value(r, 'Owner', 'x'), 'x')
+
+            # tags added or replaced are reindexed
+            r['Tags'].append({'Key': 'Owner', 'Value': 'ops'})
+            self.assertEqual(utils.get_tag_value(r, 'Owner'), 'ops')
+            r['Tags'] = [{'Key': 'Env', 'Value': 'qa'}]
+            self.assertEqual(utils.get_tag_value(r, 'Env'), 'qa')
+
+            # tags modified in place need invalidation
+            r['Tags'][0]['Value'] = 'test'
+            self.assertEqual(utils.get_tag_value(r, 'Env'), 'qa')
+            utils.invalidate_tag_map(r)
+            self.assertEqual(utils.get_tag_value(r, 'Env'), 'test')
+
+    def test_tag_map_index_scope(self):
+        r = {'Tags': [{'Key': 'Env', 'Value': 'dev'}]}
+        # outside of policy executions tag maps aren't indexed
+        self.assertEqual(utils.TAG_MAP_INDEX.entries, None)
+        self.assertFalse(utils.get_tag_map(r) is utils.get_tag_map(r))
+
+        with utils.TAG_MAP_INDEX:
+            with utils.TAG_MAP_INDEX:
+                tag_map = utils.get_tag_map(r)
+            self.assertTrue(utils.get_tag_map(r) is tag_map)
+        self.assertEqual(utils.TAG_MAP_INDEX.entries, None)
+
+    def test_tag_map_index_size(self):
+        self.patch(utils.TagMapIndex, 'size', 2)
+        resources = [{'Tags': [{'Key': 'Env', 'Value': str(i)}]} for i in range(3)]
+        with utils.TAG_MAP_INDEX:
+            for r in resources:
+                utils.get_tag_map(r)
+            self.assertEqual(len(utils.TAG_MAP_INDEX.entries), 1)
+
+    def test_tag_map_schemas(self):
+        self.assertEqual(utils.get_tag_map({'labels': {'env': 'dev'}}), {'env': 'dev'})
+        self.assertEqual(
+            utils.get_tag_map({'tags': {'Env': 'dev'}}, lower=True), {'env': 'dev'})
+        self.assertEqual(utils.get_tag_map({'Tags': None}), {})
+        self.assertEqual(utils.get_tag_map({}), None)
+        self.assertEqual(utils.get_tag_value({}, 'Env'), None)
+
+
+class NetworkSetTest(BaseTest):
+
+    def test_network_set(self):
+        networks = utils.NetworkSet([
+            '10.0.0.0/16', '10.0.1.0/24', '10.2.0.0/24', '192.168.1.1',
+            '2001:db8::/32', 'bogus', None])
+        self.assertEqual(len(networks), 4)
+        self.assertTrue('10.0.200.0/24' in networks)
+        self.assertTrue(networks.subnet_of(ipaddress.ip_address(u'192.168.1.1')))
+        self.assertFalse('10.0.0.0/8' in networks)
+        self.assertFalse('10.1.0.0/24' in networks)
+        self.assertFalse('bogus' in networks)
+        self.assertTrue('2001:db8:1::/48' in networks)
+        self.assertFalse('2001:db9::/48' in networks)
+
+        self.assertTrue(networks.overlaps('10.0.0.0/8'))
+        self.assertTrue(networks.overlaps('10.2.0.128/25'))
+        self.assertFalse(networks.overlaps('10.1.0.0/16'))
+        self.assertFalse(networks.overlaps('172.16.0.0/12'))
+
+        self.assertTrue(networks.supernet_of('192.168.0.0/16'))
+        self.assertTrue(networks.supernet_of('10.0.0.0/8'))
+        self.assertFalse(networks.supernet_of('10.2.0.0/25'))
+        self.assertFalse(networks.supernet_of('172.16.0.0/12'))
+
+    def test_network_set_nested_supernet(self):
+        networks = utils.NetworkSet(['10.0.0.0/16', '10.0.1.0/24', '10.0.8.0/22'])
+        self.assertEqual(len(networks), 1)
+        self.assertTrue(networks.supernet_of('10.0.1.0/24'))
+        self.assertTrue(networks.supernet_of('10.0.0.0/23'))
+        self.assertTrue(networks.supernet_of('10.0.8.0/21'))
+        self.assertFalse(networks.supernet_of('10.0.0.0/24'))
+        self.assertFalse(networks.supernet_of('10.0.1.0/25'))
+        self.assertFalse(networks.supernet_of('10.0.4.0/22'))
+        self.assertTrue(networks.supernet_of('10.0.0.0/16'))
+        self.assertFalse(utils.NetworkSet().supernet_of('10.0.0.0/8'))
+
+    def test_parse_cidr_cached(self):
+        self.assertTrue(utils.parse_cidr('10.0.0.0/24') is utils.parse_cidr('10.0.0.0/24'))
+        self.assertEqual(utils.parse_cidr('10.0.0.1/24'), None)
+
+
 class UtilTest(BaseTest):
 
     def test_local_session_region(self):
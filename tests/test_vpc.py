@@ -13,10 +13,14 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import os
+
 from .common import BaseTest, functional, event_data, TestConfig as Config
 
 from botocore.exceptions import ClientError as BotoClientError
 from c7n.exceptions import PolicyValidationError
+from c7n.filters.related import RelatedIndex
+from c7n.filters.usage import UsageGraph
 
 
 class VpcTest(BaseTest):
@@ -2426,6 +2430,114 @@ class SecurityGroupTest(BaseTest):
         self.assertEqual(resources[0]["Tags"][0]["Value"], "scenario-2-test")
 
 
+class RelatedIndexTest(BaseTest):
+
+    def test_related_index_population(self):
+        factory = self.replay_flight_data("test_vpc_scenario_2")
+        index = RelatedIndex()
+        p1 = self.load_policy(
+            {
+                "name": "vpc-subnet",
+                "resource": "vpc",
+                "filters": [
+                    {"type": "subnet", "key": "tag:Name", "value": "Public subnet"}
+                ],
+            },
+            session_factory=factory,
+        )
+        p2 = self.load_policy(
+            {
+                "name": "vpc-subnet-count",
+                "resource": "vpc",
+                "filters": [
+                    {"type": "subnet", "value_type": "resource_count",
+                     "value": 2, "op": "lt"}
+                ],
+            },
+            session_factory=factory,
+        )
+        p1.ctx.related_index = p2.ctx.related_index = index
+        self.assertEqual(len(p1.run()), 1)
+        self.assertEqual(len(p2.run()), 0)
+        stats = index.report()
+        self.assertEqual(stats["fetches"], 1)
+        self.assertEqual(stats["hits"], stats["lookups"] - 1)
+
+    def test_related_index_ids(self):
+        factory = self.replay_flight_data("test_vpce_sg_filter")
+        index = RelatedIndex()
+        policies = []
+        for value in ("c7n-test-val", "other-val"):
+            p = self.load_policy(
+                {
+                    "name": "endpoint-sg",
+                    "resource": "vpc-endpoint",
+                    "filters": [
+                        {"VpcEndpointType": "Interface"},
+                        {"type": "security-group",
+                         "key": "tag:c7n-test-tag", "value": value},
+                    ],
+                },
+                session_factory=factory,
+            )
+            p.ctx.related_index = index
+            policies.append(p)
+
+        resources = policies[0].run()
+        self.assertEqual(resources[0]["c7n:matched-security-groups"], ["sg-6c7fa917"])
+        self.assertEqual(len(policies[1].run()), 0)
+        self.assertEqual(index.report(), {"lookups": 2, "fetches": 1, "hits": 1})
+        entry = list(index.entries.values())[0]
+        self.assertFalse(entry["complete"])
+        self.assertIn("sg-6c7fa917", entry["resources"])
+
+
+class UsageGraphTest(BaseTest):
+
+    def test_usage_graph_shared(self):
+        factory = self.replay_flight_data("test_security_group_used")
+        config = {
+            "cache": os.path.join(self.get_temp_dir(), "c7n.cache"),
+            "cache_period": 5}
+
+        def run(graph):
+            policies = []
+            for f in ("used", "unused"):
+                p = self.load_policy(
+                    {"name": "sg-%s" % f, "resource": "security-group", "filters": [f]},
+                    config=dict(config), session_factory=factory)
+                p.ctx.usage_graph = graph
+                policies.append(p)
+            results = [p.run() for p in policies]
+            policies[0].get_cache().close()
+            return results
+
+        graph = UsageGraph()
+        used, unused = run(graph)
+        self.assertEqual(
+            {r["GroupId"]: r["c7n:usage"] for r in used},
+            {"sg-13de8f75": {"security-group-references": ["sg-13de8f75"]},
+             "sg-ce548cb7": {"security-group-references": ["sg-ce548cb7"]},
+             "sg-f9cc4d9f": {"eni-security-groups": ["eni-caa070b4"]}})
+        self.assertEqual(
+            sorted([r["GroupId"] for r in unused]), ["sg-6bfe7312", "sg-f6a42890"])
+        stats = graph.report()
+        self.assertEqual(
+            set([s["scans"] for s in stats.values()]), set([1]))
+        self.assertEqual(stats["security-group-references"]["references"], 2)
+
+        # a later run's graph loads the scanned references from the cache
+        graph = UsageGraph()
+        cached_used, cached_unused = run(graph)
+        self.assertEqual(
+            [r["GroupId"] for r in cached_used], [r["GroupId"] for r in used])
+        self.assertEqual(
+            [r["GroupId"] for r in cached_unused], [r["GroupId"] for r in unused])
+        stats = graph.report()
+        self.assertEqual(
+            set([(s["scans"], s["cached"]) for s in stats.values()]), set([(0, 1)]))
+
+
 class EndpointTest(BaseTest):
 
     def test_endpoint_subnet(self):
@@ -18,7 +18,7 @@ from c7n_azure.filters import FirewallRulesFilter, FirewallBypassFilter
 from c7n_azure.provider import resources
 from c7n_azure.session import Session
 
-from c7n.filters import Filter
+from c7n.filters import Filter, COST_RESOURCE_API
 from c7n.utils import type_schema
 from c7n_azure.utils import GraphHelper
 
@@ -193,6 +193,7 @@ class WhiteListFilter(Filter):
                              'keys': {'type': 'array'}})
     GRAPH_PROVIDED_KEYS = ['displayName', 'aadType', 'principalName']
     graph_client = None
+    cost = COST_RESOURCE_API
 
     def __init__(self, data, manager=None):
         super(WhiteListFilter, self).__init__(data, manager)
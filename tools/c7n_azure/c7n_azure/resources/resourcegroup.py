@@ -16,7 +16,7 @@ from c7n_azure.provider import resources
 from c7n_azure.resources.arm import ArmResourceManager
 from c7n_azure.utils import ResourceIdParser
 
-from c7n.filters import Filter
+from c7n.filters import Filter, COST_RESOURCE_API
 from c7n.utils import type_schema
 
 
@@ -96,6 +96,7 @@ class ResourceGroup(ArmResourceManager):
 @ResourceGroup.filter_registry.register('empty-group')
 class EmptyGroup(Filter):
     schema = type_schema('empty-group')
+    cost = COST_RESOURCE_API
 
     def __call__(self, group):
         resources_iterator = (
@@ -15,7 +15,7 @@ from c7n_azure.actions.base import AzureBaseAction
 from c7n_azure.provider import resources
 from c7n_azure.resources.arm import ArmResourceManager
 
-from c7n.filters.core import ValueFilter, type_schema
+from c7n.filters.core import ValueFilter, type_schema, COST_RESOURCE_API
 from c7n.filters.related import RelatedResourceFilter
 
 
@@ -158,6 +158,7 @@ class VirtualMachine(ArmResourceManager):
 class InstanceViewFilter(ValueFilter):
     schema = type_schema('instance-view', rinherit=ValueFilter.schema)
     schema_alias = True
+    cost = COST_RESOURCE_API
 
     def __call__(self, i):
         if 'instanceView' not in i:
@@ -15,7 +15,7 @@
 from c7n_azure.provider import resources
 from c7n_azure.resources.arm import ArmResourceManager
 
-from c7n.filters.core import ValueFilter, type_schema
+from c7n.filters.core import ValueFilter, type_schema, COST_RESOURCE_API
 
 
 @resources.register('webapp')
@@ -96,6 +96,7 @@ class WebApp(ArmResourceManager):
 class ConfigurationFilter(ValueFilter):
     schema = type_schema('configuration', rinherit=ValueFilter.schema)
     schema_alias = True
+    cost = COST_RESOURCE_API
 
     def __call__(self, i):
         if 'c7n:configuration' not in i:
@@ -0,0 +1,161 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Micro benchmarks of filter evaluation.
+
+Compiled vs interpreted value filters:
+
+  $ python tools/dev/filterbench.py value --count 100000
+
+Short-circuited `or` blocks, with a branch making an api call per
+resource:
+
+  $ python tools/dev/filterbench.py or --count 2000 --latency 5
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import random
+import time
+
+from c7n.filters import COST_RESOURCE_API, Filter, FilterRegistry, Or, ValueFilter
+
+FILTERS = [
+    {"tag:Env": "prod"},
+    {"State.Name": "running"},
+    {"type": "value", "key": "InstanceType", "op": "in",
+     "value": ["m5.large", "m5.xlarge", "c5.large"]},
+    {"type": "value", "key": "tag:Name", "op": "regex", "value": "^web-[0-9]+$"},
+    {"type": "value", "key": "LaunchTime", "op": "gt", "value": 30,
+     "value_type": "age"},
+    {"type": "value", "key": "LaunchTime", "op": "gt",
+     "value": "2018-06-01T00:00:00Z", "value_type": "date"},
+    {"type": "value", "key": "PrivateIpAddress", "op": "in",
+     "value": "10.0.0.0/16", "value_type": "cidr"},
+    {"type": "value", "key": "tag:Owner", "op": "eq", "value": "ops",
+     "value_type": "normalize"},
+]
+
+
+def resources(count):
+    rng = random.Random(42)
+    now = datetime.datetime.utcnow()
+    for i in range(count):
+        yield {
+            'InstanceId': 'i-%012x' % i,
+            'InstanceType': rng.choice(['t2.micro', 'm5.large', 'c5.large']),
+            'State': {'Name': rng.choice(['running', 'stopped'])},
+            'LaunchTime': (now - datetime.timedelta(
+                days=rng.randint(0, 400))).isoformat() + 'Z',
+            'PrivateIpAddress': '10.%d.%d.%d' % (
+                rng.randint(0, 1), rng.randint(0, 255), rng.randint(1, 254)),
+            'Tags': [
+                {'Key': 'Env', 'Value': rng.choice(['prod', 'dev'])},
+                {'Key': 'Name', 'Value': 'web-%d' % i},
+                {'Key': 'Owner', 'Value': rng.choice([' Ops', 'dev '])}]}
+
+
+def timed(func, resources):
+    t = time.time()
+    matched = len([r for r in resources if func(r)])
+    return time.time() - t, matched
+
+
+def bench_value(options):
+    population = list(resources(options.count))
+    print("%-40s %10s %10s %8s" % ('filter', 'match', 'compiled', 'speedup'))
+    for data in FILTERS:
+        f = ValueFilter(data).validate()
+        match_time, expected = timed(f.match, population)
+        compiled_time, matched = timed(f.matcher, population)
+        assert matched == expected, "compiled filter mismatch %s" % (data,)
+        print("%-40s %9.3fs %9.3fs %7.1fx" % (
+            str(data.get('key', list(data)[0]))[:20] + ' ' + str(
+                data.get('value_type', data.get('op', ''))),
+            match_time, compiled_time, match_time / max(compiled_time, 1e-9)))
+
+
+class ApiFilter(Filter):
+    """Stands in for a filter making an api call per resource, ie. metrics."""
+
+    cost = COST_RESOURCE_API
+    latency = 0
+    calls = 0
+
+    def process(self, resources, event=None):
+        ApiFilter.calls += len(resources)
+        time.sleep(self.latency * len(resources))
+        return [r for r in resources if r['State']['Name'] == 'stopped']
+
+
+class UnionOr(Or):
+    """Evaluates every branch over all resources, as `or` blocks used to."""
+
+    def process_set(self, resources, event):
+        id_key = self.manager.get_model().id
+        resource_map = {r[id_key]: r for r in resources}
+        results = set()
+        for f in self.filters:
+            results.update([r[id_key] for r in f.process(resources, event)])
+        return [resource_map[r_id] for r_id in results]
+
+
+class Manager(object):
+
+    class resource_type(object):
+        id = 'InstanceId'
+
+    def get_model(self):
+        return self.resource_type
+
+
+def bench_or(options):
+    population = list(resources(options.count))
+    registry = FilterRegistry('filterbench')
+    registry.register('api', ApiFilter)
+    ApiFilter.latency = options.latency / 1000.0
+    data = {'or': [{'type': 'api'}, {'tag:Env': 'prod'}]}
+
+    print("%-15s %10s %10s %8s" % ('or', 'time', 'api-calls', 'matched'))
+    for name, klass in (('union', UnionOr), ('short-circuit', Or)):
+        f = klass(data, registry, Manager())
+        ApiFilter.calls = 0
+        t = time.time()
+        matched = len(f.process(population))
+        print("%-15s %9.3fs %10d %8d" % (
+            name, time.time() - t, ApiFilter.calls, matched))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    benchmarks = parser.add_subparsers(dest='benchmark')
+    value = benchmarks.add_parser('value', help="Compiled value filters")
+    value.add_argument(
+        '--count', type=int, default=20000, help="Number of synthetic resources")
+    value.set_defaults(func=bench_value)
+    or_block = benchmarks.add_parser('or', help="Short-circuited or blocks")
+    or_block.add_argument(
+        '--count', type=int, default=2000, help="Number of synthetic resources")
+    or_block.add_argument(
+        '--latency', type=float, default=2,
+        help="Milliseconds per resource of the api filter")
+    or_block.set_defaults(func=bench_or)
+    options = parser.parse_args()
+    if not options.benchmark:
+        parser.error("a benchmark is required")
+    options.func(options)
+
+
+if __name__ == '__main__':
+    main()